@@ -1,7 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import os
+import sys
 import logging
+import importlib
 
 # as described here: https://docs.python.org/2/howto/logging.html#configuring-logging-for-a-library
 logger = logging.getLogger("adwords_reports")
@@ -11,5 +13,43 @@ __version__ = "1.2.2"
 app_dir = os.path.dirname(__file__)
 base_dir = os.path.dirname(app_dir)
 
-from adwords_reports.client import Client
-from adwords_reports.report_definition import ReportDefinition
+# public classes are imported on first use, so pure modules like report_definition don't pull in
+# googleads and pandas, e.g. `import adwords_reports.report_definition` takes milliseconds
+_LAZY_ATTRIBUTES = {
+    "Agg": "adwords_reports.aggregation",
+    "Client": "adwords_reports.client",
+    "FxRates": "adwords_reports.currency",
+    "ReportDefinition": "adwords_reports.report_definition",
+    "InvalidReportDefinition": "adwords_reports.report_definition",
+    "ReportCache": "adwords_reports.report_cache",
+    "IncrementalSync": "adwords_reports.incremental_sync",
+    "PartitionStore": "adwords_reports.incremental_sync",
+    "RateLimiter": "adwords_reports.rate_limit",
+    "RetryPolicy": "adwords_reports.rate_limit",
+    "Instrumentation": "adwords_reports.instrumentation",
+    "JobRunner": "adwords_reports.job_runner",
+    "Manifest": "adwords_reports.job_runner",
+    "PooledTransport": "adwords_reports.transport",
+    "AccountStats": "adwords_reports.scheduling",
+    "ShardedRunner": "adwords_reports.sharding",
+    "WorkQueue": "adwords_reports.sharding"
+}
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    """ module attributes on demand, see PEP 562 """
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value  # later lookups don't go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+if sys.version_info < (3, 7):  # module __getattr__ isn't supported, so everything is imported right away
+    for _name in __all__:
+        __getattr__(_name)
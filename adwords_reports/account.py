@@ -1,9 +1,15 @@
-import io
+import gzip
+import time
 import pandas as pd
-from retrying import retry
 
 from adwords_reports import logger
 from adwords_reports.account_label import AccountLabel
+from adwords_reports.coalesce import coalesce
+from adwords_reports.frames import concat
+from adwords_reports.micro_amounts import micro_to_reg
+from adwords_reports.parallel import imap
+from adwords_reports.parsers import read_csv, micro_to_reg_arrow
+from adwords_reports.rate_limit import retried
 
 
 class Account:
@@ -20,6 +26,15 @@ class Account:
         }]
     }
 
+    # all accounts below the top level account including managers, see Client.hierarchy
+    HIERARCHY_SELECTOR = {
+        "fields": ["Name", "CustomerId", "CurrencyCode", "DateTimeZone", "CanManageClients"],
+        "ordering": [{
+            "field": "Name",
+            "sortOrder": "ASCENDING"
+        }]
+    }
+
     def __init__(self, client, account_id, name, currency, time_zone, labels):
         self.client = client
         self.id = account_id
@@ -28,6 +43,8 @@ class Account:
         self.time_zone = time_zone
         self.labels = labels
 
+        self._downloader = None
+
     @classmethod
     def from_ad_account(cls, client, ad_account):
         labels = cls.parse_labels(ad_account)
@@ -35,28 +52,253 @@ class Account:
                    currency=ad_account.currencyCode, time_zone=ad_account.dateTimeZone,
                    labels=labels)
 
-    def download(self, report_definition, zero_impressions):
+    @property
+    def downloader(self):
+        """ the account's own downloader if its session was isolated, else the one of the client """
+        return self._downloader or self.client.downloader
+
+    @property
+    def retry_policy(self):
+        return self.client.retry_policy
+
+    @property
+    def rate_limiter(self):
+        return self.client.rate_limiter
+
+    @property
+    def rate_limit_scope(self):
+        return self.client.developer_token, self.id
+
+    @property
+    def instrumentation(self):
+        return self.client.instrumentation
+
+    def isolate_session(self):
+        """ binds the account to its own customer-scoped session.
+        Afterwards it doesn't depend on the selection of the client anymore and can download in parallel to others.
+        """
+        self._downloader = self.client.isolated_downloader(self.id)
+
+    def download(self, report_definition, zero_impressions, convert_money=False, split_by=None, max_workers=4,
+                 parser=None, aggregate=None):
         """ Downloads a report from the API
         :param report_definition: ReportDefinition
         :param zero_impressions: bool
-        :return: DataFrame
+        :param convert_money: bool, convert money fields like Cost from micro amounts to regular amounts
+        :param split_by: str, "day", "week" or "month". The date range is split into sub-ranges that are
+            downloaded (and retried) separately and in parallel. Helpful for huge reports.
+        :param max_workers: int, number of sub-ranges that are downloaded at the same time
+        :param parser: str, one of parsers.PARSERS, defaults to the parser of the client.
+            The "arrow" parser returns a pyarrow.Table, which isn't cached.
+        :param aggregate: Agg, the report is streamed and folded into its groups chunk by chunk instead of
+            being kept row by row. Money fields are summed as micro amounts and converted afterwards.
+            Aggregated reports are parsed by pandas and aren't cached.
+        :return: DataFrame or pyarrow.Table
+        """
+        parser = parser or self.client.parser
+        cache = self.client.cache if parser != "arrow" and aggregate is None else None
+        if cache is not None:
+            cache_key = cache.key(self.id, report_definition, zero_impressions, convert_money=convert_money)
+            report = cache.get(cache_key)
+            if report is not None:
+                return report
+
+        # only downloads are validated, cached reports were validated when they were downloaded
+        self.client.validate(report_definition)
+        if aggregate is not None:
+            aggregate.check(report_definition)
+        start = time.time()
+        if aggregate is not None:
+            def aggregate_part(part):
+                return self._aggregate_report(part, zero_impressions, aggregate)
+
+            parts = [report_definition] if split_by is None else report_definition.split(split_by)
+            report = aggregate.merge(imap(aggregate_part, parts, max_workers=max_workers))
+            if convert_money:
+                report = self._convert_money(report, report_definition)
+        elif split_by is None:
+            report = self._download_report(report_definition, zero_impressions, convert_money, parser)
+        else:
+            def download_part(part):
+                return self._download_report(part, zero_impressions, convert_money, parser)
+
+            parts = report_definition.split(split_by)
+            report = concat(list(imap(download_part, parts, max_workers=max_workers)))
+
+        if self.client.account_stats is not None:
+            self.client.account_stats.record(self.id, report_definition.report_type, time.time() - start, len(report))
+        if cache is not None:
+            cache.put(cache_key, report, report_definition)
+        return report
+
+    def download_many(self, report_definitions, zero_impressions, convert_money=False, max_workers=1):
+        """ Downloads several reports with as few requests as possible.
+        Report definitions with the same report type, date range and segments are merged into one request,
+        whose report is split into the requested ones locally, see coalesce.coalesce.
+        :param report_definitions: list of ReportDefinitions
+        :param zero_impressions: bool
+        :param convert_money: bool, convert money fields like Cost from micro amounts to regular amounts
+        :param max_workers: int, number of requests that are downloaded at the same time
+        :return: list of DataFrames in the order of report_definitions
+        """
+        for report_definition in report_definitions:
+            self.client.validate(report_definition)
+        requests = coalesce(report_definitions, self.client.field_registry)
+        logger.info("Downloading {} reports with {} requests.".format(len(report_definitions), len(requests)))
+        # the requested reports are split off DataFrames
+        parser = "pyarrow" if self.client.parser == "arrow" else None
+
+        def download(request):
+            return request, self.download(request.report_definition, zero_impressions, parser=parser)
+
+        reports = [None] * len(report_definitions)
+        for request, report in imap(download, requests, max_workers=max_workers):
+            for index, part in request.split(report):
+                if convert_money:
+                    part = self._convert_money(part, report_definitions[index])
+                reports[index] = part
+        return reports
+
+    def download_chunks(self, report_definition, zero_impressions, chunksize=100000, convert_money=False):
+        """ Downloads a report from the API and parses it while it's streamed.
+        Peak memory is bounded by the chunksize instead of the size of the report.
+        :param report_definition: ReportDefinition
+        :param zero_impressions: bool
+        :param chunksize: int, maximum number of rows per DataFrame
+        :param convert_money: bool, convert money fields like Cost from micro amounts to regular amounts
+        :return: generator with DataFrames
+        """
+        self.client.validate(report_definition)
+        compressed = self._is_compressed(report_definition)
+        stream = self._download_stream(self._transfer_definition(report_definition), zero_impressions)
+        metered = self.instrumentation.meter(stream)
+        labels = dict(account=self.id, report_type=report_definition.report_type)
+        try:
+            data = gzip.GzipFile(fileobj=metered) if compressed else metered
+            for chunk in self._read_csv(data, report_definition, chunksize=chunksize):
+                if convert_money:
+                    chunk = self._convert_money(chunk, report_definition)
+                self.instrumentation.count("rows", len(chunk), **labels)
+                yield chunk
+        finally:
+            stream.close()
+            if metered is not stream:
+                # chunks are parsed in between the work of the caller, so parse time isn't recorded
+                self._record_transfer(metered, labels)
+
+    def download_to_file(self, report_definition, zero_impressions, output):
+        """ Downloads a report from the API and writes it directly to a file-like object.
+        The report is written in the download format of the report definition, i.e. csv by default.
+        The download isn't retried since parts of the report may have been written already.
+        :param report_definition: ReportDefinition
+        :param zero_impressions: bool
+        :param output: writable binary file-like object
         """
-        json_report_definition = report_definition.raw
-        header = json_report_definition["selector"]["fields"]
+        self.client.validate(report_definition)
+        logger.info("Downloading report to file.")
+        self.downloader.DownloadReport(
+            report_definition.raw, output=output, skip_report_header=True, skip_column_header=True,
+            skip_report_summary=True, include_zero_impressions=zero_impressions)
 
-        response = self._download(json_report_definition, zero_impressions)
-        data = io.StringIO(response)
-        return pd.read_csv(data, names=header)
+    @retried
+    def _download_stream(self, json_report_definition, zero_impressions):
+        logger.info("Opening report stream.")
+        with self.instrumentation.span("download", account=self.id, report_type=json_report_definition["reportType"]):
+            return self.downloader.DownloadReportAsStream(
+                json_report_definition, skip_report_header=True, skip_column_header=True,
+                skip_report_summary=True, include_zero_impressions=zero_impressions)
 
-    @retry(stop_max_attempt_number=3, wait_random_min=5000, wait_random_max=10000)
+    @retried
     def _download(self, json_report_definition, zero_impressions):
         logger.info("Downloading report.")
-        downloader = self.client.downloader
-        response = downloader.DownloadReportAsString(
-            json_report_definition, skip_report_header=True, skip_column_header=True,
-            skip_report_summary=True, include_zero_impressions=zero_impressions)
+        labels = dict(account=self.id, report_type=json_report_definition["reportType"])
+        with self.instrumentation.span("download", **labels):
+            response = self.downloader.DownloadReportAsString(
+                json_report_definition, skip_report_header=True, skip_column_header=True,
+                skip_report_summary=True, include_zero_impressions=zero_impressions)
+        if self.instrumentation.enabled:
+            # bytes as transferred, like those of compressed downloads, not characters of the decoded report
+            self.instrumentation.count("bytes", len(response.encode("utf-8")), **labels)
         return response
 
+    @retried
+    def _download_compressed(self, report_definition, zero_impressions, parser="pandas"):
+        """ the report is decompressed while it's parsed, so the decompressed csv is never kept in memory """
+        logger.info("Downloading compressed report.")
+        labels = dict(account=self.id, report_type=report_definition.report_type)
+        with self.instrumentation.span("download", **labels):
+            stream = self.downloader.DownloadReportAsStream(
+                self._transfer_definition(report_definition), skip_report_header=True, skip_column_header=True,
+                skip_report_summary=True, include_zero_impressions=zero_impressions)
+        metered = self.instrumentation.meter(stream)
+        start = time.time()
+        try:
+            return self._read_csv(gzip.GzipFile(fileobj=metered), report_definition, parser)
+        finally:
+            stream.close()
+            if metered is not stream:
+                self._record_transfer(metered, labels, seconds=time.time() - start)
+
+    def _download_report(self, report_definition, zero_impressions, convert_money, parser="pandas"):
+        labels = dict(account=self.id, report_type=report_definition.report_type)
+        if self._is_compressed(report_definition):
+            report = self._download_compressed(report_definition, zero_impressions, parser)
+        else:
+            response = self._download(report_definition.raw, zero_impressions)
+            with self.instrumentation.span("parse", **labels):
+                report = self._read_csv(response, report_definition, parser)
+        self.instrumentation.count("rows", len(report), **labels)
+        if convert_money:
+            report = self._convert_money(report, report_definition)
+        return report
+
+    def _aggregate_report(self, report_definition, zero_impressions, aggregate):
+        """ folds the chunks of a streamed report into the aggregate, so rows are released after each chunk """
+        report = None
+        for chunk in self.download_chunks(report_definition, zero_impressions, chunksize=aggregate.chunksize):
+            report = aggregate.fold(report, chunk)
+        return aggregate.merge([report])
+
+    def _record_transfer(self, metered, labels, seconds=None):
+        """ splits the seconds spent reading a metered stream into transfer (waiting for the network) and parse """
+        self.instrumentation.timing("transfer", metered.seconds, **labels)
+        if seconds is not None:
+            self.instrumentation.timing("parse", max(seconds - metered.seconds, 0.), **labels)
+        self.instrumentation.count("bytes", metered.bytes, **labels)
+
+    def _is_compressed(self, report_definition):
+        if report_definition.download_format == "GZIPPED_CSV":
+            return True
+        return self.client.compress and hasattr(self.downloader, "DownloadReportAsStream")
+
+    def _transfer_definition(self, report_definition):
+        """
+        :return: dict, raw report definition with the download format that is actually used
+        """
+        if not self._is_compressed(report_definition):
+            return report_definition.raw
+        return dict(report_definition.raw, downloadFormat="GZIPPED_CSV")
+
+    def _read_csv(self, data, report_definition, parser="pandas", **kwargs):
+        """ parses a headless csv report with the dtypes known to the field registry of the client """
+        header = report_definition.raw["selector"]["fields"]
+        dtypes = self.client.field_registry.dtypes(report_definition.report_type, header)
+        return read_csv(data, header, dtypes, parser, **kwargs)
+
+    def _convert_money(self, report, report_definition):
+        """ converts all money fields of a report from micro amounts to regular amounts
+        :param report: DataFrame, which is changed in place, or pyarrow.Table
+        :return: the converted report
+        """
+        is_frame = isinstance(report, pd.DataFrame)
+        columns = report.columns if is_frame else report.column_names
+        money_fields = self.client.field_registry.fields_of_type(report_definition.report_type, columns, "Money")
+        if not is_frame:
+            return micro_to_reg_arrow(report, money_fields)
+        for field in money_fields:
+            report[field] = micro_to_reg(report[field])
+        return report
+
     @staticmethod
     def parse_labels(ad_account):
         if "accountLabels" in ad_account:
@@ -0,0 +1,108 @@
+from adwords_reports.storage import account_key
+
+
+class AccountNode:
+    def __init__(self, account, is_manager):
+        self.account = account
+        self.is_manager = is_manager
+        self.parent = None
+        self.children = list()
+
+    def walk(self):
+        """
+        :return: generator with this node and all nodes below it, depth first
+        """
+        yield self
+        for child in self.children:
+            for node in child.walk():
+                yield node
+
+    def __repr__(self):
+        return "{name} ({id})".format(name=self.account.name, id=self.account.id)
+
+
+class AccountHierarchy:
+    """ Tree of accounts as described by the links of ManagedCustomerService.
+    Nested MCCs are nodes with children, all other accounts are leaves.
+    """
+    def __init__(self, root_id):
+        self.root_id = self._normalize(root_id)
+        self.nodes = dict()
+        self._links = list()
+        self._resolved = set()
+
+    def add_account(self, account, is_manager):
+        self.nodes[self._normalize(account.id)] = AccountNode(account, is_manager)
+
+    def add_link(self, manager_id, client_id):
+        self._links.append((self._normalize(manager_id), self._normalize(client_id)))
+
+    @property
+    def root(self):
+        """
+        :return: AccountNode of the top level account or None if it's not part of the listing
+        """
+        self._connect()
+        return self.nodes.get(self.root_id)
+
+    def roots(self):
+        """
+        :return: list of AccountNodes without parent
+        """
+        self._connect()
+        return [node for node in self.nodes.values() if node.parent is None]
+
+    def accounts(self):
+        """
+        :return: generator with the Accounts of all leaves, i.e. accounts that can be downloaded
+        """
+        for root in self.roots():
+            for node in root.walk():
+                if not node.is_manager:
+                    yield node.account
+
+    def managers(self):
+        """
+        :return: generator with the Accounts of all MCCs
+        """
+        for node in self.nodes.values():
+            if node.is_manager:
+                yield node.account
+
+    def resolve(self, complete=False):
+        """ Nodes are resolved once their path to the root is known, so they're returned after their manager.
+        Used to hand out accounts while the pages of the listing are still arriving.
+        :param complete: bool, all accounts and links arrived, the remaining nodes are resolved below
+            the roots of the listing
+        :return: list of AccountNodes that weren't resolved before
+        """
+        self._connect()
+        resolved = list()
+        for node_id, node in self.nodes.items():
+            if node in self._resolved:
+                continue
+            if node_id == self.root_id or (node.parent is None and complete) or node.parent in self._resolved:
+                for descendant in node.walk():
+                    if descendant not in self._resolved:
+                        self._resolved.add(descendant)
+                        resolved.append(descendant)
+        return resolved
+
+    def _connect(self):
+        """ links are applied lazily, since they may arrive before the accounts they refer to """
+        unresolved = list()
+        for manager_id, client_id in self._links:
+            manager, client = self.nodes.get(manager_id), self.nodes.get(client_id)
+            if manager is None or client is None:
+                unresolved.append((manager_id, client_id))
+            elif client.parent is None:
+                client.parent = manager
+                manager.children.append(client)
+        self._links = unresolved
+
+    @staticmethod
+    def _normalize(account_id):
+        return int(account_key(account_id))
+
+    def __len__(self):
+        return len(self.nodes)
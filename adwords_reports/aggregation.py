@@ -0,0 +1,54 @@
+import pandas as pd
+
+
+class Agg:
+    """ A group-by with sums that is computed while a report is streamed, so only its groups are kept in memory.
+    Chunks are folded into a running result, and partial results, e.g. of date ranges or accounts,
+    are merged the same way, since sums of sums are sums:
+        Agg(by=["CampaignId", "Date"], sums=["Impressions", "Clicks", "Cost"])
+    """
+    def __init__(self, by, sums, chunksize=100000):
+        """
+        :param by: list of str, fields to group by
+        :param sums: list of str, fields that are summed per group, e.g. metrics like Clicks or Cost
+        :param chunksize: int, number of rows that are parsed before they're folded into the result
+        """
+        self.by = list(by)
+        self.sums = list(sums)
+        self.chunksize = chunksize
+
+    @property
+    def fields(self):
+        return self.by + self.sums
+
+    def check(self, report_definition):
+        """ the report has to contain all fields of the aggregation """
+        missing = [field for field in self.fields if field not in report_definition.fields]
+        assert not missing, "Fields {} of the aggregation aren't in the report definition.".format(missing)
+
+    def fold(self, result, chunk):
+        """
+        :param result: DataFrame, the result so far or None
+        :param chunk: DataFrame, rows of a report
+        :return: DataFrame with the groups of both
+        """
+        return self.merge([result, self._group(chunk[self.fields])])
+
+    def merge(self, results):
+        """
+        :param results: iterable of DataFrames with the columns of fields, e.g. aggregated reports, or None
+        :return: DataFrame, one row per group sorted by the by fields
+        """
+        results = [result for result in results if result is not None]
+        if not results:
+            return pd.DataFrame(columns=self.fields)
+        if len(results) == 1:
+            return results[0]
+        return self._group(pd.concat(results, ignore_index=True))
+
+    def _group(self, report):
+        # observed, so categorical fields don't produce all combinations of their categories
+        return report.groupby(self.by, observed=True)[self.sums].sum().reset_index()
+
+    def __repr__(self):
+        return "Agg(by={}, sums={})".format(self.by, self.sums)
@@ -0,0 +1,236 @@
+"""
+asyncio counterparts of Client and Account for services that run an event loop, needs python 3.6+.
+
+googleads is blocking, so each single attempt of an API call runs in a thread of an executor. Waiting for
+rate limits and between retries happens in the event loop and doesn't occupy a thread. Further requests
+of one call, e.g. the sub-reports of split_by, take their tokens from the same rate limiter in their threads.
+A semaphore bounds the number of calls in flight, so thousands of downloads can be awaited at once while
+only max_concurrency of them use a connection. Cancelling a task stops it at its next await, an attempt that
+already runs in a thread finishes there and its result is dropped.
+"""
+import copy
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from adwords_reports import logger
+from adwords_reports.account import Account
+from adwords_reports.client import Client, DEFAULT_PAGE_SIZE
+from adwords_reports.rate_limit import RetryPolicy
+
+
+class AsyncClient:
+    """ Wraps a Client and takes over its retries and rate limiting:
+        client = await AsyncClient.connect(credentials_path)
+        async for account in client.accounts():
+            report = await account.download(report_definition, zero_impressions=True)
+    """
+    def __init__(self, client, max_concurrency=8, executor=None):
+        """
+        :param client: Client, its retry policy and rate limiter are used by the AsyncClient.
+            A copy of it makes single attempts, the client itself is left as it is.
+        :param max_concurrency: int, number of API calls that run at the same time
+        :param executor: concurrent.futures.Executor that runs the blocking calls,
+            defaults to a thread pool with max_concurrency threads
+        """
+        self.max_concurrency = max_concurrency
+        self.retry_policy = client.retry_policy
+        self.rate_limiter = client.rate_limiter
+        # shares the session and caches of the client, but retries and waits only in the event loop
+        self.client = copy.copy(client)
+        self.client.retry_policy = RetryPolicy(max_attempts=1)
+        self._admitted = _AdmittedRateLimiter(self.rate_limiter)
+        self.client.rate_limiter = self._admitted
+
+        self._executor = executor or ThreadPoolExecutor(max_concurrency)
+        self._owns_executor = executor is None
+        self._semaphore = None  # created in the event loop that uses it
+
+    @classmethod
+    async def connect(cls, credentials_path, max_concurrency=8, executor=None, retry_policy=None, rate_limiter=None,
+                      **client_options):
+        """ authenticates without blocking the event loop
+        :param credentials_path: str, path to the googleads .yaml file
+        :param max_concurrency: int, see __init__
+        :param executor: concurrent.futures.Executor, see __init__
+        :param retry_policy: RetryPolicy, how failed API calls are retried
+        :param rate_limiter: RateLimiter, shared by all API calls of this client and its accounts
+        :param client_options: further arguments of Client
+        :return: AsyncClient
+        """
+        def init_client():
+            return Client(credentials_path, retry_policy=retry_policy, rate_limiter=rate_limiter, **client_options)
+
+        loop = asyncio.get_event_loop()
+        client = await loop.run_in_executor(executor, init_client)
+        return cls(client, max_concurrency, executor)
+
+    async def accounts(self, page_size=DEFAULT_PAGE_SIZE):
+        """ Accounts are returned as soon as their page arrives, the pages after the first one are requested
+        at the same time.
+        :param page_size: int, number of accounts per page
+        :return: async generator with AsyncAccounts sorted by name
+        """
+        logger.info("Getting accounts.")
+        service = "ManagedCustomerService"
+        first_page = await self.call(self.client._get_page, self.client._paged(Account.SELECTOR, 0, page_size),
+                                     service)
+        pages = [asyncio.ensure_future(self.call(self.client._get_page,
+                                                 self.client._paged(Account.SELECTOR, start_index, page_size), service))
+                 for start_index in range(page_size, first_page["totalNumEntries"], page_size)]
+        try:
+            has_entries = False
+            for page in [first_page] + pages:
+                if asyncio.isfuture(page):
+                    page = await page
+                for ad_account in page["entries"] if "entries" in page else list():
+                    has_entries = True
+                    yield AsyncAccount(self, Account.from_ad_account(client=self.client, ad_account=ad_account))
+            if not has_entries:
+                raise LookupError("Nothing matches the selector.")
+        finally:
+            for page in pages:
+                page.cancel()
+
+    async def download_all(self, report_definition, zero_impressions, max_pending=None, **options):
+        """ Downloads a report for all accounts.
+        :param report_definition: ReportDefinition
+        :param zero_impressions: bool
+        :param max_pending: int, number of downloads that are started before their reports are consumed,
+            defaults to twice max_concurrency. Bounds the memory of reports that wait for a slow consumer.
+        :param options: further arguments of Account.download, e.g. convert_money
+        :return: async generator with (AsyncAccount, DataFrame) tuples in completion order
+        """
+        max_pending = max_pending or 2 * self.max_concurrency
+
+        async def download(account):
+            return account, await account.download(report_definition, zero_impressions, **options)
+
+        pending = set()
+        try:
+            async for account in self.accounts():
+                pending.add(asyncio.ensure_future(download(account)))
+                if len(pending) >= max_pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, func, *args, customer_id=None, **kwargs):
+        """ Calls a blocking function in the executor and retries it without blocking the event loop.
+        Every attempt waits for the rate limiter and the semaphore. Its token admits the first request of func,
+        further ones wait for the rate limiter in their threads.
+        :param func: callable
+        :param args: positional arguments of func
+        :param customer_id: str, rate limiting scope
+        :param kwargs: keyword arguments of func
+        :return: the result of func
+        """
+        loop = asyncio.get_event_loop()
+        developer_token = self.client.developer_token
+        attempt = 0
+        while True:
+            await self._acquire(developer_token, customer_id)
+            try:
+                async with self.semaphore:
+                    return await loop.run_in_executor(self._executor, functools.partial(
+                        self._admitted.admitted, func, *args, **kwargs))
+            except Exception as error:
+                wait = self.retry_policy.wait_after(error, attempt, self.rate_limiter, developer_token, customer_id)
+                if wait is None:
+                    raise
+                logger.info("Attempt {} failed, retrying in {:.1f} seconds: {}".format(attempt + 1, wait, error))
+                self.client.instrumentation.count("retries", method=getattr(func, "__name__", None),
+                                                  account=customer_id, error=type(error).__name__)
+                await asyncio.sleep(wait)
+                attempt += 1
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def close(self):
+        """ shuts down the executor if it was created by the client """
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    async def _acquire(self, developer_token, customer_id=None):
+        for bucket in self.rate_limiter.buckets(developer_token, customer_id):
+            wait = bucket.take()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = bucket.take()
+
+
+class _AdmittedRateLimiter:
+    """ Rate limiter of the Client copy of an AsyncClient. The first request in the thread of a call uses the token
+    the call took in the event loop, all others take one from the shared rate limiter.
+    """
+    def __init__(self, rate_limiter):
+        """
+        :param rate_limiter: RateLimiter of the AsyncClient
+        """
+        self.rate_limiter = rate_limiter
+        self._local = threading.local()
+
+    def admitted(self, func, *args, **kwargs):
+        """ calls func with the token its call already took """
+        self._local.admitted = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.admitted = False
+
+    def acquire(self, developer_token, customer_id=None, sleep=time.sleep):
+        if getattr(self._local, "admitted", False):
+            self._local.admitted = False
+            return
+        self.rate_limiter.acquire(developer_token, customer_id, sleep)
+
+    def __getattr__(self, name):
+        return getattr(self.rate_limiter, name)
+
+
+class AsyncAccount:
+    """ Account whose downloads are awaited. Each one gets its own customer-scoped session,
+    so downloads of many accounts can overlap.
+    """
+    def __init__(self, client, account):
+        """
+        :param client: AsyncClient
+        :param account: Account
+        """
+        self.client = client
+        self.account = account
+        self.id = account.id
+        self.name = account.name
+        self.currency = account.currency
+        self.time_zone = account.time_zone
+        self.labels = account.labels
+        self._isolated = False
+
+    async def download(self, report_definition, zero_impressions, **options):
+        """ Downloads a report, see Account.download
+        :param report_definition: ReportDefinition
+        :param zero_impressions: bool
+        :param options: further arguments of Account.download, e.g. convert_money or aggregate
+        :return: DataFrame or pyarrow.Table
+        """
+        if not self._isolated:
+            await self.client.call(self.account.isolate_session, customer_id=self.id)
+            self._isolated = True
+        return await self.client.call(self.account.download, report_definition, zero_impressions,
+                                      customer_id=self.id, **options)
+
+    def __repr__(self):
+        return repr(self.account)
@@ -1,11 +1,28 @@
-from retrying import retry
+import os
+import copy
+import tempfile
+import threading
+
+import suds.cache
 from googleads import adwords
 
 from adwords_reports import logger
 from adwords_reports.account import Account
+from adwords_reports.account_hierarchy import AccountHierarchy
+from adwords_reports.field_metadata import FieldMetadataCache, serialize
+from adwords_reports.instrumentation import Instrumentation
+from adwords_reports.micro_amounts import micro_to_reg
+from adwords_reports.parallel import imap, imap_unordered
+from adwords_reports.rate_limit import RateLimiter, RetryPolicy, retried
+from adwords_reports.scheduling import schedule
+from adwords_reports.report_fields import FieldRegistry
+from adwords_reports.transport import PooledReportDownloader, TokenCache
 
 
 DEFAULT_API_VERSION = "v201802"
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_WSDL_CACHE_DIR = os.path.join(tempfile.gettempdir(), "adwords_reports_wsdl")
+DEFAULT_FIELD_CACHE_DIR = os.path.join(tempfile.gettempdir(), "adwords_reports_fields")
 
 
 class Client:
@@ -13,29 +30,239 @@ class Client:
     Most important functionality:
         - Initiate API connection using credentials
         - Generator for accounts matching the account selector in project _config
+        - Account hierarchy of the top level account
         - Download reports
     """
-    def __init__(self, credentials_path, api_version=DEFAULT_API_VERSION):
+    def __init__(self, credentials_path, api_version=DEFAULT_API_VERSION, cache=None,
+                 retry_policy=None, rate_limiter=None, wsdl_cache_dir=DEFAULT_WSDL_CACHE_DIR, wsdl_cache_days=30,
+                 adwords_client=None, compress=True, parser="pandas", instrumentation=None,
+                 field_cache_dir=DEFAULT_FIELD_CACHE_DIR, validate_definitions=True, account_stats=None,
+                 schedule_fallback="first", transport=None):
+        """
+        :param credentials_path: str, path to the googleads .yaml file
+        :param api_version: str
+        :param cache: ReportCache, downloaded reports are stored in and loaded from it
+        :param retry_policy: RetryPolicy, how failed API calls are retried
+        :param rate_limiter: RateLimiter, shared by all API calls of this client and its accounts
+        :param wsdl_cache_dir: str, parsed WSDLs and schemas are cached here across processes. None to disable.
+        :param wsdl_cache_days: int, days until cached WSDLs are parsed again
+        :param adwords_client: AdWordsClient, already authenticated client that is used instead of credentials_path
+        :param compress: bool, reports are transferred as gzipped csv and decompressed while they're parsed
+        :param parser: str, default csv parser of downloads, one of parsers.PARSERS
+        :param instrumentation: Instrumentation, receives timings and counters of all API calls. Disabled if None.
+        :param field_cache_dir: str, report fields of ReportDefinitionService are cached here per API version.
+            None to keep them in memory only.
+        :param validate_definitions: bool, report definitions are checked against the report fields
+            before they're downloaded, see ReportDefinition.validate
+        :param account_stats: AccountStats, durations of past downloads. If given, downloads are recorded in it
+            and parallel runs start with the accounts that took longest, see scheduling.schedule
+        :param schedule_fallback: str, "first" or "last", where accounts without stats are scheduled
+        :param transport: PooledTransport, keep-alive connections shared by report downloads and SOAP services
+            of all threads, whose OAuth2 access tokens are cached until they expire.
+            None to let googleads open a connection per request.
+        """
         # caution, don't change the order of these attributes
-        self._client = self._authenticate(credentials_path)
+        self.instrumentation = instrumentation or Instrumentation()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self._client = None  # not authenticated yet, see developer_token
+        self._client = adwords_client or self._authenticate(credentials_path)
+        self.transport = transport
+        if transport is not None:
+            # sessions are copies of this client, so they share the token
+            self._client.oauth2_client = TokenCache(self._client.oauth2_client)
         self.top_level_account_id = self._client.client_customer_id
         self.api_version = api_version
+        if wsdl_cache_dir is not None:
+            self._client.cache = suds.cache.ObjectCache(location=wsdl_cache_dir, days=wsdl_cache_days)
+        # suds proxies aren't thread-safe, so each thread gets its own ones
+        self._services = threading.local()
 
+        # listing accounts must not be affected by the selection of an account
+        self._top_level_session = copy.copy(self._client)
         self.downloader = self._init_report_downloader()
+        self.field_registry = FieldRegistry()
+        self.cache = cache
+        self.compress = compress
+        self.parser = parser
+        self.validate_definitions = validate_definitions
+        self.field_cache = None if field_cache_dir is None else FieldMetadataCache(field_cache_dir, api_version)
+        self._report_fields = dict()
+        self._report_fields_lock = threading.Lock()
+        self.account_stats = account_stats
+        self.schedule_fallback = schedule_fallback
 
-    def accounts(self):
+    @classmethod
+    def from_adwords_client(cls, adwords_client, **kwargs):
+        """ wraps an already authenticated googleads AdWordsClient (or a stand-in with the same interface)
+        :param adwords_client: AdWordsClient
+        :param kwargs: further arguments of Client
+        :return: Client
         """
+        return cls(None, adwords_client=adwords_client, **kwargs)
+
+    def accounts(self, max_workers=1):
+        """ Accounts are returned as soon as their page arrives, i.e. before all accounts are listed.
+        :param max_workers: int, number of pages that are requested at the same time
         :return: generator with Account objects sorted by name
         """
-        logger.info("Getting accounts.")
-        ad_accounts = self._get_entries(Account.SELECTOR, service="ManagedCustomerService")
-
-        for ad_account in ad_accounts:
-            account = Account.from_ad_account(client=self, ad_account=ad_account)
+        for account in self._list_accounts(max_workers):
             self.select(account_id=account.id)
             yield account
         self.reset_selection()
 
+    def download_all(self, report_definition, zero_impressions, max_workers=8, max_pending=None, **options):
+        """ Downloads a report for all accounts in parallel.
+        Each account gets its own customer-scoped session, so the shared session isn't touched.
+        :param report_definition: ReportDefinition
+        :param zero_impressions: bool
+        :param max_workers: int, number of accounts that are downloaded at the same time
+        :param max_pending: int, number of downloads that are started before their reports are consumed,
+            defaults to twice max_workers. Bounds the memory of reports that wait for a slow consumer.
+        :param options: further arguments of Account.download, e.g. convert_money
+        :return: generator with (Account, DataFrame) tuples in completion order
+        """
+        def download(account):
+            account.isolate_session()
+            return account, account.download(report_definition, zero_impressions, **options)
+
+        accounts = self.scheduled_accounts(report_definition.report_type)
+        try:
+            for result in imap_unordered(download, accounts, max_workers=max_workers, max_pending=max_pending):
+                yield result
+        finally:
+            if self.account_stats is not None:
+                self.account_stats.save()
+
+    def download_to(self, report_definition, sink, zero_impressions, max_workers=1, **options):
+        """ Downloads a report for all accounts and writes each one to the sink as soon as it arrives.
+        Unlike stacking the reports of all accounts, memory is bounded by the max_workers reports in flight plus
+        the one being written, i.e. by the two largest reports of single accounts for max_workers=1.
+        :param report_definition: ReportDefinition
+        :param sink: object with a write(account, report) method, e.g. one of the sinks module
+        :param zero_impressions: bool
+        :param max_workers: int, number of accounts that are downloaded at the same time
+        :param options: further arguments of Account.download, e.g. convert_money
+        :return: int, number of rows written
+        """
+        n_rows = 0
+        reports = self.download_all(report_definition, zero_impressions, max_workers, max_pending=max_workers,
+                                    **options)
+        for account, report in reports:
+            sink.write(account, report)
+            n_rows += len(report)
+            del report  # release it before the next one arrives
+        self.instrumentation.flush()
+        return n_rows
+
+    def download_aggregated(self, report_definition, aggregate, zero_impressions, max_workers=8, **options):
+        """ Aggregates a report over all accounts, e.g. for rollups of a whole MCC.
+        Each account's report is folded into its groups while it's streamed and merged into the result
+        as soon as it arrives, so memory is bounded by the number of groups instead of rows.
+        :param report_definition: ReportDefinition
+        :param aggregate: Agg
+        :param zero_impressions: bool
+        :param max_workers: int, number of accounts that are downloaded at the same time
+        :param options: further arguments of Account.download, e.g. split_by
+        :return: DataFrame, one row per group
+        """
+        # money is summed in micro amounts over all accounts and converted once
+        convert_money = options.pop("convert_money", False)
+        report = None
+        for _, account_report in self.download_all(report_definition, zero_impressions, max_workers,
+                                                   aggregate=aggregate, **options):
+            report = aggregate.merge([report, account_report])
+        report = aggregate.merge([report])
+        if convert_money:
+            money_fields = self.field_registry.fields_of_type(report_definition.report_type, report.columns, "Money")
+            for field in money_fields:
+                report[field] = micro_to_reg(report[field])
+        return report
+
+    def scheduled_accounts(self, report_type=None):
+        """ Accounts in the order they should be downloaded in parallel.
+        Without account stats, they're listed lazily by name. With them, all accounts are listed first
+        and the ones that took longest in the past are scheduled first.
+        :param report_type: str, None to schedule by all report types
+        :return: iterable of Accounts
+        """
+        if self.account_stats is None:
+            return self._list_accounts()
+        return schedule(self._list_accounts(), self.account_stats, report_type, fallback=self.schedule_fallback)
+
+    def hierarchy(self, max_workers=4):
+        """ Loads the full tree of accounts below the top level account, including nested MCCs.
+        :param max_workers: int, number of pages that are requested at the same time
+        :return: AccountHierarchy
+        """
+        hierarchy = AccountHierarchy(root_id=self.top_level_account_id)
+        for _ in self._load_hierarchy(hierarchy, max_workers):
+            pass
+        return hierarchy
+
+    def iter_hierarchy(self, max_workers=4):
+        """ same as hierarchy, but accounts are returned while the pages are still arriving.
+        A node is returned as soon as its path to the top level account is known, i.e. after its manager.
+        :param max_workers: int, number of pages that are requested at the same time
+        :return: generator with AccountNodes, their parents are set, their children may still grow
+        """
+        return self._load_hierarchy(AccountHierarchy(root_id=self.top_level_account_id), max_workers)
+
+    def _load_hierarchy(self, hierarchy, max_workers):
+        logger.info("Getting account hierarchy.")
+        pages = self._get_pages(Account.HIERARCHY_SELECTOR, "ManagedCustomerService", max_workers=max_workers)
+        for page in pages:
+            for ad_account in page["entries"] if "entries" in page else list():
+                account = Account.from_ad_account(client=self, ad_account=ad_account)
+                hierarchy.add_account(account, is_manager=ad_account["canManageClients"])
+            for link in page["links"] if "links" in page else list():
+                hierarchy.add_link(manager_id=link["managerCustomerId"], client_id=link["clientCustomerId"])
+            for node in hierarchy.resolve():
+                yield node
+        for node in hierarchy.resolve(complete=True):
+            yield node
+
+    def isolated_downloader(self, account_id):
+        """ creates a report downloader with its own session with the scope of this account.
+        :param account_id: str or int
+        :return: ReportDownloader
+        """
+        session = copy.copy(self._client)
+        session.SetClientCustomerId(account_id)
+        return self._init_report_downloader(session)
+
+    def load_report_fields(self, report_type):
+        """ registers the field types of a report type from ReportDefinitionService.
+        Downloaded reports are then parsed with compact dtypes for fields that aren't shipped with this package.
+        :param report_type: str, e.g. KEYWORDS_PERFORMANCE_REPORT
+        """
+        self.report_fields(report_type)
+
+    def report_fields(self, report_type):
+        """ The fields of a report type as returned by ReportDefinitionService.
+        They're requested once per API version and report type, then they're cached in memory and on disk.
+        Their types are registered in the field registry, too.
+        :param report_type: str, e.g. KEYWORDS_PERFORMANCE_REPORT
+        :return: list of dicts, see field_metadata.FIELD_ATTRIBUTES
+        """
+        with self._report_fields_lock:
+            if report_type not in self._report_fields:
+                report_fields = self.field_cache.get(report_type) if self.field_cache is not None else None
+                if report_fields is None:
+                    report_fields = serialize(self._get_report_fields(report_type))
+                    if self.field_cache is not None:
+                        self.field_cache.put(report_type, report_fields)
+                self.field_registry.register(report_type, report_fields)
+                self._report_fields[report_type] = report_fields
+            return self._report_fields[report_type]
+
+    def validate(self, report_definition):
+        """ raises InvalidReportDefinition if the definition can't be downloaded, unless validation is disabled
+        :param report_definition: ReportDefinition
+        """
+        if self.validate_definitions:
+            report_definition.validate(self.report_fields(report_definition.report_type))
+
     def select(self, account_id):
         """ starts a new session with the scope of this account.
         :param account_id: str or int
@@ -46,38 +273,110 @@ class Client:
         """ resets scope to the top level account/mcc used in the .yaml file """
         self.select(self.top_level_account_id)
 
-    def _get_entries(self, selector, service):
+    @property
+    def developer_token(self):
+        return getattr(self._client, "developer_token", None)
+
+    @property
+    def rate_limit_scope(self):
+        """ (developer token, customer id) for rate limiting, calls of the client count for the token only """
+        return self.developer_token, None
+
+    def _list_accounts(self, max_workers=1):
+        logger.info("Getting accounts.")
+        ad_accounts = self._iter_entries(Account.SELECTOR, service="ManagedCustomerService", max_workers=max_workers)
+        for ad_account in ad_accounts:
+            yield Account.from_ad_account(client=self, ad_account=ad_account)
+
+    def _get_entries(self, selector, service, max_workers=1):
         """
         :param selector: nested dict that describes what is requested
         :param service: str, identifying adwords service that is responsible
-        :return: adwords page object
+        :param max_workers: int, number of pages that are requested at the same time
+        :return: list of entries of all pages
         """
-        page = self._get_page(selector, service)
-        if "entries" not in page:
+        return list(self._iter_entries(selector, service, max_workers))
+
+    def _iter_entries(self, selector, service, max_workers=1):
+        """ same as _get_entries, but entries are returned as soon as their page arrives """
+        has_entries = False
+        for page in self._get_pages(selector, service, max_workers):
+            if "entries" in page:
+                has_entries = True
+                for entry in page["entries"]:
+                    yield entry
+        if not has_entries:
             raise LookupError("Nothing matches the selector.")
-        return page["entries"]
 
-    @retry(stop_max_attempt_number=3, wait_random_min=5000, wait_random_max=10000)
+    def _get_pages(self, selector, service, max_workers=1, page_size=DEFAULT_PAGE_SIZE):
+        """ The first page tells how many entries there are. The remaining pages are requested concurrently.
+        :param selector: nested dict that describes what is requested
+        :param service: str, identifying adwords service that is responsible
+        :param max_workers: int, number of pages that are requested at the same time
+        :param page_size: int, number of entries per page
+        :return: generator with adwords page objects in order
+        """
+        first_page = self._get_page(self._paged(selector, 0, page_size), service)
+        yield first_page
+
+        start_indices = range(page_size, first_page["totalNumEntries"], page_size)
+        selectors = (self._paged(selector, start_index, page_size) for start_index in start_indices)
+        for page in imap(lambda s: self._get_page(s, service), selectors, max_workers=max_workers):
+            yield page
+
+    @staticmethod
+    def _paged(selector, start_index, page_size):
+        paged_selector = copy.deepcopy(selector)
+        paged_selector["paging"] = {"startIndex": start_index, "numberResults": page_size}
+        return paged_selector
+
+    @retried
     def _get_page(self, selector, service):
         """
         :param selector: nested dict that describes what is requested
         :param service: str, identifying adwords service that is responsible
         :return: adwords page object
         """
-        service_object = self._init_service(service)
-        return service_object.get(selector)
+        service_object = self._get_service(service, session=self._top_level_session)
+        with self.instrumentation.span("listing", service=service):
+            return service_object.get(selector)
+
+    @retried
+    def _get_report_fields(self, report_type):
+        logger.info("Getting fields of {}.".format(report_type))
+        service_object = self._get_service("ReportDefinitionService")
+        return service_object.getReportFields(report_type)
+
+    def _get_service(self, service_name, session=None):
+        """ same as _init_service, but proxies are reused per thread """
+        session = session or self._client
+        if not hasattr(self._services, "proxies"):
+            self._services.proxies = dict()
+
+        key = (service_name, self.api_version, id(session))
+        if key not in self._services.proxies:
+            self._services.proxies[key] = self._init_service(service_name, session)
+        return self._services.proxies[key]
 
-    @retry(stop_max_attempt_number=3, wait_random_min=5000, wait_random_max=10000)
-    def _init_service(self, service_name):
+    @retried
+    def _init_service(self, service_name, session=None):
         logger.info("Initiating {}".format(service_name))
-        return self._client.GetService(service_name, version=self.api_version)
+        session = session or self._client
+        with self.instrumentation.span("service_init", service=service_name):
+            service = session.GetService(service_name, version=self.api_version)
+        return service if self.transport is None else self.transport.attach(service)
 
-    @retry(stop_max_attempt_number=3, wait_random_min=5000, wait_random_max=10000)
-    def _init_report_downloader(self):
+    @retried
+    def _init_report_downloader(self, session=None):
         logger.info("Initiating ReportDownloader.")
-        return self._client.GetReportDownloader(version=self.api_version)
+        session = session or self._client
+        with self.instrumentation.span("service_init", service="ReportDownloader"):
+            if self.transport is not None:
+                return PooledReportDownloader(self.transport, session, self.api_version)
+            return session.GetReportDownloader(version=self.api_version)
 
-    @retry(stop_max_attempt_number=3, wait_random_min=5000, wait_random_max=10000)
+    @retried
     def _authenticate(self, credentials_path):
         logger.info("Initiating Client.")
-        return adwords.AdWordsClient.LoadFromStorage(credentials_path)
+        with self.instrumentation.span("auth"):
+            return adwords.AdWordsClient.LoadFromStorage(credentials_path)
@@ -0,0 +1,188 @@
+import json
+import collections
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from adwords_reports.report_definition import ReportDefinition
+
+# operators of predicates that can be evaluated on a downloaded report as well as by the API
+LOCAL_OPERATORS = (
+    "EQUALS", "NOT_EQUALS", "IN", "NOT_IN",
+    "GREATER_THAN", "GREATER_THAN_EQUALS", "LESS_THAN", "LESS_THAN_EQUALS",
+    "STARTS_WITH", "STARTS_WITH_IGNORE_CASE", "CONTAINS", "CONTAINS_IGNORE_CASE",
+    "DOES_NOT_CONTAIN", "DOES_NOT_CONTAIN_IGNORE_CASE"
+)
+# comparing fields of other types, e.g. Ctr formatted as "1.23%", would compare strings
+COMPARISON_OPERATORS = ("GREATER_THAN", "GREATER_THAN_EQUALS", "LESS_THAN", "LESS_THAN_EQUALS")
+NUMERIC_TYPES = ("Long", "Integer", "Money", "Double", "Ratio")
+
+
+class CoalescedRequest:
+    """ A report definition that is downloaded once on behalf of several requested ones.
+    Each requested report is a projection of the downloaded one, filtered by its remaining predicates.
+    """
+    def __init__(self, report_definition, members):
+        """
+        :param report_definition: ReportDefinition, the one that is downloaded
+        :param members: list of (index, ReportDefinition, list of predicates) tuples,
+            the requested report definitions with their position and the predicates left to evaluate locally
+        """
+        self.report_definition = report_definition
+        self.members = members
+
+    def split(self, report):
+        """
+        :param report: DataFrame, the downloaded report
+        :return: generator with (index, DataFrame) tuples, one per requested report definition
+        """
+        fields = self.report_definition.fields
+        for index, report_definition, predicates in self.members:
+            if len(self.members) == 1 and not predicates and report_definition.fields == fields:
+                yield index, report
+            else:
+                mask = evaluate(report, predicates)
+                yield index, report.loc[mask, report_definition.fields].reset_index(drop=True)
+
+
+def coalesce(report_definitions, field_registry):
+    """ Merges report definitions that can be answered by a single download.
+    They need the same report type, date range, download format and segments, since segments split rows.
+    Attributes and metrics are merged, predicates that all of them share are pushed down to the API
+    and the others are evaluated locally. Definitions whose predicates can't be evaluated locally,
+    e.g. on enums, whose values are formatted differently in reports, are downloaded on their own.
+    :param report_definitions: list of ReportDefinitions
+    :param field_registry: FieldRegistry, knows which fields are segments
+    :return: list of CoalescedRequests
+    """
+    groups = collections.OrderedDict()
+    for index, report_definition in enumerate(report_definitions):
+        report_type = report_definition.report_type
+        segments = frozenset(f for f in report_definition.fields if field_registry.is_segment(report_type, f))
+        key = (report_type, report_definition.date_min, report_definition.date_max,
+               report_definition.download_format, segments)
+        groups.setdefault(key, list()).append((index, report_definition))
+
+    requests = list()
+    for members in groups.values():
+        requests.extend(_coalesce_group(members, field_registry))
+    return sorted(requests, key=lambda request: request.members[0][0])
+
+
+def evaluate(report, predicates):
+    """ evaluates AdWords predicates on a report
+    :param report: DataFrame
+    :param predicates: list of dicts with field, operator and values, see LOCAL_OPERATORS
+    :return: boolean Series, True for rows that match all predicates
+    """
+    mask = pd.Series(True, index=report.index)
+    for predicate in predicates:
+        values = predicate["values"] if isinstance(predicate["values"], (list, tuple)) else [predicate["values"]]
+        matches = _evaluate(report[predicate["field"]], predicate["operator"], values)
+        mask &= matches.fillna(False).astype(bool)
+    return mask
+
+
+def _coalesce_group(members, field_registry):
+    """ members may only be merged if their predicates that aren't pushed down can be evaluated locally.
+    Removing a member can change the predicates all others share, so this is repeated until it's stable.
+    """
+    separate = list()
+    while len(members) > 1:
+        common = _common_predicates([report_definition for _, report_definition in members])
+        mergeable = [(index, report_definition) for index, report_definition in members
+                     if _is_local(report_definition, common, field_registry)]
+        if len(mergeable) == len(members):
+            break
+        separate.extend(member for member in members if member not in mergeable)
+        members = mergeable
+
+    if len(members) > 1:
+        requests = [_merge(members, common)]
+    else:
+        requests, separate = list(), separate + members
+    for index, report_definition in separate:
+        requests.append(CoalescedRequest(report_definition, [(index, report_definition, list())]))
+    return requests
+
+
+def _merge(members, common):
+    fields = list()
+    member_predicates = list()
+    for index, report_definition in members:
+        local = [p for p in report_definition.predicates or list() if _key(p) not in common]
+        member_predicates.append((index, report_definition, local))
+        for field in report_definition.fields + [p["field"] for p in local]:
+            if field not in fields:
+                fields.append(field)
+
+    first = members[0][1]
+    predicates = [p for p in first.predicates or list() if _key(p) in common]
+    merged = ReportDefinition(first.report_type, fields, predicates=predicates or None,
+                              date_from=first.date_min, date_to=first.date_max,
+                              download_format=first.download_format)
+    return CoalescedRequest(merged, member_predicates)
+
+
+def _common_predicates(report_definitions):
+    """
+    :return: set of serialized predicates that all report definitions share
+    """
+    keys = [set(_key(p) for p in report_definition.predicates or list()) for report_definition in report_definitions]
+    return set.intersection(*keys)
+
+
+def _is_local(report_definition, common, field_registry):
+    """ whether the predicates that aren't shared can be evaluated on the merged report """
+    report_type = report_definition.report_type
+    for predicate in report_definition.predicates or list():
+        if _key(predicate) in common:
+            continue
+        field, operator = predicate["field"], predicate["operator"]
+        field_type = field_registry.field_type(report_type, field)
+        if operator not in LOCAL_OPERATORS or field_type == "Enum":
+            return False
+        if operator in COMPARISON_OPERATORS and field_type not in NUMERIC_TYPES:
+            return False
+        # filtering on a segment that isn't selected would need rows that are split by it
+        if field_registry.is_segment(report_type, field) and field not in report_definition.fields:
+            return False
+    return True
+
+
+def _key(predicate):
+    return json.dumps(predicate, sort_keys=True, default=str)
+
+
+def _evaluate(column, operator, values):
+    if is_numeric_dtype(column.dtype):
+        values = [float(value) for value in values]
+    else:
+        column = column.astype(object).where(column.notna(), "").astype(str)
+        values = [str(value) for value in values]
+
+    if operator == "EQUALS":
+        return column == values[0]
+    if operator == "NOT_EQUALS":
+        return column != values[0]
+    if operator == "IN":
+        return column.isin(values)
+    if operator == "NOT_IN":
+        return ~column.isin(values)
+    if operator == "GREATER_THAN":
+        return column > values[0]
+    if operator == "GREATER_THAN_EQUALS":
+        return column >= values[0]
+    if operator == "LESS_THAN":
+        return column < values[0]
+    if operator == "LESS_THAN_EQUALS":
+        return column <= values[0]
+
+    if operator.endswith("_IGNORE_CASE"):
+        column, values = column.str.lower(), [value.lower() for value in values]
+        operator = operator[:-len("_IGNORE_CASE")]
+    if operator == "STARTS_WITH":
+        return column.str.startswith(values[0])
+    if operator == "CONTAINS":
+        return column.str.contains(values[0], regex=False)
+    return ~column.str.contains(values[0], regex=False)
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype, is_integer_dtype
+
+from adwords_reports.micro_amounts import MICRO_FACTOR
+from adwords_reports.report_fields import FIELD_TYPES
+
+
+class FxRates:
+    """ Exchange rates into one target currency, either fixed or per day.
+    Daily rates are looked up for each date of a report, dates without a rate, e.g. weekends, use the last
+    rate before them.
+    """
+    def __init__(self, rates, target, currency_column="Currency", date_column="Date", rate_column="Rate"):
+        """
+        :param rates: dict of currency code -> rate, or DataFrame with a row per currency and date.
+            A rate is the amount in the target currency that one unit of the currency is worth.
+        :param target: str, currency code, its rate is always 1
+        :param currency_column: str, column of rates with the currency codes
+        :param date_column: str, column of rates with the dates
+        :param rate_column: str, column of rates with the rates
+        """
+        self.target = target
+        if isinstance(rates, dict):
+            self._fixed = dict(rates, **{target: 1.})
+            self._daily = None
+        else:
+            self._fixed = None
+            daily = rates.pivot_table(index=date_column, columns=currency_column, values=rate_column, aggfunc="last")
+            daily.index = pd.to_datetime(daily.index)
+            daily[target] = 1.
+            self._daily = daily.sort_index()
+
+    @property
+    def daily(self):
+        return self._daily is not None
+
+    def factors(self, currencies, dates=None):
+        """ rates of all rows at once, looked up by the codes of the categories instead of by rows
+        :param currencies: Categorical or Series of currency codes
+        :param dates: Categorical or Series of dates, required for daily rates
+        :return: numpy array of floats, NaN where a rate is missing
+        """
+        currencies = _categorical(currencies)
+        if self._daily is None:
+            rates = np.array([self._fixed.get(currency, np.nan) for currency in currencies.categories] + [np.nan])
+            return rates[currencies.codes]  # code -1, i.e. a missing currency, picks the last rate, NaN
+
+        assert dates is not None, "Daily rates need the dates of the report."
+        dates = _categorical(dates)
+        days = pd.to_datetime(dates.categories)
+        # the last rate of each currency on or before each day of the report
+        daily = self._daily.reindex(self._daily.index.union(days)).ffill().reindex(days)
+        rates = daily.reindex(columns=currencies.categories).to_numpy(dtype="float64")
+        rates = np.pad(rates, ((0, 1), (0, 1)), constant_values=np.nan)
+        return rates[dates.codes, currencies.codes]
+
+
+def convert(report, rates, fields=None, currency_column="AccountCurrencyCode", date_column="Date"):
+    """ Converts money fields of a report that stacks accounts with different currencies into the target currency
+    of the rates, in one vectorized step over all rows. Fields with micro amounts, i.e. integers, are converted
+    to regular amounts on the way, so money can be summed across accounts afterwards.
+    :param report: DataFrame, e.g. of frames.stack, it's changed in place
+    :param rates: FxRates
+    :param fields: list of str, numeric money fields. Defaults to the money fields of report_fields.FIELD_TYPES,
+        e.g. Client.field_registry.fields_of_type knows the ones of a report type.
+    :param currency_column: str, column with the currency code of each row
+    :param date_column: str, column with the date of each row, only used for daily rates
+    :return: DataFrame, the report with regular amounts in the target currency
+    """
+    if fields is None:
+        fields = [field for field in report.columns if FIELD_TYPES.get(field) == "Money"]
+    dates = report[date_column] if rates.daily else None
+    factors = rates.factors(report[currency_column], dates)
+
+    missing = np.isnan(factors)
+    if missing.any():
+        columns = [currency_column] + ([date_column] if rates.daily else list())
+        combinations = report.loc[missing, columns].drop_duplicates().head(10).values.tolist()
+        raise ValueError("Missing exchange rates into {} for {}.".format(rates.target, combinations))
+
+    for field in fields:
+        column = report[field]
+        scale = MICRO_FACTOR if is_integer_dtype(column.dtype) else 1
+        values = column.astype("float64").values  # missing values of Int64 become NaN
+        report[field] = np.round(values * factors / scale, 2)
+    report[currency_column] = pd.Categorical.from_codes(np.zeros(len(report), dtype="int8"), categories=[rates.target])
+    return report
+
+
+def _categorical(values):
+    if isinstance(values, pd.Categorical):
+        return values
+    if isinstance(getattr(values, "dtype", None), CategoricalDtype):
+        return values.values
+    return pd.Categorical(values)
@@ -0,0 +1,74 @@
+import os
+import json
+import time
+import threading
+
+from adwords_reports.rate_limit import soap_value
+from adwords_reports.storage import atomic_write
+
+# attributes of ReportDefinitionField that are kept, see
+# https://developers.google.com/adwords/api/docs/reference/latest/ReportDefinitionService.ReportDefinitionField
+FIELD_ATTRIBUTES = (
+    "fieldName", "fieldType", "fieldBehavior", "canSelect", "canFilter", "enumValues", "exclusiveFields"
+)
+
+
+class FieldMetadataCache:
+    """ Keeps the report fields of ReportDefinitionService on disk, since they only change with the API version:
+        <directory>/<api version>/<report type>.json
+    """
+    def __init__(self, directory, api_version, max_age_days=30):
+        """
+        :param directory: str, is created if it doesn't exist
+        :param api_version: str
+        :param max_age_days: int, days until the fields of a report type are requested again
+        """
+        self.directory = directory
+        self.api_version = api_version
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+
+    def get(self, report_type):
+        """
+        :return: list of dicts or None if the fields aren't cached or too old
+        """
+        path = self._path(report_type)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_days * 24 * 3600:
+                return None
+            with open(path) as fields_file:
+                return json.load(fields_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def put(self, report_type, report_fields):
+        """
+        :param report_type: str
+        :param report_fields: list of dicts, see serialize
+        """
+        path = self._path(report_type)
+        with self._lock, atomic_write(path) as temp_path:
+            with open(temp_path, "w") as fields_file:
+                json.dump(report_fields, fields_file)
+
+    def _path(self, report_type):
+        return os.path.join(self.directory, self.api_version, "{}.json".format(report_type))
+
+
+def serialize(report_fields):
+    """ turns suds ReportDefinitionFields into plain dicts
+    :param report_fields: list of ReportDefinitionFields
+    :return: list of dicts with FIELD_ATTRIBUTES
+    """
+    serialized = list()
+    for report_field in report_fields:
+        field = dict()
+        for attribute in FIELD_ATTRIBUTES:
+            value = soap_value(report_field, attribute)
+            if isinstance(value, (list, tuple)):
+                value = [str(v) for v in value]
+            elif value is not None and not isinstance(value, bool):
+                value = str(value)
+            field[attribute] = value
+        serialized.append(field)
+    return serialized
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype, union_categoricals
+
+from adwords_reports.storage import account_key
+
+
+def concat(reports):
+    """ Stacks reports with the same columns.
+    Unlike pd.concat, categorical columns stay categorical even if their categories differ.
+    :param reports: list of DataFrames or of pyarrow.Tables
+    :return: DataFrame with a new index or pyarrow.Table
+    """
+    if not isinstance(reports[0], pd.DataFrame):
+        import pyarrow as pa
+        return pa.concat_tables(reports).unify_dictionaries()
+
+    report = pd.concat(reports, ignore_index=True)
+    for column in reports[0].columns:
+        parts = [r[column] for r in reports]
+        if all(isinstance(part.dtype, CategoricalDtype) for part in parts) and \
+                not isinstance(report[column].dtype, CategoricalDtype):
+            report[column] = union_categoricals(parts, ignore_order=True)
+    return report
+
+
+def stack(results, account_column="AccountId", currency_column="AccountCurrencyCode"):
+    """ Stacks the reports of several accounts, e.g. of Client.download_all, and adds categorical columns
+    with the id and the currency of each row's account. They cost a byte or two per row and let
+    currency.convert look up exchange rates by category instead of by row.
+    :param results: iterable of (Account, DataFrame) tuples
+    :param account_column: str, name of the first column with the account ids
+    :param currency_column: str, name of the second column with the currency codes
+    :return: DataFrame
+    """
+    accounts, reports = list(), list()
+    for account, report in results:
+        accounts.append(account)
+        reports.append(report)
+    if not reports:
+        return pd.DataFrame(columns=[account_column, currency_column])
+
+    report = concat(reports)
+    lengths = [len(r) for r in reports]
+    for position, (column, values) in enumerate([
+            (account_column, [account_key(account.id) for account in accounts]),
+            (currency_column, [account.currency for account in accounts])]):
+        categories = pd.unique(pd.Series(values)).tolist()
+        codes = np.repeat([categories.index(value) for value in values], lengths)
+        report.insert(position, column, pd.Categorical.from_codes(codes, categories=categories))
+    return report
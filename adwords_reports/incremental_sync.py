@@ -0,0 +1,119 @@
+import os
+import json
+import hashlib
+import datetime
+
+from adwords_reports import logger
+from adwords_reports.frames import concat
+from adwords_reports.storage import account_key, atomic_write, extension, write_frame, read_frame
+
+
+class PartitionStore:
+    """ Stores reports on disk, partitioned by account, report and date range:
+        <directory>/<account prefix><account id>/<report key>/<date_min>_<date_max>.<format>
+    A partition exists only after it was written completely.
+    """
+    def __init__(self, directory, file_format="parquet", account_prefix=""):
+        """
+        :param directory: str, is created if it doesn't exist
+        :param file_format: str, one of storage.FILE_FORMATS
+        :param account_prefix: str, e.g. "account_id=" for hive-style partitions
+        """
+        self.directory = directory
+        self.file_format = file_format
+        self.extension = extension(file_format)
+        self.account_prefix = account_prefix
+
+    @staticmethod
+    def report_key(report_definition, zero_impressions, **options):
+        """ hash of everything that determines the content of a report, except for its date range """
+        raw = report_definition.raw
+        content = {
+            "report_type": raw["reportType"],
+            "selector": {key: value for key, value in raw["selector"].items() if key != "dateRange"},
+            "zero_impressions": zero_impressions,
+            "options": options
+        }
+        serialized = json.dumps(content, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+
+    def has(self, account_id, report_key, report_definition):
+        return os.path.exists(self.path(account_id, report_key, report_definition))
+
+    def read(self, account_id, report_key, report_definition):
+        return read_frame(self.path(account_id, report_key, report_definition), self.file_format)
+
+    def write(self, account_id, report_key, report_definition, report):
+        """
+        :return: str, path of the written partition
+        """
+        path = self.path(account_id, report_key, report_definition)
+        with atomic_write(path) as temp_path:
+            write_frame(report, temp_path, self.file_format)
+        return path
+
+    def partitions(self, account_id, report_key):
+        """
+        :return: list of (date_min, date_max) tuples as str YYYYMMDD of all stored partitions
+        """
+        directory = os.path.join(self.directory, self._account_dir(account_id), report_key)
+        if not os.path.isdir(directory):
+            return list()
+        file_names = [f for f in os.listdir(directory) if f.endswith(self.extension)]
+        return sorted(tuple(f[:-len(self.extension)].split("_")) for f in file_names)
+
+    def path(self, account_id, report_key, report_definition):
+        file_name = "{}_{}{}".format(report_definition.date_min, report_definition.date_max, self.extension)
+        return os.path.join(self.directory, self._account_dir(account_id), report_key, file_name)
+
+    def _account_dir(self, account_id):
+        return self.account_prefix + account_key(account_id)
+
+
+class IncrementalSync:
+    """ Downloads only the partitions of a date range that aren't stored locally yet.
+    Since AdWords keeps updating recent data (e.g. because of conversion lag),
+    partitions within the last refetch_days are downloaded again on every run.
+    """
+    def __init__(self, store, by="day", refetch_days=3):
+        """
+        :param store: PartitionStore
+        :param by: str, partition size, one of report_definition.SPLIT_PERIODS
+        :param refetch_days: int, partitions ending within this many days before today are always downloaded
+        """
+        self.store = store
+        self.by = by
+        self.refetch_days = refetch_days
+
+    def download(self, account, report_definition, zero_impressions, convert_money=False):
+        """ Same as Account.download, but the report is assembled from local partitions.
+        :param account: Account
+        :param report_definition: ReportDefinition
+        :param zero_impressions: bool
+        :param convert_money: bool, convert money fields like Cost from micro amounts to regular amounts
+        :return: DataFrame
+        """
+        self.sync(account, report_definition, zero_impressions, convert_money)
+
+        report_key = self.store.report_key(report_definition, zero_impressions, convert_money=convert_money)
+        reports = [self.store.read(account.id, report_key, partition)
+                   for partition in report_definition.split(self.by)]
+        return concat(reports)
+
+    def sync(self, account, report_definition, zero_impressions, convert_money=False):
+        """ Downloads and stores all partitions that are missing or recent.
+        :return: list of ReportDefinitions, the partitions that were downloaded
+        """
+        report_key = self.store.report_key(report_definition, zero_impressions, convert_money=convert_money)
+        outdated = [partition for partition in report_definition.split(self.by)
+                    if self._is_recent(partition) or not self.store.has(account.id, report_key, partition)]
+
+        logger.info("Syncing {} partitions.".format(len(outdated)))
+        for partition in outdated:
+            report = account.download(partition, zero_impressions, convert_money=convert_money)
+            self.store.write(account.id, report_key, partition, report)
+        return outdated
+
+    def _is_recent(self, partition):
+        first_recent_day = datetime.date.today() - datetime.timedelta(self.refetch_days)
+        return partition.dates[1] >= first_recent_day
@@ -0,0 +1,189 @@
+import json
+import time
+import threading
+
+from adwords_reports.storage import atomic_write
+
+
+class Instrumentation:
+    """ Emits timing spans and counters to pluggable exporters.
+    Without exporters it's disabled, spans and counters then cost no more than a method call.
+
+    Spans: auth, service_init, listing, download, transfer and parse, in seconds.
+        Streamed reports are parsed while they arrive, their download span ends when the response starts
+        and the time spent waiting for the rest of it is recorded as transfer.
+    Counters: bytes, rows, retries and errors
+    Labels: account and report_type where they apply, e.g. service for service_init
+    """
+    def __init__(self, exporters=None):
+        """
+        :param exporters: list of objects with export(event) and flush() methods, e.g. the exporters below
+        """
+        self.exporters = list(exporters or list())
+
+    @property
+    def enabled(self):
+        return bool(self.exporters)
+
+    def span(self, name, **labels):
+        """ context manager that times its block, failing blocks are counted as errors as well """
+        if not self.exporters:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def timing(self, name, seconds, **labels):
+        """ records a span that was timed elsewhere """
+        if self.exporters:
+            self._emit("span", name, seconds, labels)
+
+    def count(self, name, value=1, **labels):
+        if self.exporters:
+            self._emit("counter", name, value, labels)
+
+    def meter(self, stream):
+        """ wraps a binary stream to measure the bytes read from it and the time spent waiting for them """
+        if not self.exporters:
+            return stream
+        return MeteredStream(stream)
+
+    def flush(self):
+        for exporter in self.exporters:
+            exporter.flush()
+
+    def _emit(self, event_type, name, value, labels):
+        event = {
+            "type": event_type,
+            "name": name,
+            "value": value,
+            "labels": {key: str(label) for key, label in labels.items() if label is not None},
+            "time": time.time()
+        }
+        for exporter in self.exporters:
+            exporter.export(event)
+
+
+class _Span:
+    def __init__(self, instrumentation, name, labels):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.instrumentation.timing(self.name, time.time() - self.start, **self.labels)
+        if exc_type is not None:
+            self.instrumentation.count("errors", span=self.name, error=exc_type.__name__, **self.labels)
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class MeteredStream:
+    """ read-only file-like object that counts the bytes read and the seconds spent reading """
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes = 0
+        self.seconds = 0.
+
+    def read(self, size=-1):
+        start = time.time()
+        data = self.stream.read(size)
+        self.seconds += time.time() - start
+        self.bytes += len(data)
+        return data
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self.stream.close()
+
+
+class CallbackExporter:
+    """ passes each event, a dict with type, name, value, labels and time, to a callable """
+    def __init__(self, callback):
+        self.callback = callback
+
+    def export(self, event):
+        self.callback(event)
+
+    def flush(self):
+        pass
+
+
+class JsonLinesExporter:
+    """ appends each event as a line of json to a file """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def export(self, event):
+        line = json.dumps(event, sort_keys=True) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusExporter:
+    """ Aggregates events and writes them in the Prometheus text format on flush,
+    e.g. for the textfile collector of the node exporter:
+        <prefix>_<counter>_total{labels} and <prefix>_<span>_seconds_sum / _count{labels}
+    """
+    def __init__(self, path, prefix="adwords_reports"):
+        """
+        :param path: str, the file is replaced atomically on every flush
+        :param prefix: str, of all metric names
+        """
+        self.path = path
+        self.prefix = prefix
+        self._metrics = dict()
+        self._lock = threading.Lock()
+
+    def export(self, event):
+        labels = tuple(sorted(event["labels"].items()))
+        if event["type"] == "counter":
+            keys = [("{}_{}_total".format(self.prefix, event["name"]), labels, event["value"])]
+        else:
+            metric = "{}_{}_seconds".format(self.prefix, event["name"])
+            keys = [(metric + "_sum", labels, event["value"]), (metric + "_count", labels, 1)]
+        with self._lock:
+            for metric, labels, value in keys:
+                self._metrics[(metric, labels)] = self._metrics.get((metric, labels), 0) + value
+
+    def flush(self):
+        with self._lock:
+            lines = ["{}{} {}".format(metric, self._format_labels(labels), value)
+                     for (metric, labels), value in sorted(self._metrics.items())]
+
+        with atomic_write(self.path) as temp_path:
+            with open(temp_path, "w") as metrics_file:
+                metrics_file.write("\n".join(lines) + "\n")
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        escaped = [(key, value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+                   for key, value in labels]
+        return "{" + ",".join("{}=\"{}\"".format(key, value) for key, value in escaped) + "}"
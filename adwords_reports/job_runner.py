@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+from adwords_reports import logger
+from adwords_reports.incremental_sync import PartitionStore
+from adwords_reports.parallel import imap_unordered
+from adwords_reports.storage import account_key
+
+DONE = "done"
+FAILED = "failed"
+
+
+class Manifest:
+    """ Durable log of the units of a job, i.e. one report definition downloaded for one account.
+    Every state change is appended as a line of json and synced to disk, so it survives crashes of the process.
+    The last line of a unit wins, a line that was cut off by a crash is ignored.
+    """
+    def __init__(self, path):
+        """
+        :param path: str, the file is created if it doesn't exist
+        """
+        self.path = path
+        self._units = dict()
+        self._lock = threading.Lock()
+        self._cut_off = False  # the last line was cut off, so the next record has to start on a new line
+        self._load()
+
+    def get(self, unit):
+        """
+        :return: dict, the last record of the unit or None
+        """
+        return self._units.get(unit)
+
+    def units(self, status=None):
+        """
+        :param status: str, DONE or FAILED. None for all units.
+        :return: list of str
+        """
+        return sorted(unit for unit, record in self._units.items() if status is None or record["status"] == status)
+
+    def record(self, unit, status, **details):
+        """ appends a state change of a unit
+        :param unit: str
+        :param status: str, DONE or FAILED
+        :param details: further information, e.g. path and checksum of the output
+        """
+        record = dict(details, unit=unit, status=status, time=time.time())
+        line = json.dumps(record, sort_keys=True, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a") as manifest_file:
+                if self._cut_off:
+                    manifest_file.write("\n")
+                    self._cut_off = False
+                manifest_file.write(line)
+                manifest_file.flush()
+                os.fsync(manifest_file.fileno())
+            self._units[unit] = record
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as manifest_file:
+            for line in manifest_file:
+                self._cut_off = not line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning("Skipping incomplete line of manifest {}.".format(self.path))
+                    continue
+                self._units[record["unit"]] = record
+
+
+class JobRunner:
+    """ Downloads report definitions for all accounts into a PartitionStore and keeps track of them in a Manifest.
+    A run that was interrupted resumes with the first unit that isn't done, failed units can be run again on their own.
+    """
+    def __init__(self, client, directory, file_format="parquet", manifest_path=None, max_workers=1,
+                 verify_checksums=True):
+        """
+        :param client: Client
+        :param directory: str, the reports are stored here, see PartitionStore
+        :param file_format: str, one of storage.FILE_FORMATS
+        :param manifest_path: str, defaults to manifest.jsonl in directory
+        :param max_workers: int, number of accounts that are downloaded at the same time
+        :param verify_checksums: bool, outputs of done units are read again to check that they're unchanged.
+            Otherwise they only have to exist.
+        """
+        self.client = client
+        self.store = PartitionStore(directory, file_format)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.manifest = Manifest(manifest_path or os.path.join(directory, "manifest.jsonl"))
+        self.max_workers = max_workers
+        self.verify_checksums = verify_checksums
+
+    def run(self, report_definitions, zero_impressions, convert_money=False, only_failed=False):
+        """ Downloads all units that aren't done yet, or whose output is missing or was changed.
+        Failures are recorded and don't stop the run.
+        :param report_definitions: list of ReportDefinitions
+        :param zero_impressions: bool
+        :param convert_money: bool, convert money fields like Cost from micro amounts to regular amounts
+        :param only_failed: bool, only run units that failed before, e.g. because of exhausted retries
+        :return: dict with lists of the units that are done, failed or were skipped
+        """
+        for report_definition in report_definitions:
+            self.client.validate(report_definition)
+
+        def run_account(account):
+            return self.run_account(account, report_definitions, zero_impressions, convert_money, only_failed)
+
+        result = {DONE: list(), FAILED: list(), "skipped": list()}
+        accounts = self.client.scheduled_accounts()
+        try:
+            for account_result in imap_unordered(run_account, accounts, self.max_workers):
+                for status, units in account_result.items():
+                    result[status].extend(units)
+        finally:
+            if self.client.account_stats is not None:
+                self.client.account_stats.save()
+        logger.info("Job finished: {} done, {} failed, {} skipped.".format(
+            len(result[DONE]), len(result[FAILED]), len(result["skipped"])))
+        return result
+
+    def unit(self, account_id, report_definition, zero_impressions, convert_money=False):
+        """
+        :return: str, identifies the report definition downloaded for the account
+        """
+        report_key = self.store.report_key(report_definition, zero_impressions, convert_money=convert_money)
+        return "{}/{}/{}_{}".format(account_key(account_id), report_key,
+                                    report_definition.date_min, report_definition.date_max)
+
+    def is_done(self, unit):
+        """ done units count only as long as their output is unchanged """
+        record = self.manifest.get(unit)
+        if record is None or record["status"] != DONE or not os.path.exists(record["path"]):
+            return False
+        return not self.verify_checksums or _checksum(record["path"]) == record["checksum"]
+
+    def run_account(self, account, report_definitions, zero_impressions, convert_money=False, only_failed=False):
+        """ Downloads the units of a single account that aren't done yet and records them in the manifest,
+        e.g. for schedulers that hand out accounts themselves. The report definitions have to be validated.
+        Failures of single units are recorded and don't stop the others.
+        :param account: Account
+        :param report_definitions: list of ReportDefinitions
+        :param zero_impressions: bool
+        :param convert_money: bool, convert money fields like Cost from micro amounts to regular amounts
+        :param only_failed: bool, only run units that failed before
+        :return: dict with lists of the account's units that are done, failed or were skipped
+        """
+        result = {DONE: list(), FAILED: list(), "skipped": list()}
+        isolated = False
+        for report_definition in report_definitions:
+            unit = self.unit(account.id, report_definition, zero_impressions, convert_money)
+            record = self.manifest.get(unit)
+            if self.is_done(unit) or (only_failed and (record is None or record["status"] != FAILED)):
+                result["skipped"].append(unit)
+                continue
+
+            if not isolated:
+                account.isolate_session()
+                isolated = True
+            try:
+                report = account.download(report_definition, zero_impressions, convert_money=convert_money)
+                report_key = self.store.report_key(report_definition, zero_impressions, convert_money=convert_money)
+                path = self.store.write(account.id, report_key, report_definition, report)
+            except Exception as error:
+                logger.warning("Unit {} failed: {}".format(unit, error))
+                self.manifest.record(unit, FAILED, account_id=account.id, error=repr(error))
+                result[FAILED].append(unit)
+                continue
+            self.manifest.record(unit, DONE, account_id=account.id, path=path, checksum=_checksum(path),
+                                 rows=len(report))
+            result[DONE].append(unit)
+        return result
+
+
+def _checksum(path):
+    """ sha256 of a file, read in blocks """
+    sha = hashlib.sha256()
+    with open(path, "rb") as output:
+        for block in iter(lambda: output.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
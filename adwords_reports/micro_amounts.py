@@ -1,31 +1,95 @@
+import sys
+import numbers
+
+# numpy and pandas are only imported for arrays and Series, so converting single numbers imports fast
 MICRO_FACTOR = 10**6
 
 
 def reg_and_micro(number):
     """ takes a bid amount and identifies if it's micro or regular format. Then returns both formats.
+    Works for single numbers as well as for numpy arrays and pandas Series.
     CAUTION: There might be currencies where this doesn't make sense
     """
-    is_micro = number >= 0.01 * MICRO_FACTOR  # >= 10k must be micro
-    if is_micro:
-        regular = micro_to_reg(number)
-        micro = reg_to_micro(regular)  # for formatting
-    else:
-        micro = reg_to_micro(number)
-        regular = micro_to_reg(micro)  # for formatting
-    return regular, micro
+    if _is_scalar(number):
+        is_micro = number >= 0.01 * MICRO_FACTOR  # >= 10k must be micro
+        if is_micro:
+            regular = micro_to_reg(number)
+            micro = reg_to_micro(regular)  # for formatting
+        else:
+            micro = reg_to_micro(number)
+            regular = micro_to_reg(micro)  # for formatting
+        return regular, micro
+
+    import numpy as np
+
+    values = _as_float_array(number)
+    with np.errstate(invalid="ignore"):
+        is_micro = values >= 0.01 * MICRO_FACTOR
+    micro = np.where(is_micro, _round_micro(_round_reg(values)), _round_micro(values))
+    regular = _round_reg(micro)
+    return _like(number, regular, float), _like(number, micro, int)
 
 
 def reg_to_micro(number):
     """ Convert a number to a micro amount:
         - times one million
-        - and rounded to multiples of 10k """
-    assert isinstance(number, (float, int))
-    return int(round(float(number) * MICRO_FACTOR, -4))
+        - and rounded to multiples of 10k
+    Works for single numbers as well as for numpy arrays and pandas Series. Missing values are only supported
+    in Series, which are returned with nullable integers.
+    """
+    if _is_scalar(number):
+        assert isinstance(number, numbers.Number)
+        return int(round(float(number) * MICRO_FACTOR, -4))
+    return _like(number, _round_micro(_as_float_array(number)), int)
 
 
 def micro_to_reg(number):
     """ Convert micro amount to regular euro amount
         - divided by one million
-        - and rounded to 2 fractional digits """
-    assert isinstance(number, (float, int))
-    return round(float(number) / MICRO_FACTOR, 2)
+        - and rounded to 2 fractional digits
+    Works for single numbers as well as for numpy arrays and pandas Series.
+    """
+    if _is_scalar(number):
+        assert isinstance(number, numbers.Number)
+        return round(float(number) / MICRO_FACTOR, 2)
+    return _like(number, _round_reg(_as_float_array(number)), float)
+
+
+def _round_micro(values):
+    import numpy as np
+    return np.round(values * MICRO_FACTOR, -4)
+
+
+def _round_reg(values):
+    import numpy as np
+    return np.round(values / MICRO_FACTOR, 2)
+
+
+def _is_scalar(number):
+    if isinstance(number, numbers.Number):
+        return True
+    import numpy as np
+    return np.ndim(number) == 0
+
+
+def _is_series(number):
+    # a Series can't exist without pandas being imported already
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(number, pd.Series)
+
+
+def _as_float_array(number):
+    import numpy as np
+
+    if _is_series(number):
+        return number.astype("float64").values
+    return np.asarray(number, dtype="float64")
+
+
+def _like(number, values, kind):
+    """ wraps the values like the input, i.e. Series stay Series with the same index """
+    if _is_series(number):
+        import pandas as pd
+        dtype = "Int64" if kind is int else "float64"
+        return pd.Series(values, index=number.index, name=number.name).astype(dtype)
+    return values.astype("int64" if kind is int else "float64")
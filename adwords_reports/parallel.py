@@ -0,0 +1,52 @@
+import collections
+from concurrent import futures
+
+
+def imap_unordered(func, iterable, max_workers, max_pending=None):
+    """ Applies func to all items of iterable using a pool of threads.
+    Only a bounded number of calls are in flight at a time, so iterable may be a (lazy) generator.
+    :param func: callable taking one item
+    :param iterable: iterable of items
+    :param max_workers: int, number of threads
+    :param max_pending: int, number of calls that are submitted ahead of the consumer, i.e. results that
+        may be held at once besides the one being consumed. Defaults to 2 * max_workers, at least max_workers.
+    :return: generator with results in completion order
+    """
+    items = iter(iterable)
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set(_submit(executor, func, items, _max_pending(max_workers, max_pending)))
+        while pending:
+            done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            pending.update(_submit(executor, func, items, len(done)))
+            while done:
+                # futures are dropped once their result is handed out, so consumers can release results
+                yield done.pop().result()
+
+
+def imap(func, iterable, max_workers, max_pending=None):
+    """ Same as imap_unordered, but results are returned in the order of iterable.
+    Results are yielded as soon as all results before them are available.
+    """
+    items = iter(iterable)
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = collections.deque(_submit(executor, func, items, _max_pending(max_workers, max_pending)))
+        while pending:
+            future = pending.popleft()
+            result = future.result()
+            pending.extend(_submit(executor, func, items, 1))
+            yield result
+
+
+def _max_pending(max_workers, max_pending):
+    return 2 * max_workers if max_pending is None else max(max_pending, max_workers)
+
+
+def _submit(executor, func, items, n):
+    submitted = list()
+    if n <= 0:
+        return submitted
+    for item in items:
+        submitted.append(executor.submit(func, item))
+        if len(submitted) >= n:
+            break
+    return submitted
@@ -0,0 +1,103 @@
+import io
+
+import pandas as pd
+
+from adwords_reports.micro_amounts import MICRO_FACTOR
+from adwords_reports.report_fields import NA_VALUES
+
+# pandas: pandas' C engine
+# pyarrow: multi-threaded csv reader of pyarrow, converted to a DataFrame
+# arrow: multi-threaded csv reader of pyarrow, returns a pyarrow.Table
+PARSERS = ("pandas", "pyarrow", "arrow")
+# reports are downloaded as unicode on python 2, which isn't str there
+TEXT_TYPE = type(u"")
+
+
+def read_csv(data, header, dtypes, parser="pandas", **kwargs):
+    """ Parses a headless csv report.
+    :param data: file-like object (bytes or text) or str, the report itself and not a path
+    :param header: list of str, column names
+    :param dtypes: dict, pandas dtypes of the columns with known type
+    :param parser: str, one of PARSERS
+    :param kwargs: further arguments of pd.read_csv, only supported by the pandas parser
+    :return: DataFrame or pyarrow.Table
+    """
+    assert parser in PARSERS, "Parser must be one of {}.".format(PARSERS)
+    if parser == "pandas":
+        if isinstance(data, TEXT_TYPE):
+            data = io.StringIO(data)
+        na_values = {field: NA_VALUES for field, dtype in dtypes.items() if dtype is not str}
+        return pd.read_csv(data, names=header, dtype=dtypes, na_values=na_values, **kwargs)
+
+    assert not kwargs, "The {} parser doesn't support {}.".format(parser, list(kwargs))
+    table = _read_arrow(data, header, dtypes)
+    if parser == "arrow":
+        return table
+    return to_pandas(table)
+
+
+def to_pandas(table):
+    """ Converts a pyarrow.Table to a DataFrame with the dtypes the pandas parser would use.
+    Columns without missing values are handed over without copying where their type allows it.
+    Older versions, i.e. pyarrow < 2.0 or pandas < 1.0, convert with a copy and cast integers afterwards.
+    """
+    import pyarrow as pa
+
+    if hasattr(pd.Int64Dtype, "__from_arrow__"):
+        nullable_ints = {pa.int64(): pd.Int64Dtype()}
+        try:
+            return table.to_pandas(types_mapper=nullable_ints.get, split_blocks=True, self_destruct=True)
+        except TypeError:  # pyarrow doesn't know these keywords yet, the table is still intact
+            pass
+    report = table.to_pandas()
+    int_fields = [field.name for field in table.schema if field.type == pa.int64()]
+    return report.astype({field: "Int64" for field in int_fields}) if int_fields else report
+
+
+def micro_to_reg_arrow(table, fields):
+    """ same as micro_amounts.micro_to_reg for columns of a pyarrow.Table
+    :return: pyarrow.Table
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for field in fields:
+        index = table.schema.get_field_index(field)
+        regular = pc.round(pc.divide(pc.cast(table[field], pa.float64()), MICRO_FACTOR), 2)
+        table = table.set_column(index, field, regular)
+    return table
+
+
+def _read_arrow(data, header, dtypes):
+    try:
+        import pyarrow as pa
+        import pyarrow.csv
+    except ImportError:
+        raise ImportError("The pyarrow parsers need pyarrow, install it with `pip install pyarrow`.")
+
+    if isinstance(data, TEXT_TYPE):
+        data = io.BytesIO(data.encode("utf-8"))
+    elif isinstance(data, io.TextIOBase):
+        data = io.BytesIO(data.read().encode("utf-8"))
+
+    column_types = {field: _arrow_type(pa, dtype) for field, dtype in dtypes.items()}
+    read_options = pyarrow.csv.ReadOptions(column_names=header, use_threads=True)
+    convert_options = pyarrow.csv.ConvertOptions(
+        column_types=column_types, null_values=NA_VALUES + [""], strings_can_be_null=True)
+    try:
+        return pyarrow.csv.read_csv(data, read_options=read_options, convert_options=convert_options)
+    except pa.ArrowInvalid as error:
+        if "Empty CSV file" not in str(error):
+            raise
+        schema = pa.schema([(field, column_types.get(field, pa.string())) for field in header])
+        return schema.empty_table()
+
+
+def _arrow_type(pa, dtype):
+    arrow_types = {
+        "Int64": pa.int64(),
+        "float64": pa.float64(),
+        "float32": pa.float32(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+    }
+    return arrow_types.get(dtype, pa.string())
@@ -0,0 +1,287 @@
+import sys
+import ssl
+import time
+import errno
+import socket
+import random
+import threading
+import functools
+
+from adwords_reports import logger
+
+try:
+    from http.client import HTTPException
+    from urllib.error import URLError
+except ImportError:  # python 2
+    from httplib import HTTPException
+    from urllib2 import URLError
+
+
+# error types of the AdWords API that are worth another try
+RETRYABLE_API_ERRORS = (
+    "RateExceededError",
+    "RATE_EXCEEDED",
+    "INTERNAL_API_ERROR",
+    "UNEXPECTED_INTERNAL_API_ERROR",
+    "TRANSIENT_ERROR",
+    "CONCURRENT_MODIFICATION",
+    "SERVER_ERROR"
+)
+# HTTP status codes of overloaded or briefly unavailable servers
+TRANSIENT_HTTP_CODES = (429, 500, 502, 503, 504)
+# errors of connections that broke or couldn't be established. Other OSErrors, e.g. of missing files, are permanent.
+NETWORK_ERRORS = (socket.timeout, socket.gaierror, ssl.SSLError, HTTPException)
+if sys.version_info >= (3, 3):
+    NETWORK_ERRORS += (ConnectionError, TimeoutError)
+NETWORK_ERRNOS = frozenset(getattr(errno, name) for name in (
+    "ECONNRESET", "ECONNREFUSED", "ECONNABORTED", "ETIMEDOUT", "EPIPE", "EHOSTUNREACH", "ENETUNREACH", "ENETDOWN",
+    "ENETRESET") if hasattr(errno, name))
+# network errors of http libraries, they're only checked if the library is imported anyway
+LIBRARY_NETWORK_ERRORS = {
+    "urllib3.exceptions": ("ProtocolError", "TimeoutError", "NewConnectionError", "SSLError", "ProxyError"),
+    "requests.exceptions": ("ConnectionError", "Timeout", "ChunkedEncodingError")
+}
+# AdWords recommends to wait at least 30 seconds after rate exceeded errors of the report service,
+# which doesn't tell how long to wait
+DEFAULT_RATE_EXCEEDED_WAIT = 30
+
+
+class TokenBucket:
+    """ Allows rate calls per second on average and bursts of up to capacity calls. """
+    def __init__(self, rate, capacity=1):
+        """
+        :param rate: float, tokens per second or None for no limit
+        :param capacity: int, maximum number of tokens that can be saved up
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.time()
+        self._paused_until = 0.
+        self._lock = threading.Lock()
+
+    def acquire(self, sleep=time.sleep):
+        """ blocks until a token is available and takes it """
+        while True:
+            wait = self.take()
+            if wait <= 0:
+                return
+            sleep(wait)
+
+    def pause(self, seconds):
+        """ no tokens are handed out for the given number of seconds """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+    def take(self):
+        """ takes a token without blocking
+        :return: float, 0 if a token was taken, else seconds to wait before trying again
+        """
+        with self._lock:
+            now = time.time()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.rate is None:
+                return 0
+
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class RateLimiter:
+    """ Limits the request rate per developer token and per customer across all threads of a process.
+    Rate exceeded errors of the API pause the affected bucket for the time the server asks for.
+    """
+    def __init__(self, requests_per_second=None, requests_per_second_per_customer=None, burst=1):
+        """
+        :param requests_per_second: float, limit per developer token or None for no limit
+        :param requests_per_second_per_customer: float, limit per customer id or None for no limit
+        :param burst: int, number of requests that may be sent at once after a quiet period
+        """
+        self.requests_per_second = requests_per_second
+        self.requests_per_second_per_customer = requests_per_second_per_customer
+        self.burst = burst
+        self._buckets = dict()
+        self._lock = threading.Lock()
+
+    def acquire(self, developer_token, customer_id=None, sleep=time.sleep):
+        """ blocks until a request for this developer token and customer may be sent """
+        for bucket in self.buckets(developer_token, customer_id):
+            bucket.acquire(sleep)
+
+    def buckets(self, developer_token, customer_id=None):
+        """ the buckets a request has to take a token from, e.g. to wait for them without blocking
+        :return: list of TokenBuckets
+        """
+        if customer_id is None:
+            return [self._bucket(developer_token)]
+        return [self._bucket(developer_token), self._bucket(developer_token, customer_id)]
+
+    def pause(self, seconds, developer_token, customer_id=None):
+        """ pauses all requests of a customer or of the whole developer token if customer_id is None """
+        logger.info("Pausing requests for {} seconds.".format(seconds))
+        self._bucket(developer_token, customer_id).pause(seconds)
+
+    def _bucket(self, developer_token, customer_id=None):
+        key = (developer_token, customer_id)
+        with self._lock:
+            if key not in self._buckets:
+                rate = self.requests_per_second if customer_id is None else self.requests_per_second_per_customer
+                self._buckets[key] = TokenBucket(rate, capacity=self.burst)
+            return self._buckets[key]
+
+
+class RetryPolicy:
+    """ Retries retryable errors with exponential backoff and full jitter.
+    Waits at least as long as the server asks for with retryAfterSeconds.
+    """
+    def __init__(self, max_attempts=3, base_delay=1., max_delay=60., sleep=time.sleep):
+        """
+        :param max_attempts: int, including the first attempt
+        :param base_delay: float, seconds, upper bound of the first wait
+        :param max_delay: float, seconds, upper bound of all waits
+        :param sleep: callable, used for waiting
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+
+    def call(self, func, args=(), kwargs=None, rate_limiter=None, developer_token=None, customer_id=None,
+             on_retry=None):
+        """ calls func until it succeeds, a non-retryable error occurs or max_attempts are used up
+        :param func: callable
+        :param args: tuple, positional arguments of func
+        :param kwargs: dict, keyword arguments of func
+        :param rate_limiter: RateLimiter, every attempt has to acquire it
+        :param developer_token: str, rate limiting scope
+        :param customer_id: str, rate limiting scope
+        :param on_retry: callable taking the error, is called before each retry
+        :return: the result of func
+        """
+        kwargs = kwargs or dict()
+        for attempt in range(self.max_attempts):
+            if rate_limiter is not None:
+                rate_limiter.acquire(developer_token, customer_id, sleep=self.sleep)
+            try:
+                return func(*args, **kwargs)
+            except Exception as error:
+                wait = self.wait_after(error, attempt, rate_limiter, developer_token, customer_id)
+                if wait is None:
+                    raise
+                logger.info("Attempt {} failed, retrying in {:.1f} seconds: {}".format(attempt + 1, wait, error))
+                if on_retry is not None:
+                    on_retry(error)
+                self.sleep(wait)
+
+    def wait_after(self, error, attempt, rate_limiter=None, developer_token=None, customer_id=None):
+        """ decides whether a failed attempt is retried and pauses the rate limiter if the server asks for it
+        :param error: Exception of the failed attempt
+        :param attempt: int, starting with 0
+        :param rate_limiter: RateLimiter
+        :param developer_token: str, rate limiting scope
+        :param customer_id: str, rate limiting scope
+        :return: float, seconds to wait before the next attempt or None if the error isn't retried
+        """
+        if not is_retryable(error) or attempt + 1 >= self.max_attempts:
+            return None
+        retry_after = retry_after_seconds(error)
+        if retry_after and rate_limiter is not None:
+            scope = customer_id if rate_scope(error) == "ACCOUNT" else None
+            rate_limiter.pause(retry_after, developer_token, scope)
+        return max(self.backoff(attempt), retry_after or 0)
+
+    def backoff(self, attempt):
+        """
+        :param attempt: int, starting with 0
+        :return: float, seconds to wait
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def retried(method):
+    """ Decorator for methods of objects with retry_policy, rate_limiter, rate_limit_scope
+    and instrumentation attributes. Retries are counted by the instrumentation.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        developer_token, customer_id = self.rate_limit_scope
+        instrumentation = self.instrumentation
+
+        def count_retry(error):
+            instrumentation.count("retries", method=method.__name__, account=customer_id, error=type(error).__name__)
+
+        return self.retry_policy.call(method, (self,) + args, kwargs, rate_limiter=self.rate_limiter,
+                                      developer_token=developer_token, customer_id=customer_id,
+                                      on_retry=count_retry if instrumentation.enabled else None)
+    return wrapper
+
+
+def is_retryable(error):
+    """ network errors, transient HTTP errors and transient errors of the API are retryable,
+    bad requests and local errors, e.g. a missing credentials file, aren't
+    """
+    if any(api_error in str(error) for api_error in RETRYABLE_API_ERRORS):
+        return True
+    code = getattr(error, "code", getattr(error, "httpcode", None))  # httpcode of suds' TransportError
+    if isinstance(code, int):
+        return code in TRANSIENT_HTTP_CODES
+    return is_network_error(error)
+
+
+def is_network_error(error):
+    """
+    :param error: Exception
+    :return: bool, the connection broke or couldn't be established
+    """
+    if isinstance(error, URLError) and isinstance(error.reason, Exception):
+        return is_network_error(error.reason)  # urlopen wraps the error of the connection
+    if isinstance(error, NETWORK_ERRORS):
+        return True
+    if isinstance(error, EnvironmentError) and error.errno in NETWORK_ERRNOS:
+        return True
+    for module_name, class_names in LIBRARY_NETWORK_ERRORS.items():
+        module = sys.modules.get(module_name)
+        if module is not None and isinstance(error, tuple(getattr(module, name) for name in class_names)):
+            return True
+    return False
+
+
+def retry_after_seconds(error):
+    """
+    :return: int, seconds the server asks to wait or None
+    """
+    for api_error in getattr(error, "errors", None) or list():
+        seconds = soap_value(api_error, "retryAfterSeconds")
+        if seconds:
+            return int(seconds)
+    if "RateExceededError" in str(error) or "RATE_EXCEEDED" in str(error):
+        return DEFAULT_RATE_EXCEEDED_WAIT
+    return None
+
+
+def rate_scope(error):
+    """
+    :return: str, "ACCOUNT" or "DEVELOPER" if the error tells which limit was exceeded, else None
+    """
+    for api_error in getattr(error, "errors", None) or list():
+        scope = soap_value(api_error, "rateScope")
+        if scope:
+            return str(scope)
+    return None
+
+
+def soap_value(soap_object, attribute):
+    """
+    :param soap_object: suds object or dict, e.g. an ApiError or a ReportDefinitionField
+    :param attribute: str
+    :return: its value or None if it isn't set
+    """
+    try:
+        return soap_object[attribute]
+    except (KeyError, TypeError, AttributeError):
+        return getattr(soap_object, attribute, None)
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import hashlib
+import datetime
+import threading
+
+from adwords_reports import logger
+from adwords_reports.storage import account_key, atomic_write, extension, write_frame, read_frame
+
+
+class ReportCache:
+    """ Local cache of parsed reports, keyed by account, report definition and download options.
+    Entries expire after ttl seconds, unless their date range ended more than immutable_after_days ago.
+    AdWords doesn't change such data anymore, so they are kept until they are evicted because of max_size.
+
+    Each entry is a report file and a metadata file next to it:
+        <directory>/<key>.<format> and <directory>/<key>.json
+    The modification time of the report file is its last access, so a hit only touches its own entry
+    and processes can share a directory. The index of all entries is only built to evict some of them.
+    """
+    METADATA_EXTENSION = ".json"
+    INDEX_FILE = "index.json"  # of former versions, converted to metadata files
+
+    def __init__(self, directory, ttl=3600, max_size=None, immutable_after_days=3, file_format="parquet"):
+        """
+        :param directory: str, is created if it doesn't exist
+        :param ttl: int, seconds until mutable entries expire. None for no expiry.
+        :param max_size: int, bytes on disk. The least recently used entries are evicted above it.
+        :param immutable_after_days: int, date ranges ending before today - immutable_after_days don't expire
+        :param file_format: str, one of storage.FILE_FORMATS
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.immutable_after_days = immutable_after_days
+        self.file_format = file_format
+        self.extension = extension(file_format)
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        self._convert_index()
+
+    @staticmethod
+    def key(account_id, report_definition, zero_impressions, **options):
+        """ canonical hash of everything that determines the content of a report
+        :param account_id: str or int
+        :param report_definition: ReportDefinition
+        :param zero_impressions: bool
+        :param options: further download options that change the parsed report, e.g. convert_money
+        :return: str
+        """
+        content = {
+            "account_id": account_key(account_id),
+            "report_definition": report_definition.raw,
+            "zero_impressions": zero_impressions,
+            "options": options
+        }
+        serialized = json.dumps(content, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        :param key: str, see ReportCache.key
+        :return: DataFrame or None if there's no valid entry
+        """
+        metadata = self._read_metadata(key)
+        if metadata is None:
+            return None
+        if self._is_expired(metadata):
+            logger.info("Cached report expired.")
+            self._remove(key)
+            return None
+
+        logger.info("Loading report from cache.")
+        path = self._path(key)
+        try:
+            self._touch(path)
+            return read_frame(path, self.file_format)
+        except (IOError, OSError):
+            return None  # evicted by another process in the meantime
+
+    def put(self, key, report, report_definition):
+        """
+        :param key: str, see ReportCache.key
+        :param report: DataFrame
+        :param report_definition: ReportDefinition, its date range decides if the entry is immutable
+        """
+        path = self._path(key)
+        with atomic_write(path) as temp_path:
+            write_frame(report, temp_path, self.file_format)
+        self._touch(path)
+        # the entry exists once its metadata does
+        with atomic_write(self._metadata_path(key)) as temp_path:
+            with open(temp_path, "w") as metadata_file:
+                json.dump({"created": time.time(), "immutable": self._is_immutable(report_definition)}, metadata_file)
+        self._evict()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index()):
+                self._remove(key)
+
+    @property
+    def size(self):
+        """
+        :return: int, bytes of all cached reports
+        """
+        return sum(entry["size"] for entry in self._index().values())
+
+    def _is_immutable(self, report_definition):
+        last_mutable_day = datetime.date.today() - datetime.timedelta(self.immutable_after_days)
+        return report_definition.date_max < last_mutable_day.strftime("%Y%m%d")
+
+    def _is_expired(self, metadata):
+        if metadata["immutable"] or self.ttl is None:
+            return False
+        return time.time() - metadata["created"] > self.ttl
+
+    def _evict(self):
+        if self.max_size is None:
+            return
+        with self._lock:
+            index = self._index()
+            size = sum(entry["size"] for entry in index.values())
+            least_recently_used = sorted(index, key=lambda k: index[k]["accessed"])
+            while size > self.max_size and least_recently_used:
+                logger.info("Evicting cached report.")
+                key = least_recently_used.pop(0)
+                self._remove(key)
+                size -= index[key]["size"]
+
+    def _index(self):
+        """ scans the directory, since other processes may add and remove entries
+        :return: dict of key -> dict with size and accessed of all complete entries
+        """
+        index = dict()
+        for file_name in os.listdir(self.directory):
+            key, file_extension = os.path.splitext(file_name)
+            if file_extension != self.METADATA_EXTENSION or file_name == self.INDEX_FILE:
+                continue
+            try:
+                path = self._path(key)
+                index[key] = {"size": os.path.getsize(path), "accessed": os.path.getmtime(path)}
+            except OSError:
+                pass  # the report is missing, e.g. it was deleted by hand
+        return index
+
+    def _remove(self, key):
+        for path in (self._metadata_path(key), self._path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _read_metadata(self, key):
+        try:
+            with open(self._metadata_path(key)) as metadata_file:
+                return json.load(metadata_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _touch(path):
+        # an explicit time, since the clock of file systems may be coarser than the order of accesses
+        now = time.time()
+        os.utime(path, (now, now))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.extension)
+
+    def _metadata_path(self, key):
+        return os.path.join(self.directory, key + self.METADATA_EXTENSION)
+
+    def _convert_index(self):
+        """ the single index of former versions is split into metadata files """
+        index_path = os.path.join(self.directory, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+        for key, entry in index.items():
+            path = self._path(key)
+            if os.path.exists(path):
+                with atomic_write(self._metadata_path(key)) as temp_path:
+                    with open(temp_path, "w") as metadata_file:
+                        json.dump({"created": entry["created"], "immutable": entry["immutable"]}, metadata_file)
+                os.utime(path, (entry["accessed"], entry["accessed"]))
+        os.remove(index_path)
@@ -1,8 +1,28 @@
 import datetime
 
 
+SPLIT_PERIODS = ("day", "week", "month")
+DOWNLOAD_FORMATS = ("CSV", "GZIPPED_CSV")
+# operators whose values have to be values of the enum if the field is one
+ENUM_OPERATORS = ("EQUALS", "NOT_EQUALS", "IN", "NOT_IN")
+
+
+class InvalidReportDefinition(ValueError):
+    """ the report definition can't be downloaded, e.g. because of an unknown field """
+    def __init__(self, report_type, problems):
+        """
+        :param report_type: str
+        :param problems: list of str
+        """
+        super(InvalidReportDefinition, self).__init__(
+            "Invalid definition of {}: {}".format(report_type, "; ".join(problems)))
+        self.report_type = report_type
+        self.problems = problems
+
+
 class ReportDefinition:
-    def __init__(self, report_type, fields, predicates=None, last_days=None, date_from=None, date_to=None):
+    def __init__(self, report_type, fields, predicates=None, last_days=None, date_from=None, date_to=None,
+                 download_format="CSV"):
         """ Create report definition as needed in api call from meta information
         :param report_type: str, https://developers.google.com/adwords/api/docs/appendix/reports
         :param fields: list of str
@@ -10,10 +30,14 @@ class ReportDefinition:
         :param last_days: int, date_to = yesterday and date_from = today - days_ago
         :param date_from: str, format YYYYMMDD or YYYY-MM-DD
         :param date_to: str, format YYYYMMDD or YYYY-MM-DD
+        :param download_format: str, one of DOWNLOAD_FORMATS. Accounts download compressed reports anyway
+            if the client allows it, see Client(compress=...)
         """
+        assert download_format in DOWNLOAD_FORMATS, "Download format must be one of {}.".format(DOWNLOAD_FORMATS)
         self.report_type = report_type
         self.fields = fields
         self.predicates = predicates
+        self.download_format = download_format
 
         self.date_min = date_from
         self.date_max = date_to
@@ -21,6 +45,89 @@ class ReportDefinition:
 
         self.raw = self._as_dict()
 
+    def split(self, by):
+        """ Splits the date range into consecutive sub-ranges.
+        Weeks start on mondays and months on the 1st, the first and last sub-range may be shorter.
+        :param by: str, one of SPLIT_PERIODS
+        :return: list of ReportDefinitions, sorted by date
+        """
+        assert by in SPLIT_PERIODS, "Can only split by {}.".format(SPLIT_PERIODS)
+
+        date_min, date_max = self.dates
+        report_definitions = list()
+        start = date_min
+        while start <= date_max:
+            end = min(self._period_end(start, by), date_max)
+            report_definitions.append(self._with_dates(start, end))
+            start = end + datetime.timedelta(1)
+        return report_definitions
+
+    def validate(self, report_fields):
+        """ Checks fields and predicates against the metadata of ReportDefinitionService,
+        so invalid definitions fail before anything is downloaded.
+        :param report_fields: list of dicts with fieldName, canSelect, canFilter, enumValues and exclusiveFields,
+            see Client.report_fields
+        :raise: InvalidReportDefinition with all problems that were found
+        """
+        known = {report_field["fieldName"]: report_field for report_field in report_fields}
+        problems = list()
+        for field in self.fields:
+            if field not in known:
+                problems.append("unknown field {}".format(field))
+            elif known[field].get("canSelect") is False:
+                problems.append("{} can't be selected".format(field))
+
+        exclusive_pairs = set()
+        for field in self.fields:
+            for other in known.get(field, dict()).get("exclusiveFields") or list():
+                if other in self.fields:
+                    exclusive_pairs.add(tuple(sorted((field, other))))
+        for field, other in sorted(exclusive_pairs):
+            problems.append("{} can't be combined with {}".format(field, other))
+
+        for predicate in self.predicates or list():
+            field = predicate["field"]
+            if field not in known:
+                problems.append("unknown field {} in predicates".format(field))
+                continue
+            if known[field].get("canFilter") is False:
+                problems.append("{} can't be filtered".format(field))
+            enum_values = known[field].get("enumValues")
+            if enum_values and predicate["operator"] in ENUM_OPERATORS:
+                values = predicate["values"]
+                values = values if isinstance(values, (list, tuple)) else [values]
+                unknown = [str(value) for value in values if str(value) not in enum_values]
+                if unknown:
+                    problems.append("unknown values of {}: {}".format(field, ", ".join(unknown)))
+
+        if problems:
+            raise InvalidReportDefinition(self.report_type, problems)
+
+    @property
+    def dates(self):
+        """
+        :return: tuple of datetime.date, first and last day of the date range
+        """
+        return self._parse_date(self.date_min), self._parse_date(self.date_max)
+
+    def _with_dates(self, date_from, date_to):
+        return ReportDefinition(self.report_type, self.fields, self.predicates,
+                                date_from=date_from.isoformat(), date_to=date_to.isoformat(),
+                                download_format=self.download_format)
+
+    @staticmethod
+    def _period_end(day, by):
+        if by == "day":
+            return day
+        if by == "week":
+            return day + datetime.timedelta(6 - day.weekday())
+        next_month = (day.replace(day=28) + datetime.timedelta(4)).replace(day=1)
+        return next_month - datetime.timedelta(1)
+
+    @staticmethod
+    def _parse_date(date):
+        return datetime.datetime.strptime(date, "%Y%m%d").date()
+
     def _as_dict(self):
         self._determine_dates()
 
@@ -28,7 +135,7 @@ class ReportDefinition:
             "reportName": "api_report",
             "dateRangeType": "CUSTOM_DATE",
             "reportType": self.report_type,
-            "downloadFormat": "CSV",
+            "downloadFormat": self.download_format,
             "selector": {
                 "fields": self.fields,
                 "dateRange": {
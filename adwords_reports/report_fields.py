@@ -0,0 +1,154 @@
+import threading
+
+
+# AdWords marks missing values with " --", e.g. the QualityScore of a keyword without impressions
+NA_VALUES = [" --", "--"]
+
+# field types of the most common report fields.
+# the types follow the ones of ReportDefinitionService, all enumerations are summarized as "Enum".
+# see https://developers.google.com/adwords/api/docs/appendix/reports/all-reports
+FIELD_TYPES = {
+    # ids
+    "AccountId": "Long",
+    "AdGroupId": "Long",
+    "BaseAdGroupId": "Long",
+    "BaseCampaignId": "Long",
+    "BiddingStrategyId": "Long",
+    "CampaignId": "Long",
+    "CreativeId": "Long",
+    "CriterionId": "Long",
+    "ExternalCustomerId": "Long",
+    "Id": "Long",
+    # attributes
+    "AccountCurrencyCode": "Enum",
+    "AccountDescriptiveName": "Label",
+    "AccountTimeZone": "Enum",
+    "AdGroupName": "Label",
+    "AdGroupStatus": "Enum",
+    "AdNetworkType1": "Enum",
+    "AdNetworkType2": "Enum",
+    "CampaignName": "Label",
+    "CampaignStatus": "Enum",
+    "ClickType": "Enum",
+    "Criteria": "String",
+    "CriteriaType": "Enum",
+    "Date": "Label",
+    "DayOfWeek": "Enum",
+    "Device": "Enum",
+    "HourOfDay": "Integer",
+    "KeywordMatchType": "Enum",
+    "Month": "Label",
+    "Query": "String",
+    "QueryMatchTypeWithVariant": "Enum",
+    "Slot": "Enum",
+    "Status": "Enum",
+    "Week": "Label",
+    # metrics
+    "AllConversions": "Double",
+    "AverageCpc": "Money",
+    "AverageCpm": "Money",
+    "AveragePosition": "Ratio",
+    "Clicks": "Long",
+    "ConversionValue": "Double",
+    "Conversions": "Double",
+    "Cost": "Money",
+    "CostPerConversion": "Money",
+    "Engagements": "Long",
+    "Impressions": "Long",
+    "Interactions": "Long",
+    "QualityScore": "Integer",
+    "VideoViews": "Long",
+}
+
+# segments split the rows of a report, e.g. selecting Device returns a row per keyword and device.
+# attributes and metrics don't, so they can be added to a report without changing its other columns.
+# see https://developers.google.com/adwords/api/docs/guides/reporting#segmentation
+SEGMENT_FIELDS = {
+    "AdFormat", "AdNetworkType1", "AdNetworkType2", "ClickType", "ConversionAdjustment",
+    "ConversionAdjustmentLagBucket", "ConversionAttributionEventType", "ConversionCategoryName",
+    "ConversionLagBucket", "ConversionTrackerId", "ConversionTypeName", "Date", "DayOfWeek", "Device",
+    "ExternalConversionSource", "HourOfDay", "Month", "MonthOfYear", "Quarter", "Slot", "Week", "Year",
+}
+
+# pandas dtypes used to parse each field type
+#   - "Label" are strings with few distinct values, e.g. names of campaigns
+#   - "Ratio" are doubles that are never summed up, so single precision is enough
+DTYPES = {
+    "Long": "Int64",
+    "Integer": "Int64",
+    "Money": "Int64",  # micro amounts
+    "Double": "float64",
+    "Ratio": "float32",
+    "Enum": "category",
+    "Label": "category",
+    "String": str,
+}
+
+# types that are safe to take over from ReportDefinitionService.
+# other types (e.g. Double or Bid) are partly formatted in reports, like "1.23%" or "auto: 10000".
+REMOTE_TYPES = {"Long", "Integer", "Money", "Enum", "String"}
+
+
+class FieldRegistry:
+    """ Knows the types of report fields and translates them to pandas dtypes.
+    The shipped FIELD_TYPES are used for all report types. Types of the ReportDefinitionService
+    can be registered per report type on top of them.
+    """
+    def __init__(self, field_types=None):
+        self.field_types = dict(FIELD_TYPES if field_types is None else field_types)
+        self._report_field_types = dict()
+        self._report_segments = dict()
+        self._lock = threading.Lock()
+
+    def register(self, report_type, report_fields):
+        """ registers the fields of a report type as returned by ReportDefinitionService.getReportFields
+        :param report_type: str
+        :param report_fields: list of ReportDefinitionField
+        """
+        field_types = dict()
+        segments = set()
+        for report_field in report_fields:
+            is_enum = "enumValues" in report_field and report_field["enumValues"]
+            field_type = "Enum" if is_enum else report_field["fieldType"]
+            if field_type in REMOTE_TYPES:
+                field_types[report_field["fieldName"]] = field_type
+            if "fieldBehavior" in report_field and report_field["fieldBehavior"] == "SEGMENT":
+                segments.add(report_field["fieldName"])
+        with self._lock:
+            self._report_field_types[report_type] = field_types
+            self._report_segments[report_type] = segments
+
+    def field_type(self, report_type, field):
+        """
+        :return: str or None if the type is unknown
+        """
+        shipped_type = self.field_types.get(field)
+        if shipped_type is not None:
+            return shipped_type
+        return self._report_field_types.get(report_type, dict()).get(field)
+
+    def is_segment(self, report_type, field):
+        """ the field behaviors of ReportDefinitionService if they are registered, else SEGMENT_FIELDS """
+        segments = self._report_segments.get(report_type)
+        if segments is None:
+            return field in SEGMENT_FIELDS
+        return field in segments
+
+    def dtypes(self, report_type, fields):
+        """
+        :param report_type: str
+        :param fields: list of str
+        :return: dict with pandas dtypes of all fields with known type
+        """
+        dtypes = dict()
+        for field in fields:
+            field_type = self.field_type(report_type, field)
+            if field_type is not None:
+                dtypes[field] = DTYPES[field_type]
+        return dtypes
+
+    def fields_of_type(self, report_type, fields, field_type):
+        """
+        :return: list of str, all fields of the given type
+        """
+        return [field for field in fields if self.field_type(report_type, field) == field_type]
@@ -0,0 +1,94 @@
+import os
+import json
+import threading
+
+from adwords_reports.storage import account_key, atomic_write
+
+FALLBACK_POSITIONS = ("first", "last")
+
+
+class AccountStats:
+    """ Remembers how long the reports of each account took to download and how many rows they had.
+    Values are smoothed over runs, recent runs weigh more:
+        {"<account id>": {"<report type>": {"seconds": float, "rows": float, "runs": int}}}
+    """
+    def __init__(self, path, smoothing=0.5):
+        """
+        :param path: str, json file, is created by save
+        :param smoothing: float between 0 and 1, weight of the latest run
+        """
+        self.path = path
+        self.smoothing = smoothing
+        self._stats = dict()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as stats_file:
+                self._stats = json.load(stats_file)
+
+    def record(self, account_id, report_type, seconds, rows):
+        """
+        :param account_id: str or int
+        :param report_type: str
+        :param seconds: float, duration of the download
+        :param rows: int
+        """
+        with self._lock:
+            report_stats = self._stats.setdefault(account_key(account_id), dict())
+            previous = report_stats.get(report_type)
+            if previous is None:
+                report_stats[report_type] = {"seconds": seconds, "rows": rows, "runs": 1}
+            else:
+                weight = self.smoothing
+                report_stats[report_type] = {
+                    "seconds": weight * seconds + (1 - weight) * previous["seconds"],
+                    "rows": weight * rows + (1 - weight) * previous["rows"],
+                    "runs": previous["runs"] + 1
+                }
+
+    def expected_seconds(self, account_id, report_type=None):
+        """
+        :param account_id: str or int
+        :param report_type: str, None for the sum over all report types of the account
+        :return: float or None if the account wasn't seen yet
+        """
+        report_stats = self._stats.get(account_key(account_id))
+        if not report_stats:
+            return None
+        if report_type is None:
+            return sum(stats["seconds"] for stats in report_stats.values())
+        stats = report_stats.get(report_type)
+        return None if stats is None else stats["seconds"]
+
+    def save(self):
+        """ writes the stats atomically """
+        with self._lock:
+            serialized = json.dumps(self._stats, sort_keys=True)
+        with atomic_write(self.path) as temp_path:
+            with open(temp_path, "w") as stats_file:
+                stats_file.write(serialized)
+
+
+def schedule(accounts, stats, report_type=None, fallback="first", fallback_key=None):
+    """ Orders accounts longest expected download first (longest-processing-time scheduling),
+    so a big account that would start last doesn't decide when a parallel run finishes.
+    :param accounts: iterable of Accounts
+    :param stats: AccountStats
+    :param report_type: str, None to schedule by the sum over all report types
+    :param fallback: str, one of FALLBACK_POSITIONS, where accounts without stats go. Since they may be big,
+        they're started first by default.
+    :param fallback_key: callable taking an Account, orders accounts without stats. None keeps their order.
+    :return: list of Accounts
+    """
+    assert fallback in FALLBACK_POSITIONS, "Fallback must be one of {}.".format(FALLBACK_POSITIONS)
+    seen, unseen = list(), list()
+    for account in accounts:
+        seconds = stats.expected_seconds(account.id, report_type)
+        if seconds is None:
+            unseen.append(account)
+        else:
+            seen.append((seconds, account))
+
+    seen = [account for _, account in sorted(seen, key=lambda item: item[0], reverse=True)]
+    if fallback_key is not None:
+        unseen = sorted(unseen, key=fallback_key)
+    return unseen + seen if fallback == "first" else seen + unseen
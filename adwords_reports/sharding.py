@@ -0,0 +1,274 @@
+import os
+import time
+import zlib
+import socket
+import sqlite3
+import threading
+import contextlib
+import multiprocessing
+
+from adwords_reports import logger
+from adwords_reports.job_runner import JobRunner, DONE, FAILED
+from adwords_reports.storage import account_key
+
+PENDING = "pending"
+CLAIMED = "claimed"
+
+
+def shard_of(account_id, shards):
+    """ stable across processes and machines, unlike hash() of strings, which is salted per process
+    :param account_id: str or int, with or without dashes
+    :param shards: int
+    :return: int between 0 and shards - 1
+    """
+    return (zlib.crc32(account_key(account_id).encode("utf-8")) & 0xffffffff) % shards
+
+
+class WorkQueue:
+    """ Accounts to download, shared by workers through a SQLite database, e.g. in a directory all nodes can reach.
+    Workers claim the accounts of their own shard first and pending accounts of other shards afterwards,
+    so fast workers take over the work of slow ones. Accounts of a worker that stopped sending heartbeats,
+    e.g. because its process or machine died, are claimed again by the others.
+    """
+    def __init__(self, path, shards, stale_seconds=300, claim_timeout=None, max_attempts=3, clock=time.time):
+        """
+        :param path: str, SQLite database, is created if it doesn't exist
+        :param shards: int, number of shards the accounts are split into
+        :param stale_seconds: float, a worker whose last heartbeat is older has stalled
+        :param claim_timeout: float, seconds after which an account is claimed again even if its worker is alive,
+            e.g. because it hangs on a download. None to wait for the worker.
+        :param max_attempts: int, an account whose workers stalled this often fails instead of being claimed again
+        :param clock: callable returning the current time in seconds, used for heartbeats and claims
+        """
+        self.path = path
+        self.shards = shards
+        self.stale_seconds = stale_seconds
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.clock = clock
+        with self._transaction() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS accounts (account_id TEXT PRIMARY KEY, shard INTEGER, "
+                               "status TEXT, worker TEXT, attempts INTEGER, error TEXT, updated REAL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS workers (worker TEXT PRIMARY KEY, heartbeat REAL)")
+
+    def add(self, account_ids):
+        """ adds accounts as pending, accounts that are known already keep their status
+        :param account_ids: iterable of str or int
+        """
+        now = self.clock()
+        rows = [(account_key(account_id), shard_of(account_id, self.shards), PENDING, now)
+                for account_id in account_ids]
+        with self._transaction() as connection:
+            connection.executemany("INSERT OR IGNORE INTO accounts (account_id, shard, status, attempts, updated) "
+                                   "VALUES (?, ?, ?, 0, ?)", rows)
+
+    def heartbeat(self, worker):
+        with self._transaction() as connection:
+            self._heartbeat(connection, worker)
+
+    def claim(self, worker, shard, account_ids=None):
+        """
+        :param worker: str, unique name of the worker
+        :param shard: int, the worker's own shard
+        :param account_ids: collection of str, the accounts the worker can access, e.g. with its credentials.
+            None for all.
+        :return: str, id of the claimed account or None if there's nothing left to do
+        """
+        now = self.clock()
+        with self._transaction() as connection:
+            self._heartbeat(connection, worker)
+            rows = connection.execute(
+                "SELECT a.account_id, a.shard, a.status, a.worker, a.attempts, a.updated, w.heartbeat "
+                "FROM accounts a LEFT JOIN workers w ON a.worker = w.worker "
+                "WHERE a.status IN (?, ?)", (PENDING, CLAIMED)).fetchall()
+
+            candidates = list()
+            for account_id, account_shard, status, owner, attempts, updated, heartbeat in rows:
+                if account_ids is not None and account_id not in account_ids:
+                    continue
+                if status == CLAIMED and not self._is_stalled(now, updated, heartbeat):
+                    continue
+                if status == CLAIMED and attempts >= self.max_attempts:
+                    logger.warning("Account {} failed, its worker {} stalled {} times.".format(
+                        account_id, owner, attempts))
+                    connection.execute("UPDATE accounts SET status = ?, error = ?, updated = ? WHERE account_id = ?",
+                                       (FAILED, "worker stalled", now, account_id))
+                    continue
+                candidates.append((status != PENDING, account_shard != shard, account_id, owner))
+            if not candidates:
+                return None
+
+            reclaimed, _, account_id, owner = min(candidates)
+            if reclaimed:
+                logger.warning("Worker {} stalled, account {} is claimed by {}.".format(owner, account_id, worker))
+            connection.execute("UPDATE accounts SET status = ?, worker = ?, attempts = attempts + 1, updated = ? "
+                               "WHERE account_id = ?", (CLAIMED, worker, now, account_id))
+            return account_id
+
+    def complete(self, worker, account_id, status, error=None):
+        """
+        :param worker: str
+        :param account_id: str
+        :param status: str, DONE or FAILED
+        :param error: str
+        :return: bool, False if the account was claimed by another worker in the meantime
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE accounts SET status = ?, error = ?, updated = ? WHERE account_id = ? AND worker = ? "
+                "AND status = ?", (status, error, self.clock(), account_key(account_id), worker, CLAIMED))
+            return cursor.rowcount == 1
+
+    def retry_failed(self):
+        """ makes failed accounts pending again """
+        with self._transaction() as connection:
+            connection.execute("UPDATE accounts SET status = ?, attempts = 0, error = NULL WHERE status = ?",
+                               (PENDING, FAILED))
+
+    def counts(self):
+        """
+        :return: dict with the number of accounts per status
+        """
+        with self._transaction() as connection:
+            return dict(connection.execute("SELECT status, COUNT(*) FROM accounts GROUP BY status").fetchall())
+
+    def _is_stalled(self, now, updated, heartbeat):
+        if heartbeat is None or now - heartbeat > self.stale_seconds:
+            return True
+        return self.claim_timeout is not None and now - updated > self.claim_timeout
+
+    def _heartbeat(self, connection, worker):
+        connection.execute("INSERT OR REPLACE INTO workers (worker, heartbeat) VALUES (?, ?)", (worker, self.clock()))
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """ a connection per transaction, so the queue can be used by several threads and processes """
+        connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+
+class ShardedRunner:
+    """ Downloads report definitions for all accounts with several worker processes, each with its own Client,
+    interpreter lock and possibly its own credentials, so parsing scales with cores as well.
+    Accounts are split into stable shards by their id. Workers coordinate through a WorkQueue in the directory,
+    so workers on other machines that share it can join with work().
+    Reports are stored like JobRunner stores them, each worker keeps its own manifest.
+    """
+    def __init__(self, credentials_paths, directory, workers=None, shards=None, file_format="parquet",
+                 stale_seconds=300, heartbeat_seconds=10, claim_timeout=None, client_factory=None, **client_options):
+        """
+        :param credentials_paths: list of str, googleads .yaml files, worker i uses credentials_paths[i % len]
+        :param directory: str, shared by all workers, holds the reports, the queue and the manifests
+        :param workers: int, number of worker processes started by run. Defaults to one per credentials file.
+        :param shards: int, number of shards over all machines. Defaults to workers.
+        :param file_format: str, one of storage.FILE_FORMATS
+        :param stale_seconds: float, accounts of a worker without heartbeat for this long are claimed again
+        :param heartbeat_seconds: float, interval of the heartbeats of a worker
+        :param claim_timeout: float, see WorkQueue
+        :param client_factory: callable taking a credentials path and client_options, returns a Client.
+            Defaults to Client. Has to be picklable if processes aren't forked.
+        :param client_options: passed to the client_factory, e.g. parser or compress of the Client
+        """
+        assert heartbeat_seconds < stale_seconds, "Heartbeats have to be more frequent than stale_seconds."
+        self.credentials_paths = list(credentials_paths)
+        self.directory = directory
+        self.workers = workers or len(self.credentials_paths)
+        self.shards = shards or self.workers
+        self.file_format = file_format
+        self.heartbeat_seconds = heartbeat_seconds
+        self.client_factory = client_factory
+        self.client_options = client_options
+        for path in (directory, os.path.join(directory, "manifests")):
+            if not os.path.isdir(path):
+                os.makedirs(path)
+        self.queue = WorkQueue(os.path.join(directory, "queue.sqlite"), self.shards, stale_seconds=stale_seconds,
+                               claim_timeout=claim_timeout)
+
+    def run(self, report_definitions, zero_impressions, convert_money=False):
+        """ starts the worker processes and waits until they're finished
+        :param report_definitions: list of ReportDefinitions
+        :param zero_impressions: bool
+        :param convert_money: bool, convert money fields like Cost from micro amounts to regular amounts
+        :return: dict with the number of accounts per status
+        """
+        processes = [multiprocessing.Process(target=self.work, name="adwords-reports-worker-{}".format(index),
+                                             args=(index, report_definitions, zero_impressions, convert_money))
+                     for index in range(self.workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            if process.exitcode != 0:
+                logger.warning("{} exited with code {}.".format(process.name, process.exitcode))
+
+        counts = self.queue.counts()
+        logger.info("Sharded job finished: {}".format(", ".join(
+            "{} {}".format(count, status) for status, count in sorted(counts.items()))))
+        return counts
+
+    def work(self, index, report_definitions, zero_impressions, convert_money=False, worker=None):
+        """ runs a single worker in this process until no account is left, e.g. on another machine
+        :param index: int, picks the worker's shard and credentials
+        :param report_definitions: list of ReportDefinitions
+        :param zero_impressions: bool
+        :param convert_money: bool
+        :param worker: str, unique name of the worker, defaults to host name and process id
+        :return: dict with the number of accounts this worker finished per status
+        """
+        worker = worker or "{}-{}".format(socket.gethostname(), os.getpid())
+        client = self._client(self.credentials_paths[index % len(self.credentials_paths)])
+        for report_definition in report_definitions:
+            client.validate(report_definition)
+
+        accounts = {account_key(account.id): account for account in client.accounts()}
+        self.queue.add(accounts)
+        runner = JobRunner(client, self.directory, self.file_format,
+                           manifest_path=os.path.join(self.directory, "manifests", "{}.jsonl".format(worker)))
+
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self._send_heartbeats, args=(worker, stopped))
+        heartbeat.daemon = True
+        heartbeat.start()
+
+        result = {DONE: 0, FAILED: 0}
+        try:
+            while True:
+                account_id = self.queue.claim(worker, index % self.shards, accounts)
+                if account_id is None:
+                    break
+                try:
+                    units = runner.run_account(accounts[account_id], report_definitions, zero_impressions,
+                                               convert_money)
+                    status, message = (FAILED, ", ".join(units[FAILED])) if units[FAILED] else (DONE, None)
+                except Exception as error:
+                    logger.warning("Account {} failed: {}".format(account_id, error))
+                    status, message = FAILED, repr(error)
+                if self.queue.complete(worker, account_id, status, error=message):
+                    result[status] += 1
+        finally:
+            stopped.set()
+            if client.account_stats is not None:
+                client.account_stats.save()
+        return result
+
+    def _client(self, credentials_path):
+        if self.client_factory is not None:
+            return self.client_factory(credentials_path, **self.client_options)
+        from adwords_reports.client import Client
+        return Client(credentials_path, **self.client_options)
+
+    def _send_heartbeats(self, worker, stopped):
+        while not stopped.wait(self.heartbeat_seconds):
+            try:
+                self.queue.heartbeat(worker)
+            except sqlite3.Error as error:
+                logger.warning("Heartbeat of worker {} failed: {}".format(worker, error))
@@ -0,0 +1,82 @@
+import os
+import gzip
+
+from adwords_reports.incremental_sync import PartitionStore
+from adwords_reports.storage import account_key
+
+# A sink is any object with a write(account, report) method, see Client.download_to.
+# Each report is written as soon as it's downloaded, so it can be released right away.
+
+
+class PartitionedSink:
+    """ Writes one file per account and date range, partitioned hive-style by account:
+        <directory>/account_id=<account id>/<date_min>_<date_max>.<format>
+    pd.read_parquet(directory) reads all accounts at once and adds their ids as column account_id.
+    """
+    def __init__(self, directory, report_definition, file_format="parquet"):
+        """
+        :param directory: str, is created if it doesn't exist
+        :param report_definition: ReportDefinition, its date range names the files
+        :param file_format: str, one of storage.FILE_FORMATS
+        """
+        self.directory = directory
+        self.report_definition = report_definition
+        self.file_format = file_format
+        # a partition store without report level
+        self.store = PartitionStore(directory, file_format, account_prefix="account_id=")
+
+    def write(self, account, report):
+        self.store.write(account.id, "", self.report_definition, report)
+
+    def path(self, account_id):
+        return self.store.path(account_id, "", self.report_definition)
+
+
+class CsvSink:
+    """ Appends the reports of all accounts to one csv file, gzipped if the path ends with .gz.
+    The header is written only if the file is new, so runs can append to the same file.
+    """
+    def __init__(self, path, account_column="AccountId"):
+        """
+        :param path: str
+        :param account_column: str, name of a first column with the account id. None to leave it out.
+        """
+        self.path = path
+        self.account_column = account_column
+
+    def write(self, account, report):
+        if self.account_column is not None:
+            report = report.copy(deep=False)
+            report.insert(0, self.account_column, account_key(account.id))
+        header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+
+        if not self.path.endswith(".gz"):
+            with open(self.path, "a") as csv_file:
+                report.to_csv(csv_file, header=header, index=False)
+            return
+
+        # gzip files have no text mode on python 2, so they're written encoded.
+        # Each append adds a gzip member, which concatenate to one valid gzip file.
+        data = report.to_csv(header=header, index=False)
+        if not isinstance(data, bytes):
+            data = data.encode("utf-8")
+        with gzip.open(self.path, "ab") as csv_file:
+            csv_file.write(data)
+
+
+class CallbackSink:
+    """ Hands each report, or batches of its rows, to a callable, e.g. to insert them into a database. """
+    def __init__(self, callback, batch_size=None):
+        """
+        :param callback: callable taking an Account and a DataFrame
+        :param batch_size: int, maximum number of rows per call. None to pass whole reports.
+        """
+        self.callback = callback
+        self.batch_size = batch_size
+
+    def write(self, account, report):
+        if self.batch_size is None:
+            self.callback(account, report)
+            return
+        for start in range(0, len(report), self.batch_size):
+            self.callback(account, report.iloc[start:start + self.batch_size])
@@ -0,0 +1,85 @@
+import os
+import threading
+import contextlib
+
+# columnar formats need pyarrow, pickle works with pandas only
+FILE_FORMATS = ("parquet", "feather", "pickle")
+
+
+def account_key(account_id):
+    """
+    :param account_id: str or int, e.g. 123-456-7890 or 1234567890
+    :return: str, the id without dashes, as used in file names, cache keys and columns
+    """
+    return str(account_id).replace("-", "")
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    """ Yields a temporary path next to path, e.g. to write a file to. It replaces path once the block
+    succeeded, so readers never see a partly written file. Its name is unique per process and thread,
+    so concurrent writers of the same path don't write into each other's temporary files.
+        with atomic_write(path) as temp_path:
+            write_frame(report, temp_path, file_format)
+    :param path: str, its directory is created if it doesn't exist
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):  # created by another writer in the meantime
+                raise
+
+    temp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.current_thread().ident)
+    try:
+        yield temp_path
+        if os.path.exists(path) and os.name == "nt":
+            os.remove(path)  # rename doesn't overwrite on windows
+        os.rename(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def extension(file_format):
+    _validate(file_format)
+    return "." + file_format
+
+
+def write_frame(report, path, file_format):
+    """ writes a DataFrame to disk
+    :param report: DataFrame
+    :param path: str
+    :param file_format: str, one of FILE_FORMATS
+    """
+    _validate(file_format)
+    if file_format == "parquet":
+        report.to_parquet(path)
+    elif file_format == "feather":
+        # feather doesn't store indices
+        report.reset_index(drop=True).to_feather(path)
+    else:
+        report.to_pickle(path)
+
+
+def read_frame(path, file_format):
+    """ reads a DataFrame written by write_frame
+    :param path: str
+    :param file_format: str, one of FILE_FORMATS
+    :return: DataFrame
+    """
+    # imported here, so modules that just write small files atomically import fast
+    import pandas as pd
+
+    _validate(file_format)
+    if file_format == "parquet":
+        return pd.read_parquet(path)
+    elif file_format == "feather":
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+def _validate(file_format):
+    if file_format not in FILE_FORMATS:
+        raise ValueError("Unknown file format {}, use one of {}.".format(file_format, FILE_FORMATS))
@@ -0,0 +1,254 @@
+import io
+import time
+import calendar
+import threading
+from xml.sax.saxutils import escape
+
+from suds.transport import Transport, Reply, TransportError
+
+from adwords_reports import logger
+
+try:
+    from urllib.parse import urlencode
+except ImportError:  # python 2
+    from urllib import urlencode
+
+DEFAULT_SERVER = "https://adwords.google.com"
+# keyword arguments of googleads.adwords.ReportDownloader and the http headers they're sent as
+REPORT_HEADERS = {
+    "skip_report_header": "skipReportHeader",
+    "skip_column_header": "skipColumnHeader",
+    "skip_report_summary": "skipReportSummary",
+    "include_zero_impressions": "includeZeroImpressions",
+    "use_raw_enum_values": "useRawEnumValues"
+}
+# the part of the ReportDefinition schema that report_definition_xml serializes, in the order of the schema.
+# Report downloads ignore ordering and paging of selectors, they're rejected like all other keys.
+REPORT_DEFINITION_KEYS = ("selector", "reportName", "reportType", "dateRangeType", "downloadFormat")
+SELECTOR_KEYS = ("fields", "predicates", "dateRange")
+
+
+class PooledTransport:
+    """ Keep-alive HTTP connections that are shared by all threads and sessions of a client,
+    for report downloads as well as for SOAP calls. Requests reuse an idle connection to the same host,
+    so the TCP and TLS handshakes are only done once per connection instead of once per request.
+    """
+    def __init__(self, pool_size=10, block=True, timeout=None, server=DEFAULT_SERVER):
+        """
+        :param pool_size: int, connections that are kept per host
+        :param block: bool, requests wait for a free connection if all of them are in use.
+            Otherwise additional connections are opened and closed after their request.
+        :param timeout: float, seconds to wait for a connection or for data. None to wait forever.
+        :param server: str, base url of the AdWords API, e.g. of a local stand-in
+        """
+        import urllib3
+
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.server = server
+        # retries are up to the RetryPolicy of the client
+        self._pool = urllib3.PoolManager(maxsize=pool_size, block=block, retries=False,
+                                         timeout=urllib3.Timeout(connect=timeout, read=timeout))
+
+    def request(self, method, url, body=None, headers=None, stream=False):
+        """
+        :param method: str, e.g. "POST"
+        :param url: str
+        :param body: bytes or str
+        :param headers: dict
+        :param stream: bool, the body is read by the caller, see PooledStream
+        :return: urllib3.HTTPResponse
+        """
+        return self._pool.request(method, url, body=body, headers=headers, preload_content=not stream)
+
+    def attach(self, service):
+        """ makes a SOAP service proxy of googleads send its requests through the pool """
+        suds_client = getattr(service, "suds_client", None)
+        if suds_client is not None:
+            suds_client.set_options(transport=SudsTransport(self))
+        return service
+
+    def clear(self):
+        """ closes all connections """
+        self._pool.clear()
+
+
+class PooledStream:
+    """ Read-only file-like body of a response. The connection goes back to the pool if the body was read
+    completely, otherwise it's closed, since unread data would mix with the next response.
+    """
+    def __init__(self, response):
+        self.response = response
+        self._exhausted = False
+
+    def read(self, size=-1):
+        data = self.response.read(None if size is None or size < 0 else size)
+        if not data and size != 0:
+            self._exhausted = True
+        return data
+
+    def readable(self):
+        return True
+
+    def close(self):
+        if self._exhausted or self.response.length_remaining == 0:
+            self.response.release_conn()
+        else:
+            self.response.close()
+
+
+class ReportDownloadError(Exception):
+    """ same attributes as googleads.errors.AdWordsReportError """
+    def __init__(self, code, content):
+        super(ReportDownloadError, self).__init__("ReportDownloadError(code={}, content={})".format(code, content))
+        self.code = code
+        self.content = content
+
+
+class PooledReportDownloader:
+    """ Same interface as googleads.adwords.ReportDownloader, but downloads through a PooledTransport """
+    def __init__(self, transport, adwords_client, api_version):
+        """
+        :param transport: PooledTransport
+        :param adwords_client: AdWordsClient, the session, reports are downloaded for its client customer id
+        :param api_version: str
+        """
+        self.transport = transport
+        self._adwords_client = adwords_client
+        self._url = "{}/api/adwords/reportdownload/{}".format(transport.server, api_version)
+        self._namespace = "https://adwords.google.com/api/adwords/cm/{}".format(api_version)
+
+    def DownloadReportAsString(self, report_definition, **kwargs):
+        response = self._request(report_definition, kwargs, stream=False)
+        return response.data.decode("utf-8")
+
+    def DownloadReportAsStream(self, report_definition, **kwargs):
+        return PooledStream(self._request(report_definition, kwargs, stream=True))
+
+    def DownloadReport(self, report_definition, output, **kwargs):
+        stream = self.DownloadReportAsStream(report_definition, **kwargs)
+        try:
+            for chunk in iter(lambda: stream.read(64 * 1024), b""):
+                output.write(chunk)
+        finally:
+            stream.close()
+
+    def _request(self, report_definition, options, stream):
+        session = self._adwords_client
+        headers = dict(session.oauth2_client.CreateHttpHeader())
+        headers.update({
+            "Content-Type": "application/x-www-form-urlencoded",
+            "developerToken": session.developer_token,
+            "clientCustomerId": str(session.client_customer_id),
+            "User-Agent": "{},adwords_reports".format(getattr(session, "user_agent", None) or "unknown")
+        })
+        for option, value in options.items():
+            headers[REPORT_HEADERS[option]] = str(value).lower()
+
+        body = urlencode({"__rdxml": report_definition_xml(report_definition, self._namespace)})
+        response = self.transport.request("POST", self._url, body=body, headers=headers, stream=stream)
+        if response.status != 200:
+            content = response.data.decode("utf-8", "replace")
+            response.release_conn()
+            raise ReportDownloadError(response.status, content)
+        return response
+
+
+class SudsTransport(Transport):
+    """ suds transport that sends SOAP requests and fetches WSDLs through a PooledTransport """
+    def __init__(self, transport):
+        Transport.__init__(self)
+        self.transport = transport
+
+    def open(self, request):
+        return io.BytesIO(self._request("GET", request).data)
+
+    def send(self, request):
+        response = self._request("POST", request)
+        if response.status in (202, 204):
+            return None
+        return Reply(response.status, dict(response.headers), response.data)
+
+    def _request(self, method, request):
+        response = self.transport.request(method, request.url, body=request.message, headers=request.headers)
+        if response.status >= 300 and response.status not in (202, 204):
+            # suds reads SOAP faults from the error
+            raise TransportError(response.reason, response.status, io.BytesIO(response.data))
+        return response
+
+
+class TokenCache:
+    """ Wraps the OAuth2 client of googleads, so the access token is refreshed by one thread for all threads
+    and sessions, and reused until shortly before it expires.
+    """
+    def __init__(self, oauth2_client, ttl=3000, margin=60):
+        """
+        :param oauth2_client: googleads.oauth2.GoogleOAuth2Client
+        :param ttl: float, seconds a token is reused if its expiry is unknown
+        :param margin: float, seconds before the expiry at which a token is refreshed
+        """
+        self.oauth2_client = oauth2_client
+        self.ttl = ttl
+        self.margin = margin
+        self._header = None
+        self._expires = 0.
+        self._lock = threading.Lock()
+
+    def CreateHttpHeader(self):
+        with self._lock:
+            if self._header is None or time.time() >= self._expires:
+                logger.info("Refreshing OAuth2 access token.")
+                self._header = dict(self.oauth2_client.CreateHttpHeader())
+                self._expires = self._expiry()
+            return dict(self._header)
+
+    def _expiry(self):
+        # google-auth credentials know when their token expires, as naive datetime in UTC
+        expiry = getattr(getattr(self.oauth2_client, "creds", None), "expiry", None)
+        if expiry is None:
+            return time.time() + self.ttl
+        return calendar.timegm(expiry.utctimetuple()) - self.margin
+
+    def __getattr__(self, name):
+        return getattr(self.oauth2_client, name)
+
+
+def report_definition_xml(report_definition, namespace):
+    """ Serializes a raw report definition in the order of the ReportDefinition schema of the API.
+    Only the keys of REPORT_DEFINITION_KEYS and SELECTOR_KEYS are supported, i.e. everything ReportDefinition.raw
+    contains. Others raise a ValueError instead of being dropped.
+    :param report_definition: dict, see ReportDefinition.raw
+    :param namespace: str, xml namespace of the API version
+    :return: str
+    """
+    _check_keys(report_definition, REPORT_DEFINITION_KEYS, "report definition")
+    selector = report_definition["selector"]
+    _check_keys(selector, SELECTOR_KEYS, "selector")
+    parts = ["<reportDefinition xmlns=\"{}\">".format(namespace), "<selector>"]
+    parts.extend(_element("fields", field) for field in selector["fields"])
+    for predicate in selector.get("predicates") or list():
+        values = predicate["values"] if isinstance(predicate["values"], (list, tuple)) else [predicate["values"]]
+        parts.append("<predicates>{}{}{}</predicates>".format(
+            _element("field", predicate["field"]), _element("operator", predicate["operator"]),
+            "".join(_element("values", value) for value in values)))
+    date_range = selector.get("dateRange")
+    if date_range is not None:
+        parts.append("<dateRange>{}{}</dateRange>".format(_element("min", date_range["min"]),
+                                                          _element("max", date_range["max"])))
+    parts.append("</selector>")
+    for key in REPORT_DEFINITION_KEYS[1:]:
+        if key in report_definition:
+            parts.append(_element(key, report_definition[key]))
+    parts.append("</reportDefinition>")
+    return "".join(parts)
+
+
+def _check_keys(mapping, supported, name):
+    unsupported = sorted(key for key in mapping if key not in supported)
+    if unsupported:
+        raise ValueError("The pooled report downloader doesn't support {} of the {}, only {}.".format(
+            unsupported, name, list(supported)))
+
+
+def _element(name, value):
+    return "<{0}>{1}</{0}>".format(name, escape(str(value)))
@@ -0,0 +1,307 @@
+"""
+Offline benchmarks of listing accounts, downloading and parsing reports against the fake AdWords API.
+Each benchmark returns a dict of metrics: seconds, rows, rows_per_second, mb, mb_per_second, peak_mb.
+
+usage: python -m benchmarks.bench_download [results.json]
+"""
+import os
+import sys
+import json
+import asyncio
+import time
+import shutil
+import tempfile
+import functools
+import tracemalloc
+
+from adwords_reports.aggregation import Agg
+from adwords_reports.async_client import AsyncClient
+from adwords_reports.client import Client
+from adwords_reports.job_runner import Manifest, DONE
+from adwords_reports.rate_limit import RetryPolicy
+from adwords_reports.report_definition import ReportDefinition
+from adwords_reports.scheduling import AccountStats
+from adwords_reports.sharding import ShardedRunner
+from adwords_reports.transport import PooledTransport
+
+from benchmarks.fake_adwords import FakeAdWordsClient, FakeManagedCustomerService, FakeReportServer
+
+KEYWORD_FIELDS = [
+    "Date", "CampaignName", "AdGroupId", "Id", "Criteria", "KeywordMatchType", "Device",
+    "Impressions", "Clicks", "Conversions", "Cost", "AveragePosition"
+]
+
+
+def keyword_report_definition():
+    return ReportDefinition(report_type="KEYWORDS_PERFORMANCE_REPORT", fields=KEYWORD_FIELDS,
+                            date_from="2018-01-01", date_to="2018-01-31")
+
+
+def fake_client(report_server, customer_service=None, compress=True, **kwargs):
+    customer_service = customer_service or FakeManagedCustomerService(depth=1, branching=1)
+    adwords_client = FakeAdWordsClient(report_server, customer_service)
+    return Client.from_adwords_client(adwords_client, wsdl_cache_dir=None, field_cache_dir=None, compress=compress,
+                                      retry_policy=RetryPolicy(base_delay=0.01), **kwargs)
+
+
+def measure(func, trace_memory=True):
+    """ tracing memory slows down allocations a lot, so func is timed and traced in separate runs
+    :return: tuple of (result of func, seconds, peak memory in MB or None)
+    """
+    start = time.time()
+    result = func()
+    seconds = time.time() - start
+    if not trace_memory:
+        return result, seconds, None
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak / 10. ** 6
+
+
+def metrics(seconds, peak_mb, rows=0, n_bytes=0):
+    return {
+        "seconds": seconds,
+        "peak_mb": peak_mb,
+        "rows": rows,
+        "rows_per_second": rows / seconds,
+        "mb": n_bytes / 10. ** 6,
+        "mb_per_second": n_bytes / 10. ** 6 / seconds
+    }
+
+
+def bench_download(rows=200000, compress=True, parser="pandas"):
+    """ one big report, parsed as a whole """
+    with FakeReportServer(rows=rows) as server:
+        account = next(fake_client(server, compress=compress).accounts())
+        report_definition = keyword_report_definition()
+        account.download(report_definition, zero_impressions=True)  # the server creates the report once
+        sent_before = server.bytes_sent
+
+        report, seconds, peak_mb = measure(
+            lambda: account.download(report_definition, zero_impressions=True, parser=parser))
+        return metrics(seconds, peak_mb, rows=len(report), n_bytes=(server.bytes_sent - sent_before) / 2)
+
+
+def bench_download_chunks(rows=200000, chunksize=20000):
+    """ one big report, streamed and parsed chunk by chunk """
+    with FakeReportServer(rows=rows) as server:
+        account = next(fake_client(server).accounts())
+        report_definition = keyword_report_definition()
+        account.download(report_definition, zero_impressions=True)
+        sent_before = server.bytes_sent
+
+        def download():
+            return sum(len(chunk) for chunk in account.download_chunks(
+                report_definition, zero_impressions=True, chunksize=chunksize))
+
+        n_rows, seconds, peak_mb = measure(download)
+        return metrics(seconds, peak_mb, rows=n_rows, n_bytes=(server.bytes_sent - sent_before) / 2)
+
+
+def keyword_aggregate(chunksize=20000):
+    return Agg(by=["Date", "Device"], sums=["Impressions", "Clicks", "Cost"], chunksize=chunksize)
+
+
+def bench_download_aggregated(rows=200000, chunksize=20000):
+    """ one big report, folded into daily sums per device while it's streamed """
+    with FakeReportServer(rows=rows) as server:
+        account = next(fake_client(server).accounts())
+        report_definition = keyword_report_definition()
+        account.download(report_definition, zero_impressions=True)
+        sent_before = server.bytes_sent
+
+        report, seconds, peak_mb = measure(lambda: account.download(
+            report_definition, zero_impressions=True, aggregate=keyword_aggregate(chunksize)))
+        result = metrics(seconds, peak_mb, rows=rows, n_bytes=(server.bytes_sent - sent_before) / 2)
+        result["groups"] = len(report)
+        return result
+
+
+def bench_download_all(accounts=50, rows=500, latency=0.2, max_workers=8):
+    """ many small reports with network latency, downloaded in parallel """
+    with FakeReportServer(rows=rows, latency=latency) as server:
+        customer_service = FakeManagedCustomerService(depth=1, branching=accounts)
+        client = fake_client(server, customer_service)
+        report_definition = keyword_report_definition()
+
+        def download():
+            return sum(len(report) for _, report in client.download_all(
+                report_definition, zero_impressions=True, max_workers=max_workers))
+
+        n_rows, seconds, peak_mb = measure(download, trace_memory=False)
+        return metrics(seconds, peak_mb, rows=n_rows, n_bytes=server.bytes_sent)
+
+
+def bench_async_download_all(accounts=200, rows=100, latency=0.2, max_concurrency=50):
+    """ many small reports with network latency, downloaded by tasks of a single event loop """
+    with FakeReportServer(rows=rows, latency=latency) as server:
+        customer_service = FakeManagedCustomerService(depth=1, branching=accounts)
+        client = AsyncClient(fake_client(server, customer_service), max_concurrency=max_concurrency)
+        report_definition = keyword_report_definition()
+
+        async def download_all():
+            n_rows = 0
+            async for _, report in client.download_all(report_definition, zero_impressions=True):
+                n_rows += len(report)
+            return n_rows
+
+        def download():
+            loop = asyncio.new_event_loop()
+            try:
+                return loop.run_until_complete(download_all())
+            finally:
+                loop.close()
+
+        try:
+            n_rows, seconds, peak_mb = measure(download, trace_memory=False)
+        finally:
+            client.close()
+        return metrics(seconds, peak_mb, rows=n_rows, n_bytes=server.bytes_sent)
+
+
+def bench_download_all_pooled(accounts=100, rows=100, connect_latency=0.1, max_workers=8, pooled=True):
+    """ many small reports over connections that take a while to set up, e.g. because of TLS handshakes.
+    Pooled downloads reuse keep-alive connections, the others open one per report.
+    """
+    with FakeReportServer(rows=rows, connect_latency=connect_latency) as server:
+        customer_service = FakeManagedCustomerService(depth=1, branching=accounts)
+        transport = PooledTransport(pool_size=max_workers, server=server.server) if pooled else None
+        client = fake_client(server, customer_service, transport=transport)
+        report_definition = keyword_report_definition()
+
+        def download():
+            return sum(len(report) for _, report in client.download_all(
+                report_definition, zero_impressions=True, max_workers=max_workers))
+
+        n_rows, seconds, peak_mb = measure(download, trace_memory=False)
+        result = metrics(seconds, peak_mb, rows=n_rows, n_bytes=server.bytes_sent)
+        result["connections"] = server.connections
+        result["requests"] = server.requests
+        return result
+
+
+def bench_download_all_skewed(accounts=24, latency=0.2, giant_latency=2., max_workers=4, scheduled=True):
+    """ one account takes much longer than the others and is listed last.
+    If scheduled, the stats of a first run make the second one start with it.
+    """
+    stats = AccountStats(os.path.join(tempfile.mkdtemp(), "stats.json")) if scheduled else None
+    giant_id = list()
+
+    def account_latency(account_id):
+        return giant_latency if account_id in giant_id else latency
+
+    with FakeReportServer(rows=100, latency=account_latency) as server:
+        customer_service = FakeManagedCustomerService(depth=1, branching=accounts)
+        client = fake_client(server, customer_service, account_stats=stats)
+        giant_id.append(list(client.accounts())[-1].id)
+        report_definition = keyword_report_definition()
+
+        def download():
+            return sum(len(report) for _, report in client.download_all(
+                report_definition, zero_impressions=True, max_workers=max_workers))
+
+        if scheduled:
+            download()
+        n_rows, seconds, peak_mb = measure(download, trace_memory=False)
+        result = metrics(seconds, peak_mb, rows=n_rows, n_bytes=server.bytes_sent)
+        # when the giant account started in the measured run, 0 for first
+        result["giant_position"] = server.account_ids[-accounts:].index(giant_id[0])
+        return result
+
+
+def bench_download_with_errors(accounts=20, rows=2000, error_rate=0.3):
+    """ same as bench_download_all, but a share of requests fails and has to be retried """
+    with FakeReportServer(rows=rows, error_rate=error_rate) as server:
+        customer_service = FakeManagedCustomerService(depth=1, branching=accounts)
+        client = fake_client(server, customer_service)
+        report_definition = keyword_report_definition()
+
+        def download():
+            return sum(len(report) for _, report in client.download_all(
+                report_definition, zero_impressions=True, max_workers=4))
+
+        n_rows, seconds, peak_mb = measure(download, trace_memory=False)
+        result = metrics(seconds, peak_mb, rows=n_rows, n_bytes=server.bytes_sent)
+        result["requests"] = server.requests
+        return result
+
+
+def bench_accounts(depth=2, branching=40, latency=0.02, max_workers=4):
+    """ listing a big hierarchy page by page """
+    with FakeReportServer() as server:
+        customer_service = FakeManagedCustomerService(depth=depth, branching=branching, latency=latency)
+        client = fake_client(server, customer_service)
+
+        accounts, seconds, peak_mb = measure(lambda: list(client.accounts(max_workers=max_workers)),
+                                             trace_memory=False)
+        return metrics(seconds, peak_mb, rows=len(accounts))
+
+
+class _ServerAddress:
+    """ picklable stand-in of a FakeReportServer for clients in worker processes """
+    def __init__(self, url):
+        self.url = url
+
+
+def _sharded_client(credentials_path, url, accounts):
+    return fake_client(_ServerAddress(url), FakeManagedCustomerService(depth=1, branching=accounts))
+
+
+def bench_sharded(accounts=16, rows=2000, latency=0.2, workers=4):
+    """ accounts with network latency, downloaded by worker processes that share a queue """
+    with FakeReportServer(rows=rows, latency=latency) as server:
+        client_factory = functools.partial(_sharded_client, url=server.url, accounts=accounts)
+        directory = tempfile.mkdtemp()
+        try:
+            runner = ShardedRunner(["fake.yaml"], directory, workers=workers, file_format="pickle",
+                                   client_factory=client_factory)
+            counts, seconds, peak_mb = measure(
+                lambda: runner.run([keyword_report_definition()], zero_impressions=True), trace_memory=False)
+            manifests = os.path.join(directory, "manifests")
+            accounts_per_worker = sorted(len(Manifest(os.path.join(manifests, file_name)).units(DONE))
+                                         for file_name in os.listdir(manifests))
+        finally:
+            shutil.rmtree(directory)
+        result = metrics(seconds, peak_mb, rows=counts.get("done", 0) * rows, n_bytes=server.bytes_sent)
+        result["requests"] = server.requests
+        result["accounts_per_worker"] = accounts_per_worker
+        return result
+
+
+BENCHMARKS = {
+    "download": bench_download,
+    "download_chunks": bench_download_chunks,
+    "download_uncompressed": lambda: bench_download(compress=False),
+    "download_pyarrow": lambda: bench_download(parser="pyarrow"),
+    "download_aggregated": bench_download_aggregated,
+    "download_all": bench_download_all,
+    "async_download_all": bench_async_download_all,
+    "download_all_pooled": bench_download_all_pooled,
+    "download_all_unpooled": lambda: bench_download_all_pooled(pooled=False),
+    "download_all_skewed": bench_download_all_skewed,
+    "download_all_skewed_unscheduled": lambda: bench_download_all_skewed(scheduled=False),
+    "download_with_errors": bench_download_with_errors,
+    "accounts": bench_accounts,
+    "sharded": bench_sharded,
+    "sharded_single_worker": lambda: bench_sharded(workers=1),
+}
+
+
+def run_all():
+    return {name: benchmark() for name, benchmark in sorted(BENCHMARKS.items())}
+
+
+if __name__ == "__main__":
+    results = run_all()
+    for name, result in sorted(results.items()):
+        print("{:<32} {:8.3f}s {:12.0f} rows/s {:8.2f} MB/s {:>8} MB peak".format(
+            name, result["seconds"], result["rows_per_second"], result["mb_per_second"],
+            "-" if result["peak_mb"] is None else "{:.1f}".format(result["peak_mb"])))
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "w") as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
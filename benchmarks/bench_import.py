@@ -0,0 +1,39 @@
+"""
+Measures how long importing a module takes in a fresh interpreter and which heavy dependencies it loads.
+Pure modules like report_definition must not import googleads or pandas.
+
+usage: python -m benchmarks.bench_import
+"""
+import sys
+import json
+import subprocess
+
+HEAVY_MODULES = ("googleads", "suds", "pandas", "numpy", "pyarrow")
+PURE_MODULES = ("adwords_reports.report_definition", "adwords_reports.micro_amounts",
+                "adwords_reports.account_label")
+
+_SCRIPT = """
+import sys, time, json
+start = time.time()
+import {module}
+seconds = time.time() - start
+print(json.dumps({{"seconds": seconds, "heavy_modules": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def bench_import(module="adwords_reports.report_definition", repeat=5):
+    """ the fastest of several imports, each in a new process, so caches of the OS are warm
+    :return: dict with seconds and the heavy modules that were loaded
+    """
+    results = list()
+    for _ in range(repeat):
+        script = _SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+        output = subprocess.check_output([sys.executable, "-c", script])
+        results.append(json.loads(output.decode("utf-8").strip().splitlines()[-1]))
+    return min(results, key=lambda result: result["seconds"])
+
+
+if __name__ == "__main__":
+    for name in PURE_MODULES + ("adwords_reports", "adwords_reports.client"):
+        result = bench_import(name)
+        print("{:<40} {:8.3f}s  {}".format(name, result["seconds"], ", ".join(result["heavy_modules"])))
@@ -0,0 +1,44 @@
+"""
+Measures how long it takes to get a SOAP service proxy and a report downloader:
+    - cold: empty WSDL cache, i.e. WSDLs and schemas are downloaded and parsed
+    - warm disk: new Client (as in a new process) with a filled WSDL cache
+    - warm process: proxy is reused by the same Client
+
+usage: python benchmarks/bench_service_init.py path/to/googleads.yaml
+"""
+import sys
+import time
+import shutil
+import tempfile
+
+from adwords_reports.client import Client
+
+
+def timed(func, *args, **kwargs):
+    start = time.time()
+    func(*args, **kwargs)
+    return time.time() - start
+
+
+def bench_service_init(credentials, service_name="ManagedCustomerService"):
+    cache_dir = tempfile.mkdtemp()
+    try:
+        timings = dict()
+        cold_client = Client(credentials, wsdl_cache_dir=cache_dir)
+        timings["cold service"] = timed(cold_client._get_service, service_name)
+        timings["warm process service"] = timed(cold_client._get_service, service_name)
+
+        warm_client = Client(credentials, wsdl_cache_dir=cache_dir)
+        timings["warm disk service"] = timed(warm_client._get_service, service_name)
+        timings["warm disk downloader"] = timed(warm_client._init_report_downloader)
+
+        no_cache_client = Client(credentials, wsdl_cache_dir=None)
+        timings["uncached downloader"] = timed(no_cache_client._init_report_downloader)
+        return timings
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    for name, seconds in sorted(bench_service_init(sys.argv[1]).items()):
+        print("{:<25} {:8.3f}s".format(name, seconds))
@@ -0,0 +1,408 @@
+"""
+Local stand-in for the parts of the AdWords API used by adwords_reports:
+    - FakeReportServer serves synthetic csv reports over HTTP, like the report download endpoint
+    - FakeManagedCustomerService lists an account hierarchy of configurable depth
+    - FakeReportDefinitionService describes the report fields known to adwords_reports
+    - FakeAdWordsClient offers the interface of googleads.adwords.AdWordsClient on top of them
+Latency and errors can be injected into both, so no credentials or network access are needed.
+FakeReportServer also speaks the form-encoded protocol of the real endpoint used by transport.PooledReportDownloader,
+and each new connection can be delayed to stand in for TCP and TLS handshakes.
+"""
+import gzip
+import json
+import time
+import random
+import datetime
+import threading
+import xml.etree.ElementTree as ElementTree
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.error import HTTPError
+from urllib.parse import parse_qs
+from urllib.request import Request, urlopen
+
+from adwords_reports.report_fields import FIELD_TYPES, SEGMENT_FIELDS
+
+ROOT_ID = 1000000000
+ENUM_VALUES = {
+    "AdNetworkType1": ["SEARCH", "CONTENT", "YOUTUBE_SEARCH"],
+    "AdNetworkType2": ["SEARCH", "SEARCH_PARTNERS", "CONTENT"],
+    "Device": ["DESKTOP", "HIGH_END_MOBILE", "TABLET", "OTHER"],
+    "KeywordMatchType": ["Exact", "Phrase", "Broad"],
+    "Status": ["enabled", "paused", "removed"],
+}
+
+
+class FakeSoapObject(dict):
+    """ suds objects can be accessed like dicts and like objects """
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class FakeReportError(Exception):
+    """ same attributes as googleads.errors.AdWordsReportError """
+    def __init__(self, code, content):
+        super(FakeReportError, self).__init__("FakeReportError(code={}, content={})".format(code, content))
+        self.code = code
+        self.content = content
+
+
+def synthetic_csv(fields, rows, seed=0, date_min="20180101", date_max="20180131"):
+    """ creates a headless csv report with plausible values for each field type
+    :param fields: list of str
+    :param rows: int
+    :return: bytes
+    """
+    rand = random.Random(seed)
+    first_day = datetime.datetime.strptime(date_min, "%Y%m%d").date()
+    days = (datetime.datetime.strptime(date_max, "%Y%m%d").date() - first_day).days + 1
+
+    def value(field, i):
+        field_type = FIELD_TYPES.get(field, "String")
+        if field == "Date":
+            return (first_day + datetime.timedelta(i % days)).isoformat()
+        if field_type == "Long" or field_type == "Integer":
+            return str(rand.randint(0, 10 ** 6) if field.endswith("Id") or field == "Id" else rand.randint(0, 1000))
+        if field_type == "Money":
+            return str(rand.randint(0, 10 ** 4) * 10 ** 4)
+        if field_type in ("Double", "Ratio"):
+            return "{:.2f}".format(rand.random() * 10)
+        if field_type == "Enum":
+            return rand.choice(ENUM_VALUES.get(field, ["A", "B", "C"]))
+        if field_type == "Label":
+            return "{} #{}".format(field, rand.randint(0, 50))
+        return "{} {}".format(field.lower(), i)
+
+    lines = [",".join(value(field, i) for field in fields) for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+
+class FakeReportServer:
+    """ HTTP server that answers report downloads with synthetic csv reports.
+    The number of rows may depend on the account, e.g. to simulate skewed MCCs.
+    """
+    def __init__(self, rows=1000, latency=0., error_rate=0., rate_exceeded_rate=0., seed=0, connect_latency=0.):
+        """
+        :param rows: int or callable taking the account id and returning an int
+        :param latency: float or callable taking the account id and returning a float, seconds before a response starts
+        :param error_rate: float, share of requests that fail with an internal error (HTTP 500)
+        :param rate_exceeded_rate: float, share of requests that fail with RateExceededError (HTTP 400)
+        :param seed: int, for reproducible errors and reports
+        :param connect_latency: float, seconds before the first request of a new connection is read
+        """
+        self.rows = rows
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_exceeded_rate = rate_exceeded_rate
+        self.connect_latency = connect_latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self.connections = 0
+        self.account_ids = list()  # of all requests in the order they arrived
+
+        self._random = random.Random(seed)
+        self._reports = dict()
+        self._lock = threading.Lock()
+        self._server = _ThreadingHTTPServer(("127.0.0.1", 0), _ReportHandler)
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        return "{}/api/adwords/reportdownload".format(self.server)
+
+    @property
+    def server(self):
+        host, port = self._server.server_address
+        return "http://{}:{}".format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, request):
+        """
+        :param request: dict with account_id and report_definition
+        :return: tuple of (HTTP status, bytes)
+        """
+        with self._lock:
+            self.requests += 1
+            self.account_ids.append(request["account_id"])
+            roll = self._random.random()
+        time.sleep(self.latency(request["account_id"]) if callable(self.latency) else self.latency)
+
+        if roll < self.error_rate:
+            return 500, b"ReportDownloadError.INTERNAL_API_ERROR"
+        if roll < self.error_rate + self.rate_exceeded_rate:
+            return 400, b"RateExceededError.RATE_EXCEEDED"
+
+        report = self._report(request["account_id"], request["report_definition"])
+        with self._lock:
+            self.bytes_sent += len(report)
+        return 200, report
+
+    def _report(self, account_id, report_definition):
+        rows = self.rows(account_id) if callable(self.rows) else self.rows
+        selector = report_definition["selector"]
+        date_range = selector["dateRange"]
+        compressed = report_definition["downloadFormat"] == "GZIPPED_CSV"
+        key = (tuple(selector["fields"]), rows, date_range["min"], date_range["max"], compressed)
+        with self._lock:
+            if key not in self._reports:
+                report = synthetic_csv(selector["fields"], rows, date_min=date_range["min"], date_max=date_range["max"])
+                self._reports[key] = gzip.compress(report) if compressed else report
+            return self._reports[key]
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _ReportHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        fake = self.server.fake
+        with fake._lock:
+            fake.connections += 1
+        time.sleep(fake.connect_latency)
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        body = self.rfile.read(length).decode("utf-8")
+        if self.headers["Content-Type"] == "application/x-www-form-urlencoded":
+            status, body = self._respond_form(body)
+        else:
+            status, body = self.server.fake.respond(json.loads(body))
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        view = memoryview(body)
+        for start in range(0, len(body), 64 * 1024):
+            self.wfile.write(view[start:start + 64 * 1024])
+
+    def _respond_form(self, body):
+        """ request of the real report download protocol: headers and the report definition as xml """
+        if not self.headers["Authorization"]:
+            return 401, b"AuthenticationError.OAUTH_TOKEN_INVALID"
+        request = {
+            "account_id": int(self.headers["clientCustomerId"]),
+            "report_definition": parse_report_definition_xml(parse_qs(body)["__rdxml"][0]),
+            "options": {key: self.headers[key] for key in ("skipReportHeader", "includeZeroImpressions")}
+        }
+        return self.server.fake.respond(request)
+
+    def log_message(self, *args):
+        pass
+
+
+def parse_report_definition_xml(xml):
+    """ the raw report definition dict of a serialized one, see transport.report_definition_xml """
+    root = ElementTree.fromstring(xml)
+    namespace = root.tag[:root.tag.index("}") + 1]
+
+    def text(element, name):
+        return element.find(namespace + name).text
+
+    selector = root.find(namespace + "selector")
+    date_range = selector.find(namespace + "dateRange")
+    predicates = [{
+        "field": text(predicate, "field"),
+        "operator": text(predicate, "operator"),
+        "values": [value.text for value in predicate.findall(namespace + "values")]
+    } for predicate in selector.findall(namespace + "predicates")]
+
+    report_definition = {
+        "reportName": text(root, "reportName"),
+        "reportType": text(root, "reportType"),
+        "dateRangeType": text(root, "dateRangeType"),
+        "downloadFormat": text(root, "downloadFormat"),
+        "selector": {
+            "fields": [field.text for field in selector.findall(namespace + "fields")],
+            "dateRange": {"min": text(date_range, "min"), "max": text(date_range, "max")}
+        }
+    }
+    if predicates:
+        report_definition["selector"]["predicates"] = predicates
+    return report_definition
+
+
+class FakeOAuth2Client:
+    """ same interface as googleads.oauth2.GoogleRefreshTokenClient, every refresh takes refresh_latency """
+    def __init__(self, refresh_latency=0.):
+        self.refresh_latency = refresh_latency
+        self.refreshes = 0
+        self._lock = threading.Lock()
+
+    def CreateHttpHeader(self):
+        with self._lock:
+            self.refreshes += 1
+        time.sleep(self.refresh_latency)
+        return {"Authorization": "Bearer fake-access-token"}
+
+
+class FakeReportDownloader:
+    """ same interface as googleads.adwords.ReportDownloader, but talks to a FakeReportServer """
+    def __init__(self, adwords_client, url):
+        self._adwords_client = adwords_client
+        self._url = url
+
+    def DownloadReportAsString(self, report_definition, **kwargs):
+        stream = self.DownloadReportAsStream(report_definition, **kwargs)
+        try:
+            return stream.read().decode("utf-8")
+        finally:
+            stream.close()
+
+    def DownloadReport(self, report_definition, output, **kwargs):
+        stream = self.DownloadReportAsStream(report_definition, **kwargs)
+        try:
+            for chunk in iter(lambda: stream.read(64 * 1024), b""):
+                output.write(chunk)
+        finally:
+            stream.close()
+
+    def DownloadReportAsStream(self, report_definition, **kwargs):
+        self._adwords_client.oauth2_client.CreateHttpHeader()
+        payload = {
+            "account_id": self._adwords_client.client_customer_id,
+            "report_definition": report_definition,
+            "options": kwargs
+        }
+        request = Request(self._url, data=json.dumps(payload).encode("utf-8"),
+                          headers={"Content-Type": "application/json"})
+        try:
+            return urlopen(request)
+        except HTTPError as error:
+            raise FakeReportError(error.code, error.read().decode("utf-8"))
+
+
+class FakeManagedCustomerService:
+    """ Lists a hierarchy of accounts. Each manager has `branching` children, the leaves are at `depth`. """
+    def __init__(self, depth=1, branching=10, latency=0., error_rate=0., seed=0):
+        """
+        :param depth: int, number of manager levels below the root MCC
+        :param branching: int, children per manager
+        :param latency: float, seconds per request
+        :param error_rate: float, share of requests that fail with an internal error
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.customers, self.links = self._build_hierarchy(depth, branching)
+
+    def get(self, selector):
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+        time.sleep(self.latency)
+        if roll < self.error_rate:
+            raise FakeReportError(500, "InternalApiError.UNEXPECTED_INTERNAL_API_ERROR")
+
+        customers = [c for c in self.customers if self._matches(c, selector.get("predicates", list()))]
+        for ordering in reversed(selector.get("ordering", list())):
+            field = ordering["field"][0].lower() + ordering["field"][1:]
+            customers.sort(key=lambda c: c[field], reverse=ordering["sortOrder"] == "DESCENDING")
+
+        paging = selector.get("paging", {"startIndex": 0, "numberResults": len(customers)})
+        start, end = paging["startIndex"], paging["startIndex"] + paging["numberResults"]
+        entries = customers[start:end]
+        ids = set(c["customerId"] for c in entries)
+        links = [link for link in self.links if link["clientCustomerId"] in ids]
+
+        page = FakeSoapObject(totalNumEntries=len(customers), links=links)
+        if entries:
+            page["entries"] = entries
+        return page
+
+    @staticmethod
+    def _matches(customer, predicates):
+        for predicate in predicates:
+            field = predicate["field"][0].lower() + predicate["field"][1:]
+            value = str(customer[field]).upper()
+            values = predicate["values"] if isinstance(predicate["values"], list) else [predicate["values"]]
+            if predicate["operator"] == "EQUALS" and value not in [str(v).upper() for v in values]:
+                return False
+        return True
+
+    @staticmethod
+    def _build_hierarchy(depth, branching):
+        customers, links = list(), list()
+        next_id = [ROOT_ID]
+
+        def add(name, is_manager, manager_id, level):
+            customer_id = next_id[0]
+            next_id[0] += 1
+            customers.append(FakeSoapObject(
+                name=name, customerId=customer_id, currencyCode="EUR", dateTimeZone="Europe/Berlin",
+                canManageClients=is_manager))
+            if manager_id is not None:
+                links.append(FakeSoapObject(managerCustomerId=manager_id, clientCustomerId=customer_id))
+            if is_manager:
+                for child in range(branching):
+                    add("{} - {}".format(name, child), level + 1 < depth, customer_id, level + 1)
+
+        add("Account", True, None, 0)
+        return customers, links
+
+
+class FakeReportDefinitionService:
+    """ All report types have the fields of FIELD_TYPES """
+    def __init__(self):
+        self.requests = 0
+
+    def getReportFields(self, report_type):
+        self.requests += 1
+        report_fields = list()
+        for field, field_type in sorted(FIELD_TYPES.items()):
+            report_fields.append(FakeSoapObject(
+                fieldName=field, fieldType="String" if field_type == "Label" else field_type,
+                fieldBehavior="SEGMENT" if field in SEGMENT_FIELDS else "ATTRIBUTE",
+                canSelect=True, canFilter=True, enumValues=ENUM_VALUES.get(field, list()), exclusiveFields=list()))
+        return report_fields
+
+
+class FakeAdWordsClient:
+    """ same interface as googleads.adwords.AdWordsClient as far as adwords_reports uses it """
+    def __init__(self, report_server, customer_service, client_customer_id=ROOT_ID):
+        self.report_server = report_server
+        self.customer_service = customer_service
+        self.client_customer_id = client_customer_id
+        self.developer_token = "fake-developer-token"
+        self.user_agent = "fake-user-agent"
+        self.oauth2_client = FakeOAuth2Client()
+        self.cache = None
+        self.report_definition_service = FakeReportDefinitionService()
+
+    def SetClientCustomerId(self, client_customer_id):
+        self.client_customer_id = client_customer_id
+
+    def GetService(self, service_name, version=None):
+        if service_name == "ManagedCustomerService":
+            return self.customer_service
+        if service_name == "ReportDefinitionService":
+            return self.report_definition_service
+        raise ValueError("{} isn't faked.".format(service_name))
+
+    def GetReportDownloader(self, version=None):
+        return FakeReportDownloader(self, self.report_server.url)
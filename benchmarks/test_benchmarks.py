@@ -0,0 +1,141 @@
+"""
+Runs the offline benchmarks in CI. Besides sanity checks, results are compared to a baseline if the
+environment variable BENCHMARK_BASELINE points to a results file of `python -m benchmarks.bench_download`.
+Throughput may drop by BENCHMARK_TOLERANCE (default 2, i.e. half as fast) before a benchmark fails.
+"""
+import os
+import sys
+import json
+import pytest
+
+from benchmarks import bench_download, bench_import
+
+ROWS = 100000
+
+
+def _check_baseline(name, result):
+    baseline_path = os.environ.get("BENCHMARK_BASELINE")
+    if not baseline_path:
+        return
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file).get(name)
+    if baseline is None:
+        return
+    tolerance = float(os.environ.get("BENCHMARK_TOLERANCE", 2))
+    assert result["seconds"] <= baseline["seconds"] * tolerance, "{} got slower".format(name)
+    if result["peak_mb"] is not None:
+        assert result["peak_mb"] <= baseline["peak_mb"] * tolerance, "{} needs more memory".format(name)
+
+
+@pytest.fixture(scope="module")
+def fix_download():
+    return bench_download.bench_download(rows=ROWS)
+
+
+def test_download(fix_download):
+    assert fix_download["rows"] == ROWS
+    _check_baseline("download", fix_download)
+
+
+def test_download_uncompressed(fix_download):
+    result = bench_download.bench_download(rows=ROWS, compress=False)
+    assert result["rows"] == ROWS
+    assert result["mb"] > 2 * fix_download["mb"]
+    _check_baseline("download_uncompressed", result)
+
+
+def test_download_pyarrow():
+    pytest.importorskip("pyarrow")
+    result = bench_download.bench_download(rows=ROWS, parser="pyarrow")
+    assert result["rows"] == ROWS
+    _check_baseline("download_pyarrow", result)
+
+
+def test_download_chunks(fix_download):
+    result = bench_download.bench_download_chunks(rows=ROWS, chunksize=ROWS // 10)
+    assert result["rows"] == ROWS
+    # memory is bounded by the chunk size, not by the report
+    assert result["peak_mb"] < fix_download["peak_mb"] / 2
+    _check_baseline("download_chunks", result)
+
+
+def test_download_aggregated(fix_download):
+    result = bench_download.bench_download_aggregated(rows=ROWS, chunksize=ROWS // 10)
+    # 31 days times 4 devices
+    assert result["groups"] == 31 * 4
+    assert result["peak_mb"] < fix_download["peak_mb"] / 2
+    _check_baseline("download_aggregated", result)
+
+
+def test_download_all():
+    result = bench_download.bench_download_all(accounts=50, rows=500, latency=0.2, max_workers=8)
+    assert result["rows"] == 50 * 500
+    # sequential downloads would take at least accounts * latency
+    assert result["seconds"] < 50 * 0.2 / 2
+    _check_baseline("download_all", result)
+
+
+def test_async_download_all():
+    result = bench_download.bench_async_download_all(accounts=200, rows=100, latency=0.2, max_concurrency=50)
+    assert result["rows"] == 200 * 100
+    # sequential downloads would take at least accounts * latency
+    assert result["seconds"] < 200 * 0.2 / 4
+    _check_baseline("async_download_all", result)
+
+
+def test_download_all_pooled():
+    unpooled = bench_download.bench_download_all_pooled(pooled=False)
+    result = bench_download.bench_download_all_pooled(pooled=True)
+    assert result["rows"] == unpooled["rows"] == 100 * 100
+    # a connection per report vs. at most one per worker
+    assert unpooled["connections"] == 100
+    assert result["connections"] <= 8
+    assert result["requests"] == unpooled["requests"] == 100
+    _check_baseline("download_all_pooled", result)
+
+
+def test_download_all_skewed():
+    unscheduled = bench_download.bench_download_all_skewed(scheduled=False)
+    result = bench_download.bench_download_all_skewed(scheduled=True)
+    assert result["rows"] == unscheduled["rows"] == 24 * 100
+    # the giant account starts with the first batch of the 4 workers instead of last,
+    # how much faster that is is up to the baseline comparison
+    assert result["giant_position"] < 4
+    assert unscheduled["giant_position"] >= 24 - 4
+    _check_baseline("download_all_skewed", result)
+
+
+def test_download_with_errors():
+    result = bench_download.bench_download_with_errors(accounts=20, error_rate=0.3)
+    assert result["rows"] == 20 * 2000
+    assert result["requests"] > 20
+    _check_baseline("download_with_errors", result)
+
+
+def test_accounts():
+    result = bench_download.bench_accounts(depth=2, branching=40)
+    assert result["rows"] == 40 * 40
+    _check_baseline("accounts", result)
+
+
+def test_sharded():
+    single = bench_download.bench_sharded(workers=1)
+    result = bench_download.bench_sharded(workers=4)
+    assert result["rows"] == single["rows"] == 16 * 2000
+    # every account is downloaded once, and the workers share them
+    assert result["requests"] == single["requests"] == 16
+    assert sum(result["accounts_per_worker"]) == 16
+    assert len(result["accounts_per_worker"]) == 4
+    assert result["accounts_per_worker"][-1] < 16
+    _check_baseline("sharded", result)
+
+
+# the package itself can only defer imports since python 3.7, see adwords_reports.__getattr__
+LAZY_MODULES = bench_import.PURE_MODULES + (("adwords_reports",) if sys.version_info >= (3, 7) else ())
+
+
+@pytest.mark.parametrize("module", LAZY_MODULES)
+def test_import(module):
+    result = bench_import.bench_import(module)
+    assert result["heavy_modules"] == list()
+    assert result["seconds"] < 0.1
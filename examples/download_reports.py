@@ -1,4 +1,5 @@
-from adwords_reports import Client, ReportDefinition
+from adwords_reports import Agg, Client, ReportDefinition
+from adwords_reports.sinks import CsvSink
 
 
 def download_reports(credentials, report_definition):
@@ -20,12 +21,38 @@ def download_reports(credentials, report_definition):
         print(report)  # pandas DataFrame
 
         # you may now
-        #   - stack reports of all your accounts
-        #   - or save them to a csv
+        #   - save them to a csv
         #   - or push them to a database
         #   - ...
 
 
+def download_reports_to_file(credentials, report_definition, path):
+    """
+    Stacking the reports of all accounts in memory doesn't scale to big MCCs.
+    Sinks write each account's report as soon as it's downloaded instead.
+    See adwords_reports.sinks for partitioned parquet files and for pushing batches of rows to a database.
+    :param credentials: str, path to your adwords credentials file
+    :param report_definition: ReportDefinition
+    :param path: str, csv file that the reports of all accounts are appended to
+    """
+    adwords_service = Client(credentials)
+    n_rows = adwords_service.download_to(report_definition, CsvSink(path), zero_impressions=True)
+    print("Wrote {} rows to {}".format(n_rows, path))
+
+
+def download_rollup(credentials, report_definition):
+    """
+    Sums of metrics over all accounts, e.g. clicks and cost per match type of the whole MCC.
+    Reports are aggregated while they're streamed, so rows are never kept in memory.
+    :param credentials: str, path to your adwords credentials file
+    :param report_definition: ReportDefinition, has to contain the fields of the aggregation
+    """
+    adwords_service = Client(credentials)
+    aggregate = Agg(by=["KeywordMatchType"], sums=["Impressions", "Clicks", "Cost"])
+    print(adwords_service.download_aggregated(report_definition, aggregate, zero_impressions=True,
+                                              convert_money=True))
+
+
 if __name__ == "__main__":
     credentials_path = "googleads.yaml"
 
@@ -43,3 +70,5 @@ if __name__ == "__main__":
         last_days=7
     )
     download_reports(credentials_path, report_def)
+    download_reports_to_file(credentials_path, report_def, "keywords.csv.gz")
+    download_rollup(credentials_path, report_def)
@@ -27,11 +27,19 @@ PACKAGES = [
 ]
 
 DEPENDENCIES = [
+    "futures; python_version < '3'",
     "googleads",
-    "pandas",
-    "retrying"
+    "numpy",
+    "pandas>=0.24"
 ]
 
+EXTRAS = {
+    # columnar storage of reports and the pyarrow parsers, which need pyarrow.compute.round
+    "parquet": ["pyarrow>=6.0"],
+    # keep-alive connections, see transport.PooledTransport
+    "pooled": ["urllib3"]
+}
+
 CLASSIFIERS = [
     "Intended Audience :: Developers",
     "Programming Language :: Python :: 2.7",
@@ -59,6 +67,7 @@ setuptools.setup(
     version=find_version("adwords_reports", "__init__.py"),
     packages=PACKAGES,
     install_requires=DEPENDENCIES,
+    extras_require=EXTRAS,
     classifiers=CLASSIFIERS,
     license="Apache License 2.0"
 )
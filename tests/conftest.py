@@ -0,0 +1,53 @@
+import sys
+import pandas as pd
+
+# the async client needs async generators
+collect_ignore = ["test_async_client.py"] if sys.version_info < (3, 6) else list()
+
+ACCOUNT_IDS = ["{0}{0}{0}-{0}{0}{0}-{0}{0}{0}{0}".format(i) for i in range(1, 10)]
+
+
+class FakeAccount:
+    """ Account that downloads a tiny report without API, see test_job_runner and test_sharding """
+    def __init__(self, account_id, fail=False):
+        self.id = account_id
+        self.fail = fail
+        self.downloaded = list()
+
+    def isolate_session(self):
+        pass
+
+    def download(self, report_definition, zero_impressions, convert_money=False):
+        if self.fail:
+            raise IOError("connection reset")
+        self.downloaded.append(report_definition.report_type)
+        return pd.DataFrame({"Clicks": [1, 2]})
+
+
+class FakeClient:
+    account_stats = None
+
+    def __init__(self, accounts):
+        self._accounts = accounts
+
+    def validate(self, report_definition):
+        pass
+
+    def accounts(self):
+        return iter(self._accounts)
+
+    def scheduled_accounts(self, report_type=None):
+        return iter(self._accounts)
+
+
+def fake_client_factory(credentials_path, failing=()):
+    """ client_factory of ShardedRunner, every worker sees the accounts of ACCOUNT_IDS """
+    return FakeClient([FakeAccount(account_id, fail=account_id in failing) for account_id in ACCOUNT_IDS])
+
+
+def report_definitions():
+    from adwords_reports.report_definition import ReportDefinition
+    return [
+        ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Clicks"], date_from="2018-01-01", date_to="2018-01-31"),
+        ReportDefinition("AD_PERFORMANCE_REPORT", ["Clicks"], date_from="2018-01-01", date_to="2018-01-31"),
+    ]
@@ -64,3 +64,53 @@ def test_download_report_zero_impressions(fix_account, fix_report_definition):
 
 def test_repr(fix_account):
     assert str(fix_account) == "\nAccountName: Dont touch - !ImportantForTests! (ID: 5190855164)"
+
+
+def test_download_chunks(fix_account, fix_report_definition):
+    chunks = list(fix_account.download_chunks(fix_report_definition, zero_impressions=True, chunksize=1))
+    report = pd.concat(chunks)
+    expected_result = pd.DataFrame([["test_kw_1"]], columns=["Criteria"])
+    assert report.equals(expected_result)
+
+
+def test_download_to_file(fix_account, fix_report_definition):
+    import io
+
+    output = io.BytesIO()
+    fix_account.download_to_file(fix_report_definition, zero_impressions=True, output=output)
+    assert output.getvalue().decode("utf-8").strip() == "test_kw_1"
+
+
+def test_download_convert_money(fix_account):
+    from adwords_reports.report_definition import ReportDefinition
+
+    report_definition = ReportDefinition(
+        report_type="KEYWORDS_PERFORMANCE_REPORT", fields=["Criteria", "Cost"], last_days=7)
+    report = fix_account.download(report_definition, zero_impressions=True, convert_money=True)
+    assert report["Cost"].dtype == "float64"
+    assert report["Cost"].tolist() == [0.0]
+
+
+def test_download_split_by(fix_account, fix_report_definition):
+    report = fix_account.download(fix_report_definition, zero_impressions=True, split_by="week", max_workers=2)
+    # the test keyword has zero impressions, so it's part of each sub-range
+    assert set(report["Criteria"]) == {"test_kw_1"}
+    assert report.index.tolist() == list(range(len(report)))
+
+
+def test_download_uncompressed(fix_client, fix_account, fix_report_definition):
+    fix_client.compress = False
+    report = fix_account.download(fix_report_definition, zero_impressions=True)
+    expected_result = pd.DataFrame([["test_kw_1"]], columns=["Criteria"])
+    assert report.equals(expected_result)
+
+
+def test_download_many(fix_account):
+    from adwords_reports.report_definition import ReportDefinition
+
+    keywords = ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Criteria", "Clicks"], last_days=7)
+    costs = ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Criteria", "Cost"], last_days=7)
+    reports = fix_account.download_many([keywords, costs], zero_impressions=True)
+    assert reports[0].columns.tolist() == ["Criteria", "Clicks"]
+    assert reports[1].columns.tolist() == ["Criteria", "Cost"]
+    assert reports[0]["Criteria"].tolist() == reports[1]["Criteria"].tolist()
@@ -0,0 +1,53 @@
+from tests import fix_client  # is used
+
+
+def _account(account_id, name):
+    from adwords_reports.account import Account
+    return Account(client=None, account_id=account_id, name=name, currency="EUR",
+                   time_zone="Europe/Berlin", labels=list())
+
+
+def test_hierarchy():
+    from adwords_reports.account_hierarchy import AccountHierarchy
+
+    hierarchy = AccountHierarchy(root_id="100-000-0000")
+    # links may arrive before the accounts they refer to
+    hierarchy.add_link(manager_id=1000000000, client_id=2000000000)
+    hierarchy.add_link(manager_id=2000000000, client_id=3000000000)
+    hierarchy.add_account(_account("100-000-0000", "mcc"), is_manager=True)
+    hierarchy.add_account(_account("200-000-0000", "nested mcc"), is_manager=True)
+    hierarchy.add_account(_account("300-000-0000", "leaf"), is_manager=False)
+
+    assert len(hierarchy) == 3
+    assert hierarchy.root.account.name == "mcc"
+    assert [node.account.name for node in hierarchy.root.walk()] == ["mcc", "nested mcc", "leaf"]
+    assert [account.name for account in hierarchy.accounts()] == ["leaf"]
+    assert sorted(account.name for account in hierarchy.managers()) == ["mcc", "nested mcc"]
+
+
+def test_resolve():
+    from adwords_reports.account_hierarchy import AccountHierarchy
+
+    hierarchy = AccountHierarchy(root_id="100-000-0000")
+    hierarchy.add_account(_account("300-000-0000", "leaf"), is_manager=False)
+    hierarchy.add_link(manager_id=2000000000, client_id=3000000000)
+    assert hierarchy.resolve() == list()  # its manager is missing
+
+    hierarchy.add_account(_account("100-000-0000", "mcc"), is_manager=True)
+    hierarchy.add_account(_account("200-000-0000", "nested mcc"), is_manager=True)
+    hierarchy.add_account(_account("400-000-0000", "orphan"), is_manager=False)
+    assert [node.account.name for node in hierarchy.resolve()] == ["mcc"]
+
+    hierarchy.add_link(manager_id=1000000000, client_id=2000000000)
+    assert [node.account.name for node in hierarchy.resolve()] == ["nested mcc", "leaf"]
+    # accounts without manager are only resolved once everything arrived
+    assert hierarchy.resolve() == list()
+    assert [node.account.name for node in hierarchy.resolve(complete=True)] == ["orphan"]
+
+
+def test_client_hierarchy(fix_client):
+    from adwords_reports.account_hierarchy import AccountHierarchy
+
+    hierarchy = fix_client.hierarchy()
+    assert isinstance(hierarchy, AccountHierarchy)
+    assert [account.name for account in hierarchy.accounts()] == ["Dont touch - !ImportantForTests!"]
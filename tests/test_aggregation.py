@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+
+def _report():
+    return pd.DataFrame({
+        "CampaignId": [1, 2, 1, 2, 1],
+        "Date": ["2018-01-01", "2018-01-01", "2018-01-01", "2018-01-02", "2018-01-02"],
+        "Clicks": pd.Series([1, 2, 3, 4, 5], dtype="Int64"),
+        "Cost": pd.Series([10000, 20000, 30000, 40000, 50000], dtype="Int64"),
+        "CampaignName": ["a", "b", "a", "b", "a"]
+    })
+
+
+def test_fold():
+    from adwords_reports.aggregation import Agg
+
+    agg = Agg(by=["CampaignId", "Date"], sums=["Clicks", "Cost"])
+    report = _report()
+    result = None
+    for start in range(0, len(report), 2):
+        result = agg.fold(result, report.iloc[start:start + 2])
+
+    expected = report.groupby(["CampaignId", "Date"])[["Clicks", "Cost"]].sum().reset_index()
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_merge():
+    from adwords_reports.aggregation import Agg
+
+    agg = Agg(by=["CampaignId"], sums=["Clicks"])
+    report = _report()
+    # e.g. two accounts or two date ranges
+    parts = [agg.fold(None, report.iloc[:3]), agg.fold(None, report.iloc[3:]), None]
+    result = agg.merge(parts)
+    assert result["CampaignId"].tolist() == [1, 2]
+    assert result["Clicks"].tolist() == [9, 6]
+
+    empty = agg.merge([None])
+    assert empty.empty and empty.columns.tolist() == ["CampaignId", "Clicks"]
+
+
+def test_check():
+    from adwords_reports.aggregation import Agg
+    from adwords_reports.report_definition import ReportDefinition
+
+    report_definition = ReportDefinition("CAMPAIGN_PERFORMANCE_REPORT", ["CampaignId", "Clicks"],
+                                         date_from="2018-01-01", date_to="2018-01-31")
+    Agg(by=["CampaignId"], sums=["Clicks"]).check(report_definition)
+    with pytest.raises(AssertionError):
+        Agg(by=["CampaignId", "Date"], sums=["Clicks"]).check(report_definition)
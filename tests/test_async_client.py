@@ -0,0 +1,191 @@
+import time
+import asyncio
+import threading
+import pytest
+
+
+class FakeClient:
+    developer_token = "fake-developer-token"
+
+    def __init__(self, retry_policy=None, rate_limiter=None):
+        from adwords_reports.instrumentation import Instrumentation, CallbackExporter
+        from adwords_reports.rate_limit import RateLimiter, RetryPolicy
+
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=3, base_delay=0.01)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.events = list()
+        self.instrumentation = Instrumentation([CallbackExporter(self.events.append)])
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_call_retries():
+    from adwords_reports.async_client import AsyncClient
+
+    fake = FakeClient()
+    retry_policy = fake.retry_policy
+    client = AsyncClient(fake)
+    # its copy makes single attempts, the client itself can still be used synchronously
+    assert client.client.retry_policy.max_attempts == 1
+    assert fake.retry_policy is retry_policy and client.retry_policy is retry_policy
+    attempts = list()
+
+    def flaky(value):
+        attempts.append(value)
+        if len(attempts) < 3:
+            raise ConnectionResetError("connection reset")
+        return value
+
+    assert _run(client.call(flaky, "report", customer_id="123")) == "report"
+    assert len(attempts) == 3
+    assert [event["name"] for event in fake.events] == ["retries", "retries"]
+
+    def bad_request():
+        raise ValueError("not retryable")
+
+    with pytest.raises(ValueError):
+        _run(client.call(bad_request))
+    client.close()
+
+
+def test_call_concurrency():
+    from adwords_reports.async_client import AsyncClient
+
+    client = AsyncClient(FakeClient(), max_concurrency=2)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def download():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    async def download_all():
+        await asyncio.gather(*[client.call(download) for _ in range(6)])
+
+    _run(download_all())
+    assert peak[0] == 2
+    client.close()
+
+
+def test_download_rate_limited():
+    from adwords_reports.account import Account
+    from adwords_reports.async_client import AsyncClient, AsyncAccount
+    from adwords_reports.rate_limit import RateLimiter
+    from adwords_reports.report_definition import ReportDefinition
+    from adwords_reports.report_fields import FieldRegistry
+
+    requests = list()
+
+    class Downloader:
+        def DownloadReportAsString(self, report_definition, **kwargs):
+            requests.append(report_definition["selector"]["dateRange"])
+            return "kw,1\n"
+
+    fake = FakeClient(rate_limiter=RateLimiter(requests_per_second=1000.))
+    fake.parser, fake.cache, fake.account_stats, fake.compress = "pandas", None, None, False
+    fake.downloader = Downloader()
+    fake.field_registry = FieldRegistry()
+    fake.validate = lambda report_definition: None
+    fake.isolated_downloader = lambda account_id: fake.downloader
+
+    # counts the tokens handed out for the developer token
+    taken = list()
+    bucket = fake.rate_limiter.buckets(fake.developer_token)[0]
+    take = bucket.take
+
+    def counting_take():
+        wait = take()
+        if wait <= 0:
+            taken.append(wait)
+        return wait
+
+    bucket.take = counting_take
+
+    client = AsyncClient(fake)
+    account = AsyncAccount(client, Account(client.client, "519-085-5164", "name", "EUR", "Europe/Berlin", list()))
+    report_definition = ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Criteria", "Clicks"],
+                                         date_from="2018-01-01", date_to="2018-01-03")
+    report = _run(account.download(report_definition, zero_impressions=True, split_by="day"))
+    assert len(report) == len(requests) == 3
+    # each sub-report is a request of its own and has to take a token, not just the call of the download
+    assert len(taken) >= len(requests)
+    client.close()
+
+
+def test_backoff_doesnt_block():
+    from adwords_reports.async_client import AsyncClient
+    from adwords_reports.rate_limit import RateLimiter
+
+    fake = FakeClient(_fixed_backoff(0.5, max_attempts=2), RateLimiter(requests_per_second=10))
+    client = AsyncClient(fake)
+    order = list()
+
+    def failing():
+        order.append("attempt")
+        raise ConnectionResetError("connection reset")
+
+    async def run():
+        async def tick():
+            await _waits_for_retry(fake)
+            for _ in range(5):
+                order.append("tick")
+                await asyncio.sleep(0)
+
+        return await asyncio.gather(client.call(failing), client.call(lambda: "ok"), tick(), return_exceptions=True)
+
+    results = _run(run())
+    assert isinstance(results[0], ConnectionResetError) and results[1] == "ok"
+    # the event loop kept running while the call waited for its backoff
+    assert order == ["attempt"] + ["tick"] * 5 + ["attempt"]
+    client.close()
+
+
+def test_cancel():
+    from adwords_reports.async_client import AsyncClient
+
+    fake = FakeClient(_fixed_backoff(60., max_attempts=5))
+    client = AsyncClient(fake)
+    attempts = list()
+
+    def failing():
+        attempts.append(1)
+        raise ConnectionResetError("connection reset")
+
+    async def run():
+        task = asyncio.ensure_future(client.call(failing))
+        await _waits_for_retry(fake)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return task
+
+    # cancelled while it waited for its retry, which isn't attempted anymore
+    assert _run(run()).cancelled()
+    assert len(attempts) == 1
+    client.close()
+
+
+def _fixed_backoff(seconds, max_attempts):
+    from adwords_reports.rate_limit import RetryPolicy
+
+    class FixedBackoff(RetryPolicy):
+        def backoff(self, attempt):
+            return seconds
+
+    return FixedBackoff(max_attempts=max_attempts)
+
+
+async def _waits_for_retry(fake):
+    """ returns once a call of the client failed and waits for its retry """
+    while not any(event["name"] == "retries" for event in fake.events):
+        await asyncio.sleep(0)
@@ -4,7 +4,7 @@ import pytest
 from adwords_reports.client import Client
 
 from tests import test_dir
-from tests import fix_client  # is used
+from tests import fix_client, fix_report_definition  # is used
 
 
 def test_default_api_version():
@@ -73,3 +73,75 @@ def test_account_iterator(fix_client):
     for account in fix_client.accounts():
         assert isinstance(account, Account)
         assert account.name == "Dont touch - !ImportantForTests!"
+
+
+def test_isolated_downloader(fix_client):
+    import googleads
+
+    report_downloader = fix_client.isolated_downloader("873-154-8394")
+    assert isinstance(report_downloader, googleads.adwords.ReportDownloader)
+    assert fix_client._client.client_customer_id == "519-085-5164"
+
+
+def test_download_all(fix_client, fix_report_definition):
+    import pandas as pd
+    from adwords_reports.account import Account
+
+    results = list(fix_client.download_all(fix_report_definition, zero_impressions=True, max_workers=2))
+    assert results
+    for account, report in results:
+        assert isinstance(account, Account)
+        assert isinstance(report, pd.DataFrame)
+    assert fix_client._client.client_customer_id == "519-085-5164"
+
+
+def test_load_report_fields(fix_client):
+    fix_client.load_report_fields("KEYWORDS_PERFORMANCE_REPORT")
+    assert fix_client.field_registry.field_type("KEYWORDS_PERFORMANCE_REPORT", "Labels") == "String"
+
+
+def test_get_pages(fix_client):
+    selector = {
+        "fields": ["Name", "CustomerId"]
+    }
+    pages = list(fix_client._get_pages(selector, "ManagedCustomerService", page_size=1))
+    assert len(pages) == pages[0]["totalNumEntries"]
+
+
+def test_get_service_is_reused(fix_client):
+    service = fix_client._get_service("ManagedCustomerService")
+    assert fix_client._get_service("ManagedCustomerService") is service
+    assert fix_client._get_service("ReportDefinitionService") is not service
+
+
+def test_wsdl_cache(tmpdir):
+    import suds.cache
+
+    test_credentials = os.path.join(test_dir, "test_googleads.yaml")
+    client = Client(test_credentials, wsdl_cache_dir=str(tmpdir))
+    assert isinstance(client._client.cache, suds.cache.ObjectCache)
+
+
+def test_download_to(fix_client, fix_report_definition):
+    from adwords_reports.sinks import CallbackSink
+
+    written = list()
+    sink = CallbackSink(lambda account, report: written.append(len(report)))
+    n_rows = fix_client.download_to(fix_report_definition, sink, zero_impressions=True)
+    assert written
+    assert n_rows == sum(written)
+
+
+def test_report_fields_are_cached(tmpdir):
+    client = Client(os.path.join(test_dir, "test_googleads.yaml"), field_cache_dir=str(tmpdir))
+    report_fields = client.report_fields("KEYWORDS_PERFORMANCE_REPORT")
+    assert "Criteria" in [report_field["fieldName"] for report_field in report_fields]
+    assert client.field_cache.get("KEYWORDS_PERFORMANCE_REPORT") == report_fields
+
+
+def test_validate(fix_client):
+    from adwords_reports.report_definition import ReportDefinition, InvalidReportDefinition
+
+    report_definition = ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Criteria", "Clciks"], last_days=7)
+    with pytest.raises(InvalidReportDefinition):
+        fix_client.validate(report_definition)
@@ -0,0 +1,95 @@
+import pandas as pd
+
+
+def _report_definition(fields, predicates=None, date_to="2018-01-31", report_type="KEYWORDS_PERFORMANCE_REPORT"):
+    from adwords_reports.report_definition import ReportDefinition
+    return ReportDefinition(report_type, fields, predicates=predicates, date_from="2018-01-01", date_to=date_to)
+
+
+def _predicate(field, operator, values):
+    return {"field": field, "operator": operator, "values": values}
+
+
+def _coalesce(report_definitions):
+    from adwords_reports.coalesce import coalesce
+    from adwords_reports.report_fields import FieldRegistry
+    return coalesce(report_definitions, FieldRegistry())
+
+
+def test_coalesce_merges_fields():
+    requests = _coalesce([
+        _report_definition(["CampaignName", "Criteria", "Clicks"]),
+        _report_definition(["Criteria", "Cost"]),
+    ])
+    assert len(requests) == 1
+    assert requests[0].report_definition.fields == ["CampaignName", "Criteria", "Clicks", "Cost"]
+    assert [index for index, _, _ in requests[0].members] == [0, 1]
+
+
+def test_coalesce_keeps_incompatible_apart():
+    requests = _coalesce([
+        _report_definition(["Criteria", "Clicks"]),
+        _report_definition(["Criteria", "Device", "Clicks"]),  # segments split rows
+        _report_definition(["Criteria", "Clicks"], date_to="2018-01-15"),
+        _report_definition(["Criteria", "Clicks"], report_type="AD_PERFORMANCE_REPORT"),
+    ])
+    assert len(requests) == 4
+    assert [request.members[0][0] for request in requests] == [0, 1, 2, 3]
+
+
+def test_coalesce_pushes_down_common_predicates():
+    common = _predicate("CampaignStatus", "EQUALS", "ENABLED")
+    local = _predicate("CampaignName", "CONTAINS", "Brand")
+    requests = _coalesce([
+        _report_definition(["Criteria", "Clicks"], predicates=[common, local]),
+        _report_definition(["Criteria", "Cost"], predicates=[common]),
+    ])
+    assert len(requests) == 1
+    merged = requests[0].report_definition
+    assert merged.predicates == [common]
+    assert merged.fields == ["Criteria", "Clicks", "CampaignName", "Cost"]
+    assert [predicates for _, _, predicates in requests[0].members] == [[local], []]
+
+
+def test_coalesce_predicates_that_cant_be_evaluated_locally():
+    requests = _coalesce([
+        _report_definition(["Criteria", "Clicks"], predicates=[_predicate("CampaignStatus", "EQUALS", "ENABLED")]),
+        _report_definition(["Criteria", "Clicks"], predicates=[_predicate("Device", "EQUALS", "DESKTOP")]),
+        _report_definition(["Criteria", "Cost"]),
+        _report_definition(["Criteria", "Impressions"]),
+    ])
+    assert [[index for index, _, _ in request.members] for request in requests] == [[0], [1], [2, 3]]
+
+
+def test_split():
+    from adwords_reports.coalesce import CoalescedRequest
+
+    first = _report_definition(["Criteria", "Clicks"], predicates=[_predicate("Cost", "GREATER_THAN", "1000000")])
+    second = _report_definition(["Criteria", "Cost"])
+    request = CoalescedRequest(_report_definition(["Criteria", "Clicks", "Cost"]),
+                               [(0, first, first.predicates), (1, second, list())])
+    report = pd.DataFrame({"Criteria": ["a", "b"], "Clicks": [1, 2], "Cost": [500000, 2000000]})
+    reports = dict(request.split(report))
+    assert reports[0].to_dict("list") == {"Criteria": ["b"], "Clicks": [2]}
+    assert reports[1].to_dict("list") == {"Criteria": ["a", "b"], "Cost": [500000, 2000000]}
+
+
+def test_evaluate():
+    from adwords_reports.coalesce import evaluate
+
+    report = pd.DataFrame({
+        "CampaignName": pd.Categorical(["Brand DE", "brand AT", "Generic", None]),
+        "Clicks": pd.array([1, 5, None, 10], dtype="Int64")
+    })
+
+    def matches(*predicates):
+        return evaluate(report, list(predicates)).tolist()
+
+    assert matches() == [True, True, True, True]
+    assert matches(_predicate("Clicks", "GREATER_THAN_EQUALS", "5")) == [False, True, False, True]
+    assert matches(_predicate("Clicks", "IN", ["1", "10"])) == [True, False, False, True]
+    assert matches(_predicate("CampaignName", "STARTS_WITH", "Brand")) == [True, False, False, False]
+    assert matches(_predicate("CampaignName", "CONTAINS_IGNORE_CASE", "BRAND")) == [True, True, False, False]
+    assert matches(_predicate("CampaignName", "DOES_NOT_CONTAIN", "Brand")) == [False, True, True, True]
+    assert matches(_predicate("CampaignName", "NOT_EQUALS", "Generic"),
+                   _predicate("Clicks", "LESS_THAN", "10")) == [True, True, False, False]
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+
+def _report():
+    return pd.DataFrame({
+        "AccountCurrencyCode": pd.Categorical(["EUR", "USD", "USD", "GBP", "USD"]),
+        "Date": ["2018-01-01", "2018-01-01", "2018-01-02", "2018-01-02", "2018-01-05"],
+        "Cost": pd.Series([1000000, 2000000, None, 5000000, 10000000], dtype="Int64"),  # micro amounts
+        "CpcBid": [1., 2., 3., 4., 5.]
+    })
+
+
+def test_convert_fixed():
+    from adwords_reports.currency import FxRates, convert
+
+    report = convert(_report(), FxRates({"USD": 0.8, "GBP": 1.25}, target="EUR"), fields=["Cost", "CpcBid"])
+    assert report["Cost"].tolist()[:2] == [1., 1.6]
+    assert pd.isna(report["Cost"][2])
+    assert report["Cost"].tolist()[3:] == [6.25, 8.]
+    assert report["CpcBid"].tolist() == [1., 1.6, 2.4, 5., 4.]
+    assert report["AccountCurrencyCode"].tolist() == ["EUR"] * 5
+
+
+def test_convert_daily():
+    from adwords_reports.currency import FxRates, convert
+
+    rates = pd.DataFrame({
+        "Currency": ["USD", "GBP", "USD", "GBP"],
+        "Date": ["2018-01-01", "2018-01-01", "2018-01-02", "2018-01-02"],
+        "Rate": [0.8, 1.2, 0.9, 1.1]
+    })
+    # Cost is a default money field, CpcBid isn't
+    report = convert(_report(), FxRates(rates, target="EUR"))
+    # there's no rate for the 5th, so the one of the 2nd is used
+    assert report["Cost"].fillna(-1).tolist() == [1., 1.6, -1, 5.5, 9.]
+    assert report["CpcBid"].tolist() == [1., 2., 3., 4., 5.]
+
+
+def test_convert_missing_rates():
+    from adwords_reports.currency import FxRates, convert
+
+    with pytest.raises(ValueError, match="GBP"):
+        convert(_report(), FxRates({"USD": 0.8}, target="EUR"))
+
+    rates = pd.DataFrame({"Currency": ["USD", "GBP"], "Date": ["2018-01-02", "2018-01-02"], "Rate": [0.9, 1.1]})
+    with pytest.raises(ValueError, match="2018-01-01"):
+        convert(_report(), FxRates(rates, target="EUR"))
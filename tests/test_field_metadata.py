@@ -0,0 +1,46 @@
+import os
+
+
+class SoapField:
+    """ suds objects have attributes, missing ones raise AttributeError """
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+    def __getitem__(self, attribute):
+        return getattr(self, attribute)
+
+
+def test_serialize():
+    from adwords_reports.field_metadata import serialize
+
+    report_fields = serialize([
+        SoapField(fieldName="Device", fieldType="Device", fieldBehavior="SEGMENT", canSelect=True, canFilter=True,
+                  enumValues=("DESKTOP", "TABLET")),
+    ])
+    assert report_fields == [{
+        "fieldName": "Device", "fieldType": "Device", "fieldBehavior": "SEGMENT", "canSelect": True,
+        "canFilter": True, "enumValues": ["DESKTOP", "TABLET"], "exclusiveFields": None
+    }]
+
+
+def test_cache(tmpdir):
+    from adwords_reports.field_metadata import FieldMetadataCache
+
+    cache = FieldMetadataCache(str(tmpdir), "v201802")
+    assert cache.get("KEYWORDS_PERFORMANCE_REPORT") is None
+
+    report_fields = [{"fieldName": "Clicks", "fieldType": "Long"}]
+    cache.put("KEYWORDS_PERFORMANCE_REPORT", report_fields)
+    assert os.path.exists(os.path.join(str(tmpdir), "v201802", "KEYWORDS_PERFORMANCE_REPORT.json"))
+    assert cache.get("KEYWORDS_PERFORMANCE_REPORT") == report_fields
+    assert FieldMetadataCache(str(tmpdir), "v201809").get("KEYWORDS_PERFORMANCE_REPORT") is None
+
+
+def test_cache_expires(tmpdir):
+    from adwords_reports.field_metadata import FieldMetadataCache
+
+    cache = FieldMetadataCache(str(tmpdir), "v201802", max_age_days=0)
+    cache.put("KEYWORDS_PERFORMANCE_REPORT", [{"fieldName": "Clicks"}])
+    path = os.path.join(str(tmpdir), "v201802", "KEYWORDS_PERFORMANCE_REPORT.json")
+    os.utime(path, (0, 0))
+    assert cache.get("KEYWORDS_PERFORMANCE_REPORT") is None
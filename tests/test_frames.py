@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+
+def test_concat():
+    from adwords_reports.frames import concat
+
+    report1 = pd.DataFrame({"Device": pd.Categorical(["DESKTOP"]), "Clicks": [1]}, index=[5])
+    report2 = pd.DataFrame({"Device": pd.Categorical(["TABLET"]), "Clicks": [2]})
+    report = concat([report1, report2])
+    assert report.index.tolist() == [0, 1]
+    assert str(report["Device"].dtype) == "category"
+    assert report["Device"].tolist() == ["DESKTOP", "TABLET"]
+
+
+def test_concat_arrow():
+    pa = pytest.importorskip("pyarrow")
+    from adwords_reports.frames import concat
+
+    device = pa.dictionary(pa.int32(), pa.string())
+    table1 = pa.table({"Device": pa.array(["DESKTOP"]).cast(device), "Clicks": [1]})
+    table2 = pa.table({"Device": pa.array(["TABLET"]).cast(device), "Clicks": [2]})
+    table = concat([table1, table2])
+    assert table.num_rows == 2
+    assert table.schema.field("Device").type == device
+    assert table["Device"].to_pylist() == ["DESKTOP", "TABLET"]
+
+
+def test_stack():
+    from adwords_reports.frames import stack
+
+    class Account:
+        def __init__(self, account_id, currency):
+            self.id = account_id
+            self.currency = currency
+
+    results = [
+        (Account("111-111-1111", "EUR"), pd.DataFrame({"Cost": [1, 2]})),
+        (Account("222-222-2222", "USD"), pd.DataFrame({"Cost": [3]})),
+        (Account("333-333-3333", "EUR"), pd.DataFrame({"Cost": [4]}))
+    ]
+    report = stack(results)
+    assert report.columns.tolist() == ["AccountId", "AccountCurrencyCode", "Cost"]
+    assert report["AccountId"].tolist() == ["1111111111", "1111111111", "2222222222", "3333333333"]
+    assert report["AccountCurrencyCode"].cat.categories.tolist() == ["EUR", "USD"]
+    assert report["AccountCurrencyCode"].tolist() == ["EUR", "EUR", "USD", "EUR"]
+    assert stack([]).empty
@@ -0,0 +1,64 @@
+import datetime
+import pytest
+import pandas as pd
+
+
+class FakeAccount:
+    id = "519-085-5164"
+
+    def __init__(self):
+        self.downloaded = list()
+
+    def download(self, report_definition, zero_impressions, convert_money=False):
+        self.downloaded.append(report_definition.date_min)
+        return pd.DataFrame([[report_definition.date_min, 1]], columns=["Date", "Clicks"])
+
+
+@pytest.fixture()
+def fix_store(tmpdir):
+    from adwords_reports.incremental_sync import PartitionStore
+    return PartitionStore(str(tmpdir), file_format="pickle")
+
+
+def _report_definition(date_from, date_to):
+    from adwords_reports.report_definition import ReportDefinition
+    return ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Date", "Clicks"], date_from=date_from, date_to=date_to)
+
+
+def test_report_key(fix_store):
+    key = fix_store.report_key(_report_definition("2018-01-01", "2018-01-31"), zero_impressions=True)
+    assert key == fix_store.report_key(_report_definition("2018-02-01", "2018-02-05"), zero_impressions=True)
+    assert key != fix_store.report_key(_report_definition("2018-01-01", "2018-01-31"), zero_impressions=False)
+
+
+def test_sync_only_missing_partitions(fix_store):
+    from adwords_reports.incremental_sync import IncrementalSync
+
+    account = FakeAccount()
+    sync = IncrementalSync(fix_store, by="day", refetch_days=3)
+    report = sync.download(account, _report_definition("2018-01-01", "2018-01-03"), zero_impressions=True)
+    assert report["Date"].tolist() == ["20180101", "20180102", "20180103"]
+    assert account.downloaded == ["20180101", "20180102", "20180103"]
+
+    report = sync.download(account, _report_definition("2018-01-02", "2018-01-05"), zero_impressions=True)
+    assert report["Date"].tolist() == ["20180102", "20180103", "20180104", "20180105"]
+    assert account.downloaded[3:] == ["20180104", "20180105"]
+
+    key = fix_store.report_key(_report_definition("2018-01-01", "2018-01-01"), zero_impressions=True,
+                               convert_money=False)
+    assert len(fix_store.partitions(account.id, key)) == 5
+
+
+def test_sync_refetches_recent_days(fix_store):
+    from adwords_reports.incremental_sync import IncrementalSync
+
+    today = datetime.date.today()
+    date_from = (today - datetime.timedelta(5)).isoformat()
+    date_to = (today - datetime.timedelta(1)).isoformat()
+
+    account = FakeAccount()
+    sync = IncrementalSync(fix_store, by="day", refetch_days=3)
+    sync.sync(account, _report_definition(date_from, date_to), zero_impressions=True)
+    refetched = sync.sync(account, _report_definition(date_from, date_to), zero_impressions=True)
+    assert len(account.downloaded) == 5 + 3
+    assert len(refetched) == 3
@@ -0,0 +1,114 @@
+import io
+import json
+import pytest
+
+
+def test_disabled():
+    from adwords_reports.instrumentation import Instrumentation
+
+    instrumentation = Instrumentation()
+    assert not instrumentation.enabled
+    stream = io.BytesIO(b"data")
+    assert instrumentation.meter(stream) is stream
+    with instrumentation.span("download", account=1):
+        instrumentation.count("rows", 10)
+
+
+def test_span_and_count():
+    from adwords_reports.instrumentation import Instrumentation, CallbackExporter
+
+    events = list()
+    instrumentation = Instrumentation([CallbackExporter(events.append)])
+    with instrumentation.span("download", account="519-085-5164", report_type=None):
+        pass
+    instrumentation.count("rows", 10, account="519-085-5164")
+
+    assert [(e["type"], e["name"]) for e in events] == [("span", "download"), ("counter", "rows")]
+    assert events[0]["value"] >= 0
+    assert events[0]["labels"] == {"account": "519-085-5164"}
+    assert events[1]["value"] == 10
+
+
+def test_span_counts_errors():
+    from adwords_reports.instrumentation import Instrumentation, CallbackExporter
+
+    events = list()
+    instrumentation = Instrumentation([CallbackExporter(events.append)])
+    with pytest.raises(ValueError):
+        with instrumentation.span("listing"):
+            raise ValueError()
+    assert [(e["name"], e["labels"]) for e in events] == [
+        ("listing", {}), ("errors", {"span": "listing", "error": "ValueError"})]
+
+
+def test_metered_stream():
+    from adwords_reports.instrumentation import MeteredStream
+
+    metered = MeteredStream(io.BytesIO(b"abcdef"))
+    assert metered.read(4) == b"abcd"
+    assert metered.read() == b"ef"
+    assert metered.bytes == 6
+    assert metered.seconds >= 0
+
+
+def test_download_counts_bytes():
+    from adwords_reports.account import Account
+    from adwords_reports.instrumentation import Instrumentation, CallbackExporter
+    from adwords_reports.rate_limit import RetryPolicy, RateLimiter
+
+    report = u"M\u00fcnchen,1\n"
+    events = list()
+
+    class Downloader:
+        def DownloadReportAsString(self, report_definition, **kwargs):
+            return report
+
+    class Client:
+        developer_token = "token"
+        retry_policy = RetryPolicy()
+        rate_limiter = RateLimiter()
+        downloader = Downloader()
+        instrumentation = Instrumentation([CallbackExporter(events.append)])
+
+    account = Account(Client(), "519-085-5164", "name", "EUR", "Europe/Berlin", list())
+    account._download({"reportType": "KEYWORDS_PERFORMANCE_REPORT"}, zero_impressions=True)
+    # the same unit as the transferred bytes of compressed downloads
+    assert [e["value"] for e in events if e["name"] == "bytes"] == [len(report.encode("utf-8"))] == [11]
+
+
+def test_json_lines_exporter(tmpdir):
+    from adwords_reports.instrumentation import Instrumentation, JsonLinesExporter
+
+    path = str(tmpdir.join("metrics.jsonl"))
+    exporter = JsonLinesExporter(path)
+    instrumentation = Instrumentation([exporter])
+    instrumentation.count("bytes", 100, account=1)
+    instrumentation.count("bytes", 50, account=2)
+    instrumentation.flush()
+    exporter.close()
+
+    with open(path) as lines:
+        events = [json.loads(line) for line in lines]
+    assert [(e["value"], e["labels"]) for e in events] == [(100, {"account": "1"}), (50, {"account": "2"})]
+
+
+def test_prometheus_exporter(tmpdir):
+    from adwords_reports.instrumentation import Instrumentation, PrometheusExporter
+
+    path = str(tmpdir.join("adwords_reports.prom"))
+    instrumentation = Instrumentation([PrometheusExporter(path)])
+    instrumentation.count("rows", 10, account=1, report_type="KEYWORDS_PERFORMANCE_REPORT")
+    instrumentation.count("rows", 5, account=1, report_type="KEYWORDS_PERFORMANCE_REPORT")
+    instrumentation.timing("download", 1.5, account=1)
+    instrumentation.timing("download", 0.5, account=1)
+    instrumentation.count("errors", error="say \"hi\"")
+    instrumentation.flush()
+
+    with open(path) as metrics_file:
+        lines = metrics_file.read().splitlines()
+    assert lines == [
+        'adwords_reports_download_seconds_count{account="1"} 2',
+        'adwords_reports_download_seconds_sum{account="1"} 2.0',
+        'adwords_reports_errors_total{error="say \\"hi\\""} 1',
+        'adwords_reports_rows_total{account="1",report_type="KEYWORDS_PERFORMANCE_REPORT"} 15',
+    ]
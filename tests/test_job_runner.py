@@ -0,0 +1,87 @@
+import os
+
+from tests.conftest import FakeAccount, FakeClient, report_definitions
+
+
+def test_manifest(tmpdir):
+    from adwords_reports.job_runner import Manifest, DONE, FAILED
+
+    path = str(tmpdir.join("manifest.jsonl"))
+    manifest = Manifest(path)
+    manifest.record("a", FAILED, error="timeout")
+    manifest.record("a", DONE, path="a.parquet")
+    manifest.record("b", FAILED)
+    with open(path, "a") as manifest_file:
+        manifest_file.write('{"unit": "c", "sta')  # the process died while writing
+
+    reloaded = Manifest(path)
+    assert reloaded.get("a")["path"] == "a.parquet"
+    assert reloaded.units(DONE) == ["a"]
+    assert reloaded.units(FAILED) == ["b"]
+    assert reloaded.get("c") is None
+
+    reloaded.record("c", DONE)
+    assert Manifest(path).units(DONE) == ["a", "c"]
+
+
+def test_run_resumes(tmpdir):
+    from adwords_reports.job_runner import JobRunner
+
+    accounts = [FakeAccount("111-111-1111"), FakeAccount("222-222-2222")]
+    runner = JobRunner(FakeClient(accounts), str(tmpdir), file_format="pickle")
+    result = runner.run(report_definitions(), zero_impressions=True)
+    assert len(result["done"]) == 4
+    for unit in result["done"]:
+        record = runner.manifest.get(unit)
+        assert os.path.exists(record["path"])
+        assert record["rows"] == 2
+
+    # a new runner, e.g. after a restart, skips everything that's done
+    accounts = [FakeAccount("111-111-1111"), FakeAccount("222-222-2222")]
+    result = JobRunner(FakeClient(accounts), str(tmpdir), file_format="pickle").run(
+        report_definitions(), zero_impressions=True)
+    assert len(result["skipped"]) == 4
+    assert all(not account.downloaded for account in accounts)
+
+
+def test_run_redownloads_changed_outputs(tmpdir):
+    from adwords_reports.job_runner import JobRunner
+
+    runner = JobRunner(FakeClient([FakeAccount(1)]), str(tmpdir), file_format="pickle")
+    unit = runner.run(report_definitions()[:1], zero_impressions=True)["done"][0]
+    with open(runner.manifest.get(unit)["path"], "ab") as output:
+        output.write(b"corrupt")
+
+    account = FakeAccount(1)
+    runner = JobRunner(FakeClient([account]), str(tmpdir), file_format="pickle")
+    assert not runner.is_done(unit)
+    assert runner.run(report_definitions()[:1], zero_impressions=True)["done"] == [unit]
+
+
+def test_run_only_failed(tmpdir):
+    from adwords_reports.job_runner import JobRunner
+
+    accounts = [FakeAccount(1), FakeAccount(2, fail=True)]
+    runner = JobRunner(FakeClient(accounts), str(tmpdir), file_format="pickle")
+    result = runner.run(report_definitions(), zero_impressions=True)
+    assert len(result["done"]) == 2
+    assert len(result["failed"]) == 2
+    assert "connection reset" in runner.manifest.get(result["failed"][0])["error"]
+
+    accounts = [FakeAccount(1), FakeAccount(2)]
+    result = JobRunner(FakeClient(accounts), str(tmpdir), file_format="pickle").run(
+        report_definitions(), zero_impressions=True, only_failed=True)
+    assert len(result["done"]) == 2
+    assert accounts[0].downloaded == list()
+    assert accounts[1].downloaded == ["KEYWORDS_PERFORMANCE_REPORT", "AD_PERFORMANCE_REPORT"]
+
+
+def test_run_account(tmpdir):
+    from adwords_reports.job_runner import JobRunner, DONE
+
+    account = FakeAccount(1)
+    runner = JobRunner(FakeClient(list()), str(tmpdir), file_format="pickle")
+    result = runner.run_account(account, report_definitions(), zero_impressions=True)
+    assert len(result["done"]) == 2
+    assert runner.manifest.units(DONE) == sorted(result["done"])
+    assert runner.run_account(account, report_definitions(), zero_impressions=True)["skipped"] == result["done"]
@@ -44,3 +44,62 @@ def test_reg_and_micro_micro():
     from adwords_reports.micro_amounts import reg_and_micro
 
     assert reg_and_micro(100000) == (0.10, 100000)
+
+
+def test_micro_to_reg_array():
+    import numpy as np
+    from adwords_reports.micro_amounts import micro_to_reg
+
+    result = micro_to_reg(np.array([23000000, 1111111, 100]))
+    assert result.tolist() == [23.0, 1.11, 0.0]
+
+
+def test_reg_to_micro_array():
+    import numpy as np
+    from adwords_reports.micro_amounts import reg_to_micro
+
+    result = reg_to_micro(np.array([1.11, 1.1111, 0.003]))
+    assert result.dtype == np.int64
+    assert result.tolist() == [1110000, 1110000, 0]
+
+
+def test_reg_to_micro_series():
+    import pandas as pd
+    from adwords_reports.micro_amounts import reg_to_micro
+
+    series = pd.Series([1.11, None], index=[3, 4], name="CpcBid")
+    result = reg_to_micro(series)
+    assert str(result.dtype) == "Int64"
+    assert result.name == "CpcBid"
+    assert result.index.tolist() == [3, 4]
+    assert result[3] == 1110000
+    assert pd.isna(result[4])
+
+
+def test_micro_to_reg_series():
+    import pandas as pd
+    from adwords_reports.micro_amounts import micro_to_reg
+
+    series = pd.Series([23000000, None], dtype="Int64")
+    result = micro_to_reg(series)
+    assert result[0] == 23.0
+    assert pd.isna(result[1])
+
+
+def test_reg_and_micro_array():
+    import numpy as np
+    from adwords_reports.micro_amounts import reg_and_micro
+
+    regular, micro = reg_and_micro(np.array([1.11, 100000]))
+    assert regular.tolist() == [1.11, 0.10]
+    assert micro.tolist() == [1110000, 100000]
+
+
+def test_scalar_and_array_agree():
+    import numpy as np
+    from adwords_reports.micro_amounts import reg_to_micro, micro_to_reg
+
+    numbers = np.linspace(0, 50, 5001)
+    assert reg_to_micro(numbers).tolist() == [reg_to_micro(float(n)) for n in numbers]
+    micros = np.arange(0, 5 * 10**6, 997)
+    assert micro_to_reg(micros).tolist() == [micro_to_reg(int(n)) for n in micros]
@@ -0,0 +1,87 @@
+import threading
+
+
+def test_imap_unordered():
+    from adwords_reports.parallel import imap_unordered
+
+    result = imap_unordered(lambda x: x * 2, range(10), max_workers=3)
+    assert sorted(result) == [x * 2 for x in range(10)]
+
+
+def test_imap_unordered_completion_order():
+    from adwords_reports.parallel import imap_unordered
+
+    release = threading.Event()
+
+    def wait(item):
+        if item == "slow":
+            release.wait(10)  # until the fast one was handed out
+        return item
+
+    results = imap_unordered(wait, ["slow", "fast"], max_workers=2)
+    assert next(results) == "fast"
+    release.set()
+    assert next(results) == "slow"
+
+
+def test_imap_keeps_order():
+    from adwords_reports.parallel import imap
+
+    finished = list()
+    later_ones = [threading.Event(), threading.Event()]
+
+    def wait(item):
+        if item == 0:
+            for event in later_ones:
+                event.wait(10)  # the first item finishes last
+        finished.append(item)
+        if item > 0:
+            later_ones[item - 1].set()
+        return item
+
+    assert list(imap(wait, [0, 1, 2], max_workers=3)) == [0, 1, 2]
+    assert finished[-1] == 0
+
+
+def test_imap_bounded_in_flight():
+    from adwords_reports.parallel import imap_unordered
+
+    consumed = list()
+    lock = threading.Lock()
+
+    def lazy_items():
+        for i in range(100):
+            with lock:
+                consumed.append(i)
+            yield i
+
+    results = imap_unordered(lambda x: x, lazy_items(), max_workers=2)
+    next(results)
+    assert len(consumed) < 100
+
+
+def test_imap_raises():
+    import pytest
+    from adwords_reports.parallel import imap
+
+    def fail(x):
+        raise ValueError(x)
+
+    with pytest.raises(ValueError):
+        list(imap(fail, [1], max_workers=1))
+
+
+def test_imap_max_pending():
+    from adwords_reports.parallel import imap_unordered
+
+    consumed = list()
+
+    def lazy_items():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    results = imap_unordered(lambda x: x, lazy_items(), max_workers=1, max_pending=1)
+    next(results)
+    # one result is handed out and only the next call is in flight
+    assert consumed == [0, 1]
@@ -0,0 +1,106 @@
+import io
+import gzip
+
+import pytest
+
+CSV = "2018-01-01,DESKTOP,Brand,12,1200000\n2018-01-02,TABLET, --,,50000\n"
+HEADER = ["Date", "Device", "CampaignName", "Clicks", "Cost"]
+DTYPES = {"Device": "category", "CampaignName": str, "Clicks": "Int64", "Cost": "Int64"}
+
+
+def test_read_csv_pandas():
+    from adwords_reports.parsers import read_csv
+
+    report = read_csv(CSV, HEADER, DTYPES)
+    assert report.columns.tolist() == HEADER
+    assert str(report["Device"].dtype) == "category"
+    assert str(report["Clicks"].dtype) == "Int64"
+    assert report["Clicks"].isna().tolist() == [False, True]
+    assert report["CampaignName"].tolist() == ["Brand", " --"]
+
+
+def test_read_csv_unicode():
+    from adwords_reports.parsers import read_csv
+
+    # the report body as python 2 downloads it, which mustn't be taken for a path
+    data = u"2018-01-01,DESKTOP,Caf\u00e9,12,1200000\n"
+    report = read_csv(data, HEADER, DTYPES)
+    assert report["CampaignName"].tolist() == [u"Caf\u00e9"]
+    assert report["Clicks"].tolist() == [12]
+
+
+def test_read_csv_pyarrow():
+    pytest.importorskip("pyarrow")
+    from adwords_reports.parsers import read_csv
+
+    expected = read_csv(CSV, HEADER, DTYPES)
+    for data in (CSV, io.StringIO(CSV), io.BytesIO(CSV.encode("utf-8")),
+                 gzip.GzipFile(fileobj=io.BytesIO(gzip.compress(CSV.encode("utf-8"))))):
+        report = read_csv(data, HEADER, DTYPES, parser="pyarrow")
+        assert report.columns.tolist() == HEADER
+        assert str(report["Device"].dtype) == "category"
+        assert str(report["Clicks"].dtype) == "Int64"
+        assert report["Clicks"].isna().tolist() == [False, True]
+        assert report["Cost"].tolist() == expected["Cost"].tolist()
+        assert report["Device"].tolist() == expected["Device"].tolist()
+
+
+def test_to_pandas_fallback():
+    pytest.importorskip("pyarrow")
+    from adwords_reports.parsers import read_csv, to_pandas
+
+    class OldTable:
+        """ pyarrow < 2.0 doesn't know the keywords of to_pandas """
+        def __init__(self, table):
+            self.table = table
+            self.schema = table.schema
+
+        def to_pandas(self, **kwargs):
+            if kwargs:
+                raise TypeError("to_pandas() got an unexpected keyword argument")
+            return self.table.to_pandas()
+
+    expected = read_csv(CSV, HEADER, DTYPES, parser="pyarrow")
+    report = to_pandas(OldTable(read_csv(CSV, HEADER, DTYPES, parser="arrow")))
+    assert report.dtypes.astype(str).tolist() == expected.dtypes.astype(str).tolist()
+    assert report["Clicks"].isna().tolist() == [False, True]
+    assert report["Cost"].tolist() == expected["Cost"].tolist()
+
+
+def test_read_csv_arrow():
+    pa = pytest.importorskip("pyarrow")
+    from adwords_reports.parsers import read_csv
+
+    table = read_csv(CSV, HEADER, DTYPES, parser="arrow")
+    assert isinstance(table, pa.Table)
+    assert table.column_names == HEADER
+    assert table.schema.field("Clicks").type == pa.int64()
+    assert table["Clicks"].to_pylist() == [12, None]
+
+
+def test_read_csv_empty():
+    pa = pytest.importorskip("pyarrow")
+    from adwords_reports.parsers import read_csv
+
+    table = read_csv("", HEADER, DTYPES, parser="arrow")
+    assert table.num_rows == 0
+    assert table.column_names == HEADER
+    assert table.schema.field("Cost").type == pa.int64()
+    assert len(read_csv("", HEADER, DTYPES, parser="pyarrow")) == 0
+
+
+def test_read_csv_arrow_kwargs():
+    pytest.importorskip("pyarrow")
+    from adwords_reports.parsers import read_csv
+
+    with pytest.raises(AssertionError):
+        read_csv(CSV, HEADER, DTYPES, parser="arrow", chunksize=1)
+
+
+def test_micro_to_reg_arrow():
+    pytest.importorskip("pyarrow")
+    from adwords_reports.parsers import read_csv, micro_to_reg_arrow
+
+    table = micro_to_reg_arrow(read_csv(CSV, HEADER, DTYPES, parser="arrow"), ["Cost"])
+    assert table.column_names == HEADER
+    assert table["Cost"].to_pylist() == [1.2, 0.05]
@@ -0,0 +1,161 @@
+import time
+import errno
+import pytest
+
+
+class FakeSleep:
+    def __init__(self):
+        self.waits = list()
+
+    def __call__(self, seconds):
+        self.waits.append(seconds)
+
+
+class FlakyCall:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "result"
+
+
+def connection_reset():
+    return IOError(errno.ECONNRESET, "connection reset")
+
+
+class ApiError(Exception):
+    def __init__(self, message, errors=None, code=None):
+        super(ApiError, self).__init__(message)
+        self.errors = errors or list()
+        self.code = code
+
+
+def test_token_bucket():
+    from adwords_reports.rate_limit import TokenBucket
+
+    bucket = TokenBucket(rate=100, capacity=2)
+    start = time.time()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.time() - start >= 0.025
+
+
+def test_token_bucket_pause():
+    from adwords_reports.rate_limit import TokenBucket
+
+    sleep = FakeSleep()
+    bucket = TokenBucket(rate=None)
+    bucket.pause(0.05)
+    bucket.acquire(sleep=lambda seconds: (sleep(seconds), time.sleep(seconds)))
+    assert 0 < sleep.waits[0] <= 0.05
+
+
+def test_is_retryable():
+    from adwords_reports.rate_limit import is_retryable
+
+    assert is_retryable(connection_reset())
+    assert is_retryable(ApiError("[RateExceededError.RATE_EXCEEDED @ ]"))
+    assert is_retryable(ApiError("internal", code=500))
+    assert not is_retryable(ApiError("ReportDefinitionError.INVALID_FIELD_NAME_FOR_REPORT", code=400))
+    assert not is_retryable(ValueError("invalid"))
+    # local errors are permanent
+    assert not is_retryable(IOError(errno.ENOENT, "No such file or directory: 'googleads.yaml'"))
+    assert not is_retryable(IOError(errno.EACCES, "Permission denied"))
+
+
+def test_is_network_error():
+    import socket
+    from adwords_reports.rate_limit import is_network_error, URLError, HTTPException
+
+    assert is_network_error(socket.timeout("timed out"))
+    assert is_network_error(HTTPException("incomplete read"))
+    assert is_network_error(URLError(connection_reset()))
+    assert not is_network_error(URLError("unknown url type: ftp"))
+    assert not is_network_error(IOError("connection reset"))  # without errno it's not known to be the network
+
+
+def test_retry_after_seconds():
+    from adwords_reports.rate_limit import retry_after_seconds, rate_scope, DEFAULT_RATE_EXCEEDED_WAIT
+
+    error = ApiError("RateExceededError", errors=[{"retryAfterSeconds": 12, "rateScope": "ACCOUNT"}])
+    assert retry_after_seconds(error) == 12
+    assert rate_scope(error) == "ACCOUNT"
+    assert retry_after_seconds(ApiError("RateExceededError.RATE_EXCEEDED")) == DEFAULT_RATE_EXCEEDED_WAIT
+    assert retry_after_seconds(IOError()) is None
+
+
+def test_retry_policy_retries():
+    from adwords_reports.rate_limit import RetryPolicy
+
+    sleep = FakeSleep()
+    func = FlakyCall([connection_reset(), connection_reset()])
+    assert RetryPolicy(max_attempts=3, base_delay=1, sleep=sleep).call(func) == "result"
+    assert func.calls == 3
+    assert sleep.waits[0] <= 1
+    assert sleep.waits[1] <= 2
+
+
+def test_retry_policy_gives_up():
+    from adwords_reports.rate_limit import RetryPolicy
+
+    func = FlakyCall([connection_reset(), connection_reset()])
+    with pytest.raises(IOError):
+        RetryPolicy(max_attempts=2, sleep=FakeSleep()).call(func)
+    assert func.calls == 2
+
+
+def test_retry_policy_not_retryable():
+    from adwords_reports.rate_limit import RetryPolicy
+
+    func = FlakyCall([ValueError()])
+    with pytest.raises(ValueError):
+        RetryPolicy(sleep=FakeSleep()).call(func)
+    assert func.calls == 1
+
+
+def test_retry_policy_honors_retry_after():
+    from adwords_reports.rate_limit import RetryPolicy, RateLimiter
+
+    class RecordingRateLimiter(RateLimiter):
+        paused = list()
+
+        def pause(self, seconds, developer_token, customer_id=None):
+            self.paused.append((seconds, developer_token, customer_id))
+
+    sleep = FakeSleep()
+    limiter = RecordingRateLimiter()
+    func = FlakyCall([ApiError("RateExceededError", errors=[{"retryAfterSeconds": 30, "rateScope": "ACCOUNT"}])])
+    policy = RetryPolicy(base_delay=1, sleep=sleep)
+    assert policy.call(func, rate_limiter=limiter, developer_token="token", customer_id=1) == "result"
+    assert sleep.waits == [30]
+    assert limiter.paused == [(30, "token", 1)]
+
+
+def test_retried():
+    from adwords_reports.instrumentation import Instrumentation, CallbackExporter
+    from adwords_reports.rate_limit import RetryPolicy, RateLimiter, retried
+
+    events = list()
+
+    class Service:
+        retry_policy = RetryPolicy(sleep=FakeSleep())
+        rate_limiter = RateLimiter()
+        rate_limit_scope = ("token", None)
+        instrumentation = Instrumentation([CallbackExporter(events.append)])
+
+        def __init__(self):
+            self.flaky = FlakyCall([connection_reset()])
+
+        @retried
+        def get(self):
+            return self.flaky()
+
+    service = Service()
+    assert service.get() == "result"
+    assert service.flaky.calls == 2
+    assert [(e["name"], e["value"], e["labels"]) for e in events] == [
+        ("retries", 1, {"method": "get", "error": type(connection_reset()).__name__})]
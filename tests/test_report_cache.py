@@ -0,0 +1,153 @@
+import os
+import time
+import pytest
+import pandas as pd
+
+
+@pytest.fixture()
+def fix_cache(tmpdir):
+    from adwords_reports.report_cache import ReportCache
+    return ReportCache(str(tmpdir), ttl=60, file_format="pickle")
+
+
+@pytest.fixture()
+def fix_old_report_definition():
+    from adwords_reports.report_definition import ReportDefinition
+    return ReportDefinition(report_type="KEYWORDS_PERFORMANCE_REPORT", fields=["Criteria"],
+                            date_from="2018-01-01", date_to="2018-01-31")
+
+
+@pytest.fixture()
+def fix_recent_report_definition():
+    from adwords_reports.report_definition import ReportDefinition
+    return ReportDefinition(report_type="KEYWORDS_PERFORMANCE_REPORT", fields=["Criteria"], last_days=7)
+
+
+@pytest.fixture()
+def fix_report():
+    return pd.DataFrame([["test_kw_1"], ["test_kw_2"]], columns=["Criteria"])
+
+
+def test_key(fix_cache, fix_old_report_definition):
+    key = fix_cache.key("519-085-5164", fix_old_report_definition, zero_impressions=True)
+    assert key == fix_cache.key(5190855164, fix_old_report_definition, zero_impressions=True)
+    assert key != fix_cache.key(5190855164, fix_old_report_definition, zero_impressions=False)
+    assert key != fix_cache.key(5190855164, fix_old_report_definition, zero_impressions=True, convert_money=True)
+
+
+def test_put_and_get(fix_cache, fix_old_report_definition, fix_report):
+    key = fix_cache.key(1, fix_old_report_definition, zero_impressions=True)
+    assert fix_cache.get(key) is None
+    fix_cache.put(key, fix_report, fix_old_report_definition)
+    assert fix_cache.get(key).equals(fix_report)
+
+
+def test_persistence(tmpdir, fix_cache, fix_old_report_definition, fix_report):
+    from adwords_reports.report_cache import ReportCache
+
+    key = fix_cache.key(1, fix_old_report_definition, zero_impressions=True)
+    fix_cache.put(key, fix_report, fix_old_report_definition)
+    assert ReportCache(str(tmpdir), file_format="pickle").get(key).equals(fix_report)
+
+
+def test_ttl(fix_cache, fix_old_report_definition, fix_recent_report_definition, fix_report):
+    fix_cache.ttl = 0
+    recent_key = fix_cache.key(1, fix_recent_report_definition, zero_impressions=True)
+    old_key = fix_cache.key(1, fix_old_report_definition, zero_impressions=True)
+    fix_cache.put(recent_key, fix_report, fix_recent_report_definition)
+    fix_cache.put(old_key, fix_report, fix_old_report_definition)
+    time.sleep(0.01)
+
+    assert fix_cache.get(recent_key) is None
+    assert fix_cache.get(old_key) is not None  # immutable
+
+
+def test_lru_eviction(fix_cache, fix_old_report_definition, fix_report):
+    keys = [fix_cache.key(account_id, fix_old_report_definition, zero_impressions=True) for account_id in range(3)]
+    fix_cache.put(keys[0], fix_report, fix_old_report_definition)
+    fix_cache.max_size = 2 * fix_cache.size
+    fix_cache.put(keys[1], fix_report, fix_old_report_definition)
+    fix_cache.get(keys[0])
+    fix_cache.put(keys[2], fix_report, fix_old_report_definition)
+
+    assert fix_cache.get(keys[0]) is not None
+    assert fix_cache.get(keys[1]) is None
+    assert fix_cache.get(keys[2]) is not None
+
+
+def test_shared_directory(tmpdir, fix_cache, fix_old_report_definition, fix_report):
+    from adwords_reports.report_cache import ReportCache
+
+    other_cache = ReportCache(str(tmpdir), ttl=60, file_format="pickle")
+    keys = [fix_cache.key(account_id, fix_old_report_definition, zero_impressions=True) for account_id in range(3)]
+    fix_cache.put(keys[0], fix_report, fix_old_report_definition)
+    other_cache.put(keys[1], fix_report, fix_old_report_definition)
+    assert other_cache.get(keys[0]) is not None
+    assert fix_cache.get(keys[1]) is not None
+
+    # a hit only changes the access time of its own report
+    metadata_path = os.path.join(str(tmpdir), keys[0] + ".json")
+    modified = os.path.getmtime(metadata_path)
+    fix_cache.get(keys[0])
+    assert os.path.getmtime(metadata_path) == modified
+
+    # accesses of both caches decide what's evicted
+    other_cache.max_size = 2 * os.path.getsize(os.path.join(str(tmpdir), keys[0] + ".pickle"))
+    other_cache.put(keys[2], fix_report, fix_old_report_definition)
+    assert fix_cache.get(keys[1]) is None
+    assert fix_cache.get(keys[0]) is not None
+
+
+def test_convert_index(tmpdir, fix_old_report_definition, fix_report):
+    import json
+    from adwords_reports.report_cache import ReportCache
+
+    cache = ReportCache(str(tmpdir), file_format="pickle")
+    key = cache.key(1, fix_old_report_definition, zero_impressions=True)
+    fix_report.to_pickle(os.path.join(str(tmpdir), key + ".pickle"))
+    with open(os.path.join(str(tmpdir), "index.json"), "w") as index_file:
+        json.dump({key: {"size": 1, "created": time.time(), "accessed": time.time(), "immutable": True}}, index_file)
+
+    assert ReportCache(str(tmpdir), file_format="pickle").get(key).equals(fix_report)
+    assert not os.path.exists(os.path.join(str(tmpdir), "index.json"))
+
+
+def test_clear(fix_cache, fix_old_report_definition, fix_report):
+    key = fix_cache.key(1, fix_old_report_definition, zero_impressions=True)
+    fix_cache.put(key, fix_report, fix_old_report_definition)
+    fix_cache.clear()
+    assert fix_cache.get(key) is None
+    assert fix_cache.size == 0
+
+
+def test_parquet(tmpdir, fix_old_report_definition):
+    pytest.importorskip("pyarrow")
+    from adwords_reports.report_cache import ReportCache
+
+    cache = ReportCache(str(tmpdir), file_format="parquet")
+    report = pd.DataFrame({"Criteria": ["a", "b"], "Impressions": pd.Series([1, None], dtype="Int64")})
+    report["KeywordMatchType"] = pd.Categorical(["Exact", "Broad"])
+    key = cache.key(1, fix_old_report_definition, zero_impressions=True)
+    cache.put(key, report, fix_old_report_definition)
+    cached_report = cache.get(key)
+    assert cached_report["Impressions"].isna().tolist() == [False, True]
+    assert str(cached_report["KeywordMatchType"].dtype) == "category"
+
+
+def test_hit_isnt_validated(fix_cache, fix_old_report_definition, fix_report):
+    from adwords_reports.account import Account
+
+    class Client:
+        cache = fix_cache
+        parser = "pandas"
+        validated = list()
+
+        def validate(self, report_definition):
+            # would request ReportDefinitionService
+            self.validated.append(report_definition)
+
+    account = Account(Client(), "519-085-5164", "name", "EUR", "Europe/Berlin", list())
+    key = fix_cache.key(account.id, fix_old_report_definition, zero_impressions=True, convert_money=False)
+    fix_cache.put(key, fix_report, fix_old_report_definition)
+    assert account.download(fix_old_report_definition, zero_impressions=True).equals(fix_report)
+    assert Client.validated == list()
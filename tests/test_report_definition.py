@@ -54,4 +54,89 @@ def test_report_definition():
     with pytest.raises(AssertionError):
         ReportDefinition(
             report_type=r_type, fields=fields, predicates=predicates,
-            last_days=3, date_from=seven_d_ago, date_to=yesterday)
\ No newline at end of file
+            last_days=3, date_from=seven_d_ago, date_to=yesterday)
+
+
+def test_dates():
+    from adwords_reports.report_definition import ReportDefinition
+    import datetime
+
+    r_def = ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Criteria"], date_from="2018-05-30", date_to="20180602")
+    assert r_def.dates == (datetime.date(2018, 5, 30), datetime.date(2018, 6, 2))
+
+
+def test_split():
+    from adwords_reports.report_definition import ReportDefinition
+
+    predicates = [{"field": "Name", "operator": "EQUALS", "values": "test_kw_1"}]
+    r_def = ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Criteria"], predicates,
+                             date_from="2018-05-30", date_to="2018-07-03")
+
+    def date_ranges(report_definitions):
+        return [(r.date_min, r.date_max) for r in report_definitions]
+
+    days = r_def.split("day")
+    assert len(days) == 35
+    assert date_ranges(days[:2]) == [("20180530", "20180530"), ("20180531", "20180531")]
+    assert days[0].raw["selector"]["predicates"] == predicates
+
+    weeks = r_def.split("week")  # 2018-06-04 is a monday
+    assert date_ranges(weeks[:2]) == [("20180530", "20180603"), ("20180604", "20180610")]
+    assert date_ranges(weeks[-1:]) == [("20180702", "20180703")]
+
+    months = r_def.split("month")
+    assert date_ranges(months) == [("20180530", "20180531"), ("20180601", "20180630"), ("20180701", "20180703")]
+
+    with pytest.raises(AssertionError):
+        r_def.split("year")
+
+
+def test_download_format():
+    from adwords_reports.report_definition import ReportDefinition
+
+    r_def = ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Criteria"], last_days=7, download_format="GZIPPED_CSV")
+    assert r_def.raw["downloadFormat"] == "GZIPPED_CSV"
+    assert r_def.split("day")[0].raw["downloadFormat"] == "GZIPPED_CSV"
+
+    with pytest.raises(AssertionError):
+        ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Criteria"], last_days=7, download_format="XML")
+
+
+REPORT_FIELDS = [
+    {"fieldName": "Criteria", "canSelect": True, "canFilter": True},
+    {"fieldName": "Device", "canSelect": True, "canFilter": True, "enumValues": ["DESKTOP", "TABLET"]},
+    {"fieldName": "Labels", "canSelect": True, "canFilter": False},
+    {"fieldName": "ConversionTypeName", "canSelect": True, "canFilter": True, "exclusiveFields": ["Clicks"]},
+    {"fieldName": "Clicks", "canSelect": True, "canFilter": True, "exclusiveFields": ["ConversionTypeName"]},
+]
+
+
+def test_validate():
+    from adwords_reports.report_definition import ReportDefinition
+
+    report_definition = ReportDefinition(
+        "KEYWORDS_PERFORMANCE_REPORT", ["Criteria", "Clicks", "Device"],
+        predicates=[{"field": "Device", "operator": "IN", "values": ["DESKTOP", "TABLET"]}], last_days=7)
+    report_definition.validate(REPORT_FIELDS)
+
+
+def test_validate_problems():
+    from adwords_reports.report_definition import ReportDefinition, InvalidReportDefinition
+
+    report_definition = ReportDefinition(
+        "KEYWORDS_PERFORMANCE_REPORT", ["Criteria", "Clciks", "Clicks", "ConversionTypeName"],
+        predicates=[
+            {"field": "Labels", "operator": "CONTAINS_ANY", "values": ["a"]},
+            {"field": "Device", "operator": "EQUALS", "values": "MOBILE"},
+            {"field": "Status", "operator": "EQUALS", "values": "ENABLED"},
+        ], last_days=7)
+    with pytest.raises(InvalidReportDefinition) as error:
+        report_definition.validate(REPORT_FIELDS)
+    assert error.value.problems == [
+        "unknown field Clciks",
+        "Clicks can't be combined with ConversionTypeName",
+        "Labels can't be filtered",
+        "unknown values of Device: MOBILE",
+        "unknown field Status in predicates",
+    ]
+    assert isinstance(error.value, ValueError)
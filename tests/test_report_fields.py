@@ -0,0 +1,62 @@
+def test_dtypes():
+    from adwords_reports.report_fields import FieldRegistry
+
+    registry = FieldRegistry()
+    dtypes = registry.dtypes("KEYWORDS_PERFORMANCE_REPORT", ["Id", "KeywordMatchType", "Criteria", "Unknown"])
+    assert dtypes == {"Id": "Int64", "KeywordMatchType": "category", "Criteria": str}
+
+
+def test_register():
+    from adwords_reports.report_fields import FieldRegistry
+
+    registry = FieldRegistry(field_types=dict())
+    registry.register("KEYWORDS_PERFORMANCE_REPORT", [
+        {"fieldName": "Labels", "fieldType": "String", "enumValues": []},
+        {"fieldName": "Device", "fieldType": "Device", "enumValues": ["DESKTOP", "HIGH_END_MOBILE"]},
+        {"fieldName": "Ctr", "fieldType": "Double"},
+    ])
+    assert registry.field_type("KEYWORDS_PERFORMANCE_REPORT", "Labels") == "String"
+    assert registry.field_type("KEYWORDS_PERFORMANCE_REPORT", "Device") == "Enum"
+    assert registry.field_type("KEYWORDS_PERFORMANCE_REPORT", "Ctr") is None
+    assert registry.field_type("AD_PERFORMANCE_REPORT", "Device") is None
+
+
+def test_shipped_types_take_precedence():
+    from adwords_reports.report_fields import FieldRegistry
+
+    registry = FieldRegistry()
+    registry.register("KEYWORDS_PERFORMANCE_REPORT", [
+        {"fieldName": "CampaignName", "fieldType": "String", "enumValues": []},
+    ])
+    assert registry.field_type("KEYWORDS_PERFORMANCE_REPORT", "CampaignName") == "Label"
+
+
+def test_parse_with_dtypes():
+    import io
+    import pandas as pd
+    from adwords_reports.report_fields import FieldRegistry, NA_VALUES
+
+    fields = ["Id", "KeywordMatchType", "QualityScore", "Cost", "AveragePosition"]
+    dtypes = FieldRegistry().dtypes("KEYWORDS_PERFORMANCE_REPORT", fields)
+    data = io.StringIO("1,Exact,3,10000,1.5\n2,Broad, --,0,2.0\n")
+    report = pd.read_csv(data, names=fields, dtype=dtypes, na_values={f: NA_VALUES for f in dtypes})
+    assert str(report["Id"].dtype) == "Int64"
+    assert str(report["KeywordMatchType"].dtype) == "category"
+    assert report["QualityScore"].isna().tolist() == [False, True]
+    assert str(report["AveragePosition"].dtype) == "float32"
+
+
+def test_is_segment():
+    from adwords_reports.report_fields import FieldRegistry
+
+    registry = FieldRegistry()
+    assert registry.is_segment("KEYWORDS_PERFORMANCE_REPORT", "Device")
+    assert not registry.is_segment("KEYWORDS_PERFORMANCE_REPORT", "CampaignName")
+
+    registry.register("KEYWORDS_PERFORMANCE_REPORT", [
+        {"fieldName": "Device", "fieldType": "Device", "fieldBehavior": "SEGMENT"},
+        {"fieldName": "Month", "fieldType": "String", "fieldBehavior": "ATTRIBUTE"},
+    ])
+    assert registry.is_segment("KEYWORDS_PERFORMANCE_REPORT", "Device")
+    assert not registry.is_segment("KEYWORDS_PERFORMANCE_REPORT", "Month")
+    assert registry.is_segment("AD_PERFORMANCE_REPORT", "Month")
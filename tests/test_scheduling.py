@@ -0,0 +1,49 @@
+import pytest
+
+
+class FakeAccount:
+    def __init__(self, account_id, name):
+        self.id = account_id
+        self.name = name
+
+
+def _accounts():
+    return [FakeAccount("111-111-1111", "A"), FakeAccount("222-222-2222", "B"),
+            FakeAccount("333-333-3333", "C"), FakeAccount("444-444-4444", "D")]
+
+
+def test_account_stats(tmpdir):
+    from adwords_reports.scheduling import AccountStats
+
+    path = str(tmpdir.join("stats.json"))
+    stats = AccountStats(path, smoothing=0.5)
+    assert stats.expected_seconds("111-111-1111") is None
+    stats.record("111-111-1111", "KEYWORDS_PERFORMANCE_REPORT", seconds=10., rows=1000)
+    stats.record(1111111111, "KEYWORDS_PERFORMANCE_REPORT", seconds=20., rows=3000)
+    stats.record(1111111111, "AD_PERFORMANCE_REPORT", seconds=1., rows=10)
+    stats.save()
+
+    reloaded = AccountStats(path)
+    assert reloaded.expected_seconds("111-111-1111", "KEYWORDS_PERFORMANCE_REPORT") == 15.
+    assert reloaded.expected_seconds("111-111-1111") == 16.
+    assert reloaded.expected_seconds("111-111-1111", "CAMPAIGN_PERFORMANCE_REPORT") is None
+
+
+def test_schedule_longest_first(tmpdir):
+    from adwords_reports.scheduling import AccountStats, schedule
+
+    stats = AccountStats(str(tmpdir.join("stats.json")))
+    stats.record("111-111-1111", "KEYWORDS_PERFORMANCE_REPORT", seconds=1., rows=10)
+    stats.record("333-333-3333", "KEYWORDS_PERFORMANCE_REPORT", seconds=60., rows=10 ** 6)
+    stats.record("444-444-4444", "KEYWORDS_PERFORMANCE_REPORT", seconds=5., rows=1000)
+
+    def names(accounts):
+        return [account.name for account in accounts]
+
+    assert names(schedule(_accounts(), stats)) == ["B", "C", "D", "A"]
+    assert names(schedule(_accounts(), stats, fallback="last")) == ["C", "D", "A", "B"]
+    assert names(schedule(_accounts(), stats, report_type="AD_PERFORMANCE_REPORT")) == ["A", "B", "C", "D"]
+    assert names(schedule(_accounts(), stats, report_type="AD_PERFORMANCE_REPORT",
+                          fallback_key=lambda account: account.name, fallback="last")) == ["A", "B", "C", "D"]
+    with pytest.raises(AssertionError):
+        schedule(_accounts(), stats, fallback="random")
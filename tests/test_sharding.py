@@ -0,0 +1,88 @@
+import os
+
+from tests.conftest import ACCOUNT_IDS, fake_client_factory, report_definitions
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.
+
+    def __call__(self):
+        return self.now
+
+
+def test_shard_of():
+    from adwords_reports.sharding import shard_of
+
+    assert shard_of("123-456-7890", 4) == shard_of(1234567890, 4)
+    shards = [shard_of(account_id, 4) for account_id in range(1000000000, 1000004000)]
+    assert set(shards) == {0, 1, 2, 3}
+    assert min(shards.count(shard) for shard in range(4)) > 800
+
+
+def test_work_queue_claims(tmpdir):
+    from adwords_reports.sharding import WorkQueue, shard_of
+    from adwords_reports.job_runner import DONE
+
+    queue = WorkQueue(str(tmpdir.join("queue.sqlite")), shards=2)
+    queue.add(ACCOUNT_IDS)
+    queue.add(ACCOUNT_IDS[:1])  # known accounts are ignored
+    own = [account_id.replace("-", "") for account_id in ACCOUNT_IDS if shard_of(account_id, 2) == 0]
+
+    claimed = [queue.claim("a", shard=0) for _ in own]
+    assert sorted(claimed) == sorted(own)
+    # then it takes over accounts of the other shard
+    assert shard_of(queue.claim("a", shard=0), 2) == 1
+
+    assert queue.complete("a", claimed[0], DONE)
+    assert not queue.complete("b", claimed[1], DONE)  # claimed by another worker
+    assert queue.claim("b", shard=1, account_ids={"nothing"}) is None
+    assert queue.counts() == {"done": 1, "claimed": len(own), "pending": len(ACCOUNT_IDS) - len(own) - 1}
+
+
+def test_work_queue_reclaims_stalled(tmpdir):
+    from adwords_reports.sharding import WorkQueue
+    from adwords_reports.job_runner import DONE
+
+    clock = FakeClock()
+    queue = WorkQueue(str(tmpdir.join("queue.sqlite")), shards=1, stale_seconds=10, max_attempts=2, clock=clock)
+    queue.add(ACCOUNT_IDS[:1])
+    account_id = queue.claim("a", shard=0)
+    queue.heartbeat("b")
+    assert queue.claim("b", shard=0) is None
+
+    clock.now += 20  # a stalls
+    assert queue.claim("b", shard=0) == account_id
+    assert not queue.complete("a", account_id, DONE)
+
+    clock.now += 20  # b stalls as well
+    assert queue.claim("c", shard=0) is None
+    assert queue.counts() == {"failed": 1}
+
+    queue.retry_failed()
+    assert queue.claim("c", shard=0) == account_id
+
+
+def test_work(tmpdir):
+    from adwords_reports.sharding import ShardedRunner
+
+    def client_factory(credentials_path):
+        return fake_client_factory(credentials_path, failing=ACCOUNT_IDS[:1])
+
+    runner = ShardedRunner(["a.yaml", "b.yaml"], str(tmpdir), file_format="pickle", client_factory=client_factory)
+    result = runner.work(0, report_definitions(), zero_impressions=True)
+    # a single worker does the other shard's work as well
+    assert result == {"done": len(ACCOUNT_IDS) - 1, "failed": 1}
+    assert runner.queue.counts() == {"done": len(ACCOUNT_IDS) - 1, "failed": 1}
+    assert len(os.listdir(str(tmpdir.join("manifests")))) == 1
+
+
+def test_run(tmpdir):
+    from adwords_reports.sharding import ShardedRunner
+
+    runner = ShardedRunner(["a.yaml", "b.yaml"], str(tmpdir), workers=3, file_format="pickle",
+                           client_factory=fake_client_factory)
+    assert runner.run(report_definitions(), zero_impressions=True) == {"done": len(ACCOUNT_IDS)}
+    assert len(os.listdir(str(tmpdir.join("manifests")))) == 3
+    # everything is done, so a second run has nothing left to do
+    assert runner.run(report_definitions(), zero_impressions=True) == {"done": len(ACCOUNT_IDS)}
@@ -0,0 +1,84 @@
+import os
+import pytest
+import pandas as pd
+
+
+class FakeAccount:
+    def __init__(self, account_id):
+        self.id = account_id
+
+
+def _report(clicks):
+    return pd.DataFrame({"Criteria": ["kw{}".format(c) for c in clicks], "Clicks": clicks})
+
+
+def _report_definition():
+    from adwords_reports.report_definition import ReportDefinition
+    return ReportDefinition("KEYWORDS_PERFORMANCE_REPORT", ["Criteria", "Clicks"],
+                            date_from="2018-01-01", date_to="2018-01-31")
+
+
+def test_partitioned_sink(tmpdir):
+    pytest.importorskip("pyarrow")
+    from adwords_reports.sinks import PartitionedSink
+
+    sink = PartitionedSink(str(tmpdir), _report_definition())
+    sink.write(FakeAccount("519-085-5164"), _report([1, 2]))
+    sink.write(FakeAccount("123-456-7890"), _report([3]))
+    assert os.path.exists(os.path.join(str(tmpdir), "account_id=5190855164", "20180101_20180131.parquet"))
+
+    stacked = pd.read_parquet(str(tmpdir)).sort_values("Clicks")
+    assert stacked["Clicks"].tolist() == [1, 2, 3]
+    assert stacked["account_id"].astype(str).tolist() == ["5190855164", "5190855164", "1234567890"]
+
+
+@pytest.mark.parametrize("file_name", ["report.csv", "report.csv.gz"])
+def test_csv_sink(tmpdir, file_name):
+    from adwords_reports.sinks import CsvSink
+
+    path = os.path.join(str(tmpdir), file_name)
+    CsvSink(path).write(FakeAccount("519-085-5164"), _report([1, 2]))
+    CsvSink(path).write(FakeAccount("123-456-7890"), _report([3]))  # appends to the same file
+
+    stacked = pd.read_csv(path, dtype={"AccountId": str})
+    assert stacked.columns.tolist() == ["AccountId", "Criteria", "Clicks"]
+    assert stacked["Clicks"].tolist() == [1, 2, 3]
+    assert stacked["AccountId"].tolist() == ["5190855164", "5190855164", "1234567890"]
+
+
+def test_csv_sink_gzip(tmpdir):
+    import gzip
+    from adwords_reports.sinks import CsvSink
+
+    path = os.path.join(str(tmpdir), "report.csv.gz")
+    sink = CsvSink(path)
+    sink.write(FakeAccount("519-085-5164"), pd.DataFrame({"Criteria": [u"caf\u00e9"], "Clicks": [1]}))
+    sink.write(FakeAccount("123-456-7890"), _report([3]))
+
+    with gzip.open(path, "rb") as csv_file:  # both appended members are read back
+        lines = csv_file.read().decode("utf-8").splitlines()
+    assert lines == [u"AccountId,Criteria,Clicks", u"5190855164,caf\u00e9,1", u"1234567890,kw3,3"]
+
+
+def test_csv_sink_without_account_column(tmpdir):
+    from adwords_reports.sinks import CsvSink
+
+    path = os.path.join(str(tmpdir), "report.csv")
+    report = _report([1])
+    CsvSink(path, account_column=None).write(FakeAccount("519-085-5164"), report)
+    assert pd.read_csv(path).columns.tolist() == ["Criteria", "Clicks"]
+    assert report.columns.tolist() == ["Criteria", "Clicks"]
+
+
+def test_callback_sink():
+    from adwords_reports.sinks import CallbackSink
+
+    calls = list()
+    sink = CallbackSink(lambda account, report: calls.append((account.id, report["Clicks"].tolist())), batch_size=2)
+    sink.write(FakeAccount(1), _report([1, 2, 3]))
+    sink.write(FakeAccount(2), _report([]))
+    assert calls == [(1, [1, 2]), (1, [3])]
+
+    calls = list()
+    CallbackSink(lambda account, report: calls.append(len(report))).write(FakeAccount(1), _report([1, 2, 3]))
+    assert calls == [3]
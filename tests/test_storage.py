@@ -0,0 +1,31 @@
+import os
+import pytest
+
+
+def test_account_key():
+    from adwords_reports.storage import account_key
+
+    assert account_key("519-085-5164") == account_key(5190855164) == "5190855164"
+
+
+def test_atomic_write(tmpdir):
+    from adwords_reports.storage import atomic_write
+
+    path = os.path.join(str(tmpdir), "nested", "file.txt")
+    with atomic_write(path) as temp_path:
+        with open(temp_path, "w") as text_file:
+            text_file.write("first")
+        assert not os.path.exists(path)  # only visible once it's complete
+    with atomic_write(path) as temp_path:
+        with open(temp_path, "w") as text_file:
+            text_file.write("second")
+
+    with pytest.raises(ValueError):
+        with atomic_write(path) as temp_path:
+            with open(temp_path, "w") as text_file:
+                text_file.write("broken")
+            raise ValueError("failed while writing")
+
+    with open(path) as text_file:
+        assert text_file.read() == "second"
+    assert os.listdir(os.path.dirname(path)) == ["file.txt"]  # no temporary files are left behind
@@ -0,0 +1,176 @@
+import time
+import datetime
+import threading
+import xml.etree.ElementTree as ElementTree
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:  # python 2
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+import pytest
+
+NAMESPACE = "https://adwords.google.com/api/adwords/cm/v201802"
+
+
+class FakeOAuth2Client:
+    def __init__(self, expiry=None):
+        self.refreshes = 0
+        self.creds = type("Credentials", (), {"expiry": expiry})()
+
+    def CreateHttpHeader(self):
+        self.refreshes += 1
+        return {"Authorization": "Bearer token-{}".format(self.refreshes)}
+
+
+class FakeSession:
+    developer_token = "developer-token"
+    client_customer_id = "123-456-7890"
+    user_agent = "test"
+
+    def __init__(self):
+        self.oauth2_client = FakeOAuth2Client()
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.server.requests.append(dict(self.headers))
+        self.rfile.read(int(self.headers["Content-Length"]))
+        status, body = (400, b"ReportDefinitionError.INVALID_FIELD_NAME_FOR_REPORT") \
+            if self.headers["clientCustomerId"] == "0" else (200, b"a,b\n" * 1000)
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.connections = 0
+    server.requests = list()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _report_definition():
+    return {
+        "reportName": "Keywords & more",
+        "reportType": "KEYWORDS_PERFORMANCE_REPORT",
+        "dateRangeType": "CUSTOM_DATE",
+        "downloadFormat": "CSV",
+        "selector": {
+            "fields": ["Id", "Clicks"],
+            "dateRange": {"min": "20180101", "max": "20180131"},
+            "predicates": [{"field": "Status", "operator": "IN", "values": ["ENABLED", "PAUSED"]}]
+        }
+    }
+
+
+def test_token_cache():
+    from adwords_reports.transport import TokenCache
+
+    oauth2_client = FakeOAuth2Client(expiry=datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+    token_cache = TokenCache(oauth2_client)
+    headers = list()
+    threads = [threading.Thread(target=lambda: headers.append(token_cache.CreateHttpHeader())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert oauth2_client.refreshes == 1
+    assert headers == [{"Authorization": "Bearer token-1"}] * 8
+    assert token_cache.creds is oauth2_client.creds
+
+    # a token that expires within the margin isn't reused
+    oauth2_client = FakeOAuth2Client(expiry=datetime.datetime.utcnow() + datetime.timedelta(seconds=30))
+    token_cache = TokenCache(oauth2_client, margin=60)
+    token_cache.CreateHttpHeader()
+    assert token_cache.CreateHttpHeader() == {"Authorization": "Bearer token-2"}
+
+    # without a known expiry it's reused for ttl seconds
+    oauth2_client = FakeOAuth2Client()
+    token_cache = TokenCache(oauth2_client, ttl=0.1)
+    token_cache.CreateHttpHeader()
+    token_cache.CreateHttpHeader()
+    assert oauth2_client.refreshes == 1
+    time.sleep(0.2)
+    assert token_cache.CreateHttpHeader() == {"Authorization": "Bearer token-2"}
+
+
+def test_report_definition_xml():
+    from adwords_reports.transport import report_definition_xml
+
+    root = ElementTree.fromstring(report_definition_xml(_report_definition(), NAMESPACE))
+    tags = [child.tag.replace("{" + NAMESPACE + "}", "") for child in root]
+    assert tags == ["selector", "reportName", "reportType", "dateRangeType", "downloadFormat"]
+    selector = [child.tag.replace("{" + NAMESPACE + "}", "") for child in root[0]]
+    assert selector == ["fields", "fields", "predicates", "dateRange"]
+    assert root.find("{" + NAMESPACE + "}reportName").text == "Keywords & more"
+    assert [value.text for value in root.iter("{" + NAMESPACE + "}values")] == ["ENABLED", "PAUSED"]
+
+    # only the keys of a ReportDefinition are supported, others aren't dropped silently
+    report_definition = _report_definition()
+    report_definition["selector"]["ordering"] = [{"field": "Clicks", "sortOrder": "DESCENDING"}]
+    with pytest.raises(ValueError):
+        report_definition_xml(report_definition, NAMESPACE)
+    report_definition = _report_definition()
+    report_definition["includeZeroImpressions"] = True
+    with pytest.raises(ValueError):
+        report_definition_xml(report_definition, NAMESPACE)
+
+
+def test_pooled_report_downloader(server):
+    pytest.importorskip("urllib3")
+    from adwords_reports.transport import PooledTransport, PooledReportDownloader, ReportDownloadError
+
+    transport = PooledTransport(pool_size=2, server="http://127.0.0.1:{}".format(server.server_address[1]))
+    session = FakeSession()
+    downloader = PooledReportDownloader(transport, session, "v201802")
+
+    assert downloader.DownloadReportAsString(_report_definition(), include_zero_impressions=True) == "a,b\n" * 1000
+    stream = downloader.DownloadReportAsStream(_report_definition(), skip_report_header=True)
+    assert stream.read() == b"a,b\n" * 1000
+    stream.close()
+    # a partly read stream closes its connection
+    stream = downloader.DownloadReportAsStream(_report_definition())
+    stream.read(10)
+    stream.close()
+    assert server.connections == 1
+    assert downloader.DownloadReportAsString(_report_definition())
+    assert server.connections == 2
+
+    headers = server.requests[0]
+    assert headers["Authorization"] == "Bearer token-1"
+    assert headers["clientCustomerId"] == "123-456-7890"
+    assert headers["includeZeroImpressions"] == "true"
+    assert headers["User-Agent"] == "test,adwords_reports"
+    assert server.requests[1]["skipReportHeader"] == "true"
+
+    session.client_customer_id = "0"
+    with pytest.raises(ReportDownloadError) as error:
+        downloader.DownloadReportAsString(_report_definition())
+    assert error.value.code == 400
+    assert "INVALID_FIELD_NAME" in error.value.content
+    # the connection of an error is reused as well
+    session.client_customer_id = "123-456-7890"
+    assert downloader.DownloadReportAsString(_report_definition())
+    assert server.connections == 2